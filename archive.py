@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+斗地主对局归档
+
+把大量对局记录（gamerecord 格式）存进一个带索引的文件，读取时用内存映射：
+按下标取第 N 局是常数时间，统计扫描直接读取按列存放的每局摘要
+（地主、胜者、回合数、地主初始手牌的炸弹数和最少手数等），不需要解码任何一局。
+安装了 NumPy 时各列是零拷贝的 ndarray，扫描用 bincount 向量化完成。
+
+文件布局：头部（魔数、局数、各区偏移） | 对局数据 | 索引（N+1个偏移） | 各摘要列
+
+    python3 archive.py build games.ddz games.ddza   # 从记录文件建立归档
+    python3 archive.py stats games.ddza             # 按炸弹数、手牌强度统计
+"""
+
+import argparse
+import json
+import mmap
+import struct
+import sys
+from array import array
+from typing import Dict, Iterable, List, Tuple
+
+from doudizhu import RANK_SMALL_JOKER, counts_to_list, min_plays
+from gamerecord import GameRecord, decode_record, encode_payload, iter_records
+
+try:
+    import numpy as np
+except ImportError:  # NumPy 是可选依赖，没有时逐个累加
+    np = None
+
+MAGIC = b"DDZA\x01"
+# 每局摘要列：(列名, array 类型码)
+COLUMNS: List[Tuple[str, str]] = [
+    ("landlord", "B"),
+    ("winner", "B"),             # 异常结束时为 255
+    ("landlord_won", "B"),
+    ("turns", "H"),
+    ("landlord_bombs", "B"),     # 地主初始手牌（含地主牌）中的炸弹和火箭数
+    ("farmer_bombs", "B"),       # 两名农民初始手牌中的炸弹和火箭总数
+    ("landlord_strength", "B"),  # 地主初始手牌最少几手出完，越小越强
+]
+_COLUMN_TYPES = dict(COLUMNS)
+# 魔数、局数、索引偏移，之后是各列的偏移
+_HEADER = struct.Struct("<5sQQ" + "Q" * len(COLUMNS))
+
+
+def count_bombs(counts: int) -> int:
+    """手牌中的炸弹数（火箭算一个）"""
+    slots = counts_to_list(counts)
+    bombs = sum(1 for count in slots[:RANK_SMALL_JOKER] if count == 4)
+    return bombs + (slots[RANK_SMALL_JOKER] and slots[RANK_SMALL_JOKER + 1])
+
+
+def summarize(record: GameRecord) -> Dict[str, int]:
+    """一局的摘要列"""
+    hands, kitty = record.deal()
+    hands[record.landlord] += kitty
+    landlord_hand = hands[record.landlord]
+    return {
+        "landlord": record.landlord,
+        "winner": record.winner if record.winner >= 0 else 255,
+        "landlord_won": int(record.winner == record.landlord),
+        "turns": len(record.moves),
+        "landlord_bombs": count_bombs(landlord_hand),
+        "farmer_bombs": sum(count_bombs(hand) for seat, hand in enumerate(hands)
+                            if seat != record.landlord),
+        "landlord_strength": min_plays(landlord_hand),
+    }
+
+
+def build_archive(records: Iterable[GameRecord], path: str) -> int:
+    """把记录流式写入归档文件，返回局数"""
+    offsets = array("Q")
+    columns = {name: array(code) for name, code in COLUMNS}
+    with open(path, "wb") as f:
+        f.write(b"\0" * _HEADER.size)
+        for record in records:
+            offsets.append(f.tell())
+            f.write(encode_payload(record))
+            for name, value in summarize(record).items():
+                columns[name].append(value)
+        offsets.append(f.tell())
+
+        index_offset = f.tell()
+        f.write(_little_endian(offsets))
+        column_offsets = []
+        for name, _ in COLUMNS:
+            column_offsets.append(f.tell())
+            f.write(_little_endian(columns[name]))
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, len(offsets) - 1, index_offset, *column_offsets))
+    return len(offsets) - 1
+
+
+def _little_endian(values: array) -> bytes:
+    """归档中的整数一律按小端存放"""
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _view(buffer: mmap.mmap, offset: int, count: int, code: str):
+    """映射区中从 offset 起的 count 个小端整数，小端机器上不复制"""
+    size = array(code).itemsize
+    view = memoryview(buffer)[offset:offset + size * count]
+    if sys.byteorder == "little":
+        return view.cast(code)
+    values = array(code, view.tobytes())
+    values.byteswap()
+    return values
+
+
+class GameArchive:
+    """内存映射的只读对局归档"""
+
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._index = None
+        self._columns = {}
+        magic, self.count, index_offset, *column_offsets = _HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} 不是对局归档文件")
+        self._index = _view(self._map, index_offset, self.count + 1, "Q")
+        self._columns = {name: _view(self._map, offset, self.count, code)
+                         for (name, code), offset in zip(COLUMNS, column_offsets)}
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, n: int) -> GameRecord:
+        """第 n 局的记录（常数时间）"""
+        if n < 0:
+            n += self.count
+        if not 0 <= n < self.count:
+            raise IndexError(n)
+        return decode_record(self._map[self._index[n]:self._index[n + 1]])
+
+    def column(self, name: str):
+        """某个摘要列：有 NumPy 时为零拷贝的 ndarray，否则为 memoryview
+
+        两者都直接引用映射区：memoryview 在 close() 后失效；close() 时仍被引用的 ndarray
+        照常可读，映射区在它们全部释放后才解除映射。
+        """
+        view = self._columns[name]
+        if np is not None:
+            return np.frombuffer(view, dtype=_COLUMN_TYPES[name])
+        return view
+
+    def group_mean(self, key: str, value: str) -> Dict[int, Tuple[int, float]]:
+        """按 key 列分组，返回 {key值: (局数, value 列的平均值)}"""
+        keys, values = self.column(key), self.column(value)
+        if np is not None:
+            games = np.bincount(keys)
+            sums = np.bincount(keys, weights=values)
+            return {k: (int(games[k]), float(sums[k] / games[k]))
+                    for k in np.nonzero(games)[0].tolist()}
+
+        games, sums = {}, {}
+        for k, v in zip(keys, values):
+            games[k] = games.get(k, 0) + 1
+            sums[k] = sums.get(k, 0) + v
+        return {k: (games[k], sums[k] / games[k]) for k in sorted(games)}
+
+    def landlord_win_rate_by_bombs(self) -> Dict[int, Tuple[int, float]]:
+        """按地主初始炸弹数统计地主胜率"""
+        return self.group_mean("landlord_bombs", "landlord_won")
+
+    def average_turns_by_strength(self) -> Dict[int, Tuple[int, float]]:
+        """按地主初始手牌最少手数统计平均回合数"""
+        return self.group_mean("landlord_strength", "turns")
+
+    def close(self):
+        """关闭归档；调用方仍持有 column() 的 ndarray 时，映射区留到它们释放后再解除映射"""
+        views = [self._index, *self._columns.values()]
+        self._index, self._columns = None, {}
+        for view in views:
+            if isinstance(view, memoryview):
+                try:
+                    view.release()
+                except BufferError:
+                    pass  # 仍被调用方的 ndarray 引用
+        try:
+            self._map.close()
+        except BufferError:
+            pass  # 映射区随最后一个引用它的视图一起释放
+        self._file.close()
+
+    def __enter__(self) -> 'GameArchive':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="斗地主对局归档")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="从对局记录文件建立归档")
+    build.add_argument("records", help="gamerecord 格式的记录文件")
+    build.add_argument("archive", help="输出的归档文件")
+    stats = commands.add_parser("stats", help="输出归档的统计")
+    stats.add_argument("archive", help="归档文件")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        print(f"已归档{build_archive(iter_records(args.records), args.archive)}局")
+        return
+    with GameArchive(args.archive) as games:
+        report = {
+            "games": len(games),
+            "landlord_win_rate_by_bombs": {k: {"games": n, "rate": round(rate, 4)}
+                                           for k, (n, rate) in games.landlord_win_rate_by_bombs().items()},
+            "average_turns_by_strength": {k: {"games": n, "turns": round(turns, 2)}
+                                          for k, (n, turns) in games.average_turns_by_strength().items()},
+        }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+斗地主批量牌型识别与特征提取（NumPy）
+
+输入为 (N, 15) 的张数矩阵（每行依次为 3..A、2、小王、大王的张数），
+一次性得到每行的牌型编码、主牌值、长度、出牌编号和是否合法，以及手牌特征。
+牌型识别与 Hand 相同：把每行打包成张数签名后在排好序的 PLAY_TABLE 中二分查找，
+全程没有逐行的 Python 循环。NumPy 是可选依赖，只有本模块需要。
+"""
+
+from typing import Dict, Iterable, NamedTuple
+
+try:
+    import numpy as np
+except ImportError as error:
+    raise ImportError("batch 模块需要 NumPy：pip install numpy") from error
+
+from doudizhu import (PLAY_TABLE, RANK_BIG_JOKER, RANK_COUNT, RANK_SMALL_JOKER, RANK_TWO,
+                      SLOT_BITS, SLOT_MASK, CardType)
+
+CARD_TYPES = list(CardType)  # 牌型编码即在此列表中的下标
+TYPE_CODES = {card_type: code for code, card_type in enumerate(CARD_TYPES)}
+INVALID_CODE = TYPE_CODES[CardType.INVALID]
+
+_SHIFTS = np.arange(RANK_COUNT, dtype=np.uint64) * np.uint64(SLOT_BITS)
+
+
+def _table_arrays():
+    """按签名排好序的分类表各列"""
+    items = sorted(PLAY_TABLE.items())
+    signatures = np.array([counts for counts, _ in items], dtype=np.uint64)
+    types = np.array([TYPE_CODES[card_type] for _, (card_type, _, _, _) in items], dtype=np.int8)
+    mains = np.array([main_value for _, (_, main_value, _, _) in items], dtype=np.int8)
+    lengths = np.array([length for _, (_, _, length, _) in items], dtype=np.int8)
+    move_ids = np.array([move_id for _, (_, _, _, move_id) in items], dtype=np.uint16)
+    return signatures, types, mains, lengths, move_ids
+
+
+_SIGNATURES, _TYPES, _MAINS, _LENGTHS, _MOVE_IDS = _table_arrays()
+
+
+class BatchClassification(NamedTuple):
+    """批量识别结果，每个数组长度为 N"""
+    types: np.ndarray     # 牌型编码（CARD_TYPES 的下标），不合法为 INVALID_CODE
+    mains: np.ndarray     # 主牌值（与 Hand.main_value 相同，3..17），不合法为0
+    lengths: np.ndarray   # 连续点数个数，不合法为0
+    move_ids: np.ndarray  # 出牌编号，不合法为0
+    valid: np.ndarray     # 是否为合法出牌
+
+
+def _check_counts(counts) -> np.ndarray:
+    counts = np.asarray(counts)
+    if counts.ndim != 2 or counts.shape[1] != RANK_COUNT:
+        raise ValueError(f"张数矩阵的形状应为 (N, {RANK_COUNT})，实际为 {counts.shape}")
+    return counts
+
+
+def _possible_rows(counts: np.ndarray) -> np.ndarray:
+    """每个点数不超过4张、大小王各不超过1张的行"""
+    normal = counts[:, :RANK_SMALL_JOKER]
+    jokers = counts[:, RANK_SMALL_JOKER:]
+    return (counts >= 0).all(axis=1) & (normal <= 4).all(axis=1) & (jokers <= 1).all(axis=1)
+
+
+def to_signatures(counts) -> np.ndarray:
+    """把 (N, 15) 张数矩阵打包成张数签名（uint64），不可能的行得到0"""
+    counts = _check_counts(counts)
+    possible = _possible_rows(counts)
+    packed = (np.clip(counts, 0, SLOT_MASK).astype(np.uint64) << _SHIFTS).sum(axis=1, dtype=np.uint64)
+    return np.where(possible, packed, np.uint64(0))
+
+
+def from_signatures(signatures: Iterable[int]) -> np.ndarray:
+    """把张数签名展开成 (N, 15) 张数矩阵"""
+    packed = np.asarray(list(signatures) if not isinstance(signatures, np.ndarray) else signatures,
+                        dtype=np.uint64)
+    return ((packed[:, None] >> _SHIFTS) & np.uint64(SLOT_MASK)).astype(np.int8)
+
+
+def classify_batch(counts) -> BatchClassification:
+    """批量识别牌型，语义与 Hand / classify_counts 相同"""
+    signatures = to_signatures(counts)
+    pos = np.minimum(np.searchsorted(_SIGNATURES, signatures), len(_SIGNATURES) - 1)
+    valid = (_SIGNATURES[pos] == signatures) & (signatures != 0)
+    return BatchClassification(
+        types=np.where(valid, _TYPES[pos], np.int8(INVALID_CODE)).astype(np.int8),
+        mains=np.where(valid, _MAINS[pos], 0).astype(np.int8),
+        lengths=np.where(valid, _LENGTHS[pos], 0).astype(np.int8),
+        move_ids=np.where(valid, _MOVE_IDS[pos], 0).astype(np.uint16),
+        valid=valid,
+    )
+
+
+def _window_count(present: np.ndarray, width: int) -> np.ndarray:
+    """每行中连续 width 个点数都满足条件的起点个数"""
+    totals = np.zeros((present.shape[0], present.shape[1] + 1), dtype=np.int16)
+    np.cumsum(present, axis=1, dtype=np.int16, out=totals[:, 1:])
+    return ((totals[:, width:] - totals[:, :-width]) == width).sum(axis=1)
+
+
+def _longest_run(present: np.ndarray) -> np.ndarray:
+    """每行最长的连续满足条件的点数个数"""
+    run = np.zeros(present.shape[0], dtype=np.int16)
+    best = np.zeros(present.shape[0], dtype=np.int16)
+    for column in range(present.shape[1]):
+        run = (run + 1) * present[:, column]
+        np.maximum(best, run, out=best)
+    return best
+
+
+def hand_features(counts) -> Dict[str, np.ndarray]:
+    """批量提取手牌特征，每项为长度 N 的数组"""
+    counts = _check_counts(counts)
+    normal = counts[:, :RANK_SMALL_JOKER]   # 不含王
+    chain = counts[:, :RANK_TWO]            # 能组成连牌的 3..A
+    rocket = (counts[:, RANK_SMALL_JOKER] > 0) & (counts[:, RANK_BIG_JOKER] > 0)
+    return {
+        "cards": counts.sum(axis=1),
+        "singles": (counts == 1).sum(axis=1),
+        "pairs": (normal >= 2).sum(axis=1),      # 至少两张的点数个数
+        "triples": (normal >= 3).sum(axis=1),
+        "bombs": (normal == 4).sum(axis=1) + rocket,  # 火箭算一个炸弹
+        "rocket": rocket,
+        "straights": _window_count(chain >= 1, 5),      # 可组成的五张顺子个数
+        "pair_straights": _window_count(chain >= 2, 3),  # 可组成的三连对个数
+        "airplanes": _window_count(chain >= 3, 2),       # 可组成的两连飞机机身个数
+        "longest_straight": _longest_run(chain >= 1),
+    }
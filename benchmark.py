@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+斗地主性能基准
+
+用固定种子测量热点路径：全部合法出牌的 Hand 牌型识别、开局和接牌时的
+Player.get_valid_hands（按手牌张数分组，另测一项缓存命中时的接牌）、Hand.can_beat，以及每秒完成的无界面对局数。
+结果以 JSON 输出，并与仓库中保存的基线比较，任何一项慢于基线的容忍倍数即以非零状态退出。
+不同机器的绝对耗时不可比，所以每次测量前都先跑一段固定的纯 Python 校准循环，
+基线保存的是各项耗时与紧挨着测得的校准耗时之比，机器快慢和负载变化对两者的影响大致相同。
+
+    python3 benchmark.py                    # 运行并与基线比较
+    python3 benchmark.py --update-baseline  # 用本次结果覆盖基线
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+
+from doudizhu import (HAND_SIZE, PLAY_TABLE, PLAYER_COUNT, Game, Hand, MoveCache, Player,
+                      cards_from_counts, simulate_game)
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+DEFAULT_TOLERANCE = 1.5
+CALIBRATION_OPS = 50000
+HAND_SIZES = [5, 10, 17, 20]
+
+
+def _calibration_loop() -> int:
+    """固定的纯 Python 工作量（字典查找、整数运算和列表操作），用来换算不同机器的速度"""
+    table = {i: i * 7 for i in range(256)}
+    total = 0
+    items = []
+    for i in range(CALIBRATION_OPS):
+        total += table[i & 255] >> 1
+        items.append(total & 0xFF)
+        if len(items) > 64:
+            items.clear()
+    return CALIBRATION_OPS
+
+
+def _seconds_per_op(func: Callable[[], int]) -> float:
+    start = time.perf_counter()
+    ops = func()
+    return (time.perf_counter() - start) / ops
+
+
+def _time_per_op(func: Callable[[], int], repeat: int) -> Tuple[float, float]:
+    """多次运行 func（返回本次执行的操作数），每次之前先运行一遍校准循环
+
+    返回 (每次操作的最短耗时（微秒）, 与校准循环每次操作耗时之比的最小值)。
+    """
+    best = best_ratio = float("inf")
+    for _ in range(repeat):
+        calibration = _seconds_per_op(_calibration_loop)
+        elapsed = _seconds_per_op(func)
+        best = min(best, elapsed)
+        best_ratio = min(best_ratio, elapsed / calibration)
+    return best * 1e6, best_ratio
+
+
+def _random_players(rng: random.Random, size: int, count: int) -> List[Player]:
+    deck = Game(seed=rng.getrandbits(32), verbose=False)
+    deck.create_deck()
+    players = []
+    for _ in range(count):
+        player = Player("基准", is_human=False)
+        player.move_cache = None  # 测量出牌生成本身
+        player.add_cards(rng.sample(deck.deck, size))
+        players.append(player)
+    return players
+
+
+def run_benchmarks(scale: float = 1.0, repeat: int = 3) -> Tuple[Dict[str, float], Dict[str, float]]:
+    """运行全部基准，返回 ({名称: 每次操作微秒数}, {名称: 与校准循环耗时之比})，对局类按每局计"""
+    rng = random.Random(20240601)
+    timings = {}
+
+    # 全部合法出牌的牌型识别
+    plays = [cards_from_counts(counts) for counts in PLAY_TABLE]
+
+    def classify():
+        for cards in plays:
+            Hand(cards)
+        return len(plays)
+    timings["classify_all_plays"] = _time_per_op(classify, repeat)
+
+    # can_beat：随机成对比较
+    hands = [Hand(cards) for cards in rng.sample(plays, int(2000 * scale) or 1)]
+    pairs = [(rng.choice(hands), rng.choice(hands)) for _ in range(int(20000 * scale) or 1)]
+
+    def can_beat():
+        for hand, other in pairs:
+            hand.can_beat(other)
+        return len(pairs)
+    timings["can_beat"] = _time_per_op(can_beat, repeat)
+
+    # 开局与接牌时的出牌生成
+    count = int(50 * scale) or 1
+    for size in HAND_SIZES:
+        players = _random_players(rng, size, count)
+        lasts = [rng.choice(hands) for _ in players]
+
+        def opening():
+            for player in players:
+                player.get_valid_hands(None)
+            return len(players)
+
+        def response():
+            for player, last in zip(players, lasts):
+                player.get_valid_hands(last)
+            return len(players)
+        timings[f"valid_hands_open_{size}"] = _time_per_op(opening, repeat)
+        timings[f"valid_hands_response_{size}"] = _time_per_op(response, repeat)
+        if size == HAND_SIZE:
+            # 缓存全部命中时的接牌
+            for player, last in zip(players, lasts):
+                player.move_cache = MoveCache()
+                player.get_valid_hands(last)
+            timings[f"valid_hands_response_{size}_cached"] = _time_per_op(response, repeat)
+
+    # 完整对局
+    games = int(200 * scale) or 1
+    seeds = [rng.getrandbits(32) for _ in range(games)]
+
+    def headless():
+        for seed in seeds:
+            simulate_game(seed)
+        return games
+
+    def full_game():
+        for seed in seeds[:max(games // 4, 1)]:
+            game = Game(seed=seed, verbose=False)
+            game.players = [Player(f"电脑{i + 1}") for i in range(PLAYER_COUNT)]
+            game.run()
+        return max(games // 4, 1)
+    timings["simulate_game"] = _time_per_op(headless, repeat)
+    timings["game_run"] = _time_per_op(full_game, repeat)
+    return ({name: micros for name, (micros, _) in timings.items()},
+            {name: ratio for name, (_, ratio) in timings.items()})
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float],
+            tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """比较校准后的结果，返回慢于基线容忍倍数的项目说明，空列表表示没有退化"""
+    regressions = []
+    for name, value in sorted(results.items()):
+        base = baseline.get(name)
+        if base and value > base * tolerance:
+            regressions.append(f"{name}: {value:.1f}，基线 {base:.1f}（{value / base:.2f}倍）")
+    return regressions
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="斗地主热点路径性能基准")
+    parser.add_argument("--scale", type=float, default=1.0, help="工作量倍数")
+    parser.add_argument("--repeat", type=int, default=3, help="每项重复次数（取最快一次）")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="基线文件")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="允许慢于基线的倍数")
+    parser.add_argument("--output", default=None, help="把结果写入该 JSON 文件")
+    parser.add_argument("--update-baseline", action="store_true", help="用本次结果覆盖基线")
+    args = parser.parse_args()
+
+    results, relative = run_benchmarks(args.scale, args.repeat)
+    report = {
+        "unit": "us/op",
+        "results": {name: round(value, 3) for name, value in results.items()},
+        "relative": {name: round(value, 2) for name, value in relative.items()},
+    }
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report["relative"], f, indent=2, sort_keys=True)
+            f.write("\n")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            report["regressions"] = compare(relative, json.load(f), args.tolerance)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+    if report.get("regressions"):
+        print("\n性能退化：\n" + "\n".join(report["regressions"]), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
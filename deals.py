@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+斗地主批量发牌与牌局库
+
+一局牌用55个字节表示：54张牌的编号（发牌顺序与 Game.deck_ids 相同）和首先叫分的座位。
+安装了 NumPy 时 generate_deals 用 Generator.permuted 成块地向量化洗牌，
+deal_hands 一次算出整批牌局的三家手牌签名；没有 NumPy 时逐局用 random.Random 洗牌。
+两种方式的结果不同，需要完全相同的牌局时保存成牌局库文件反复使用。
+deals_from_seeds 则逐局重现 Game(seed) / simulate_game(seed) 的牌局。
+
+牌局库文件布局：头部（魔数、局数） | 全部牌局的54张牌编号 | 全部牌局的首叫座位
+读取时用内存映射，牌编号可以零拷贝地作为 (N, 54) 的 ndarray 使用。
+
+    python3 deals.py generate deals.ddzd --count 1000000 --seed 0
+    python3 deals.py simulate deals.ddzd --limit 10000
+"""
+
+import argparse
+import json
+import mmap
+import random
+import struct
+import time
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from doudizhu import (CARD_UNITS, DECK_IDS, HAND_SIZE, PLAYER_COUNT, GameResult, Strategy,
+                      simulate_deal)
+
+try:
+    import numpy as np
+except ImportError:  # NumPy 是可选依赖，没有时逐局洗牌
+    np = None
+
+MAGIC = b"DDZD\x01"
+DECK_SIZE = len(DECK_IDS)
+CHUNK_SIZE = 1 << 16  # 每次向量化洗牌的局数
+_HEADER = struct.Struct("<5sQ")
+# 发牌时每个座位拿到的牌在洗好的牌中的位置（从末尾依次发）
+_SEAT_POSITIONS = [[DECK_SIZE - 1 - seat - PLAYER_COUNT * i for i in range(HAND_SIZE)]
+                   for seat in range(PLAYER_COUNT)]
+_KITTY_SIZE = DECK_SIZE - PLAYER_COUNT * HAND_SIZE
+
+Deal = Tuple[bytes, int]               # (54张牌的编号, 首叫座位)
+DealChunk = Tuple[bytes, bytes]        # (若干局连在一起的牌编号, 各局的首叫座位)
+
+
+def deals_from_seeds(seeds: Iterable[Optional[int]]) -> Iterator[DealChunk]:
+    """逐局重现 Game(seed) 的洗牌和首叫座位，每局一块"""
+    for seed in seeds:
+        rng = random.Random(seed)
+        deck = list(DECK_IDS)
+        rng.shuffle(deck)
+        yield bytes(deck), bytes([rng.randrange(PLAYER_COUNT)])
+
+
+def generate_deals(count: int, seed: Optional[int] = None,
+                   chunk_size: int = CHUNK_SIZE) -> Iterator[DealChunk]:
+    """成块产生 count 局随机牌局，同一种子（且同样有无 NumPy）时结果相同"""
+    if np is None:
+        rng = random.Random(seed)
+        for start in range(0, count, chunk_size):
+            decks, firsts = bytearray(), bytearray()
+            for _ in range(min(chunk_size, count - start)):
+                deck = list(DECK_IDS)
+                rng.shuffle(deck)
+                decks += bytes(deck)
+                firsts.append(rng.randrange(PLAYER_COUNT))
+            yield bytes(decks), bytes(firsts)
+        return
+
+    deck_seed, first_seed = np.random.SeedSequence(seed).spawn(2)
+    deck_rng, first_rng = np.random.default_rng(deck_seed), np.random.default_rng(first_seed)
+    fresh = np.array(DECK_IDS, dtype=np.uint8)
+    for start in range(0, count, chunk_size):
+        size = min(chunk_size, count - start)
+        decks = deck_rng.permuted(np.tile(fresh, (size, 1)), axis=1)
+        firsts = first_rng.integers(0, PLAYER_COUNT, size, dtype=np.uint8)
+        yield decks.tobytes(), firsts.tobytes()
+
+
+def deal_hands(decks):
+    """整批牌局的发牌结果 (三家手牌签名, 地主牌签名)，地主尚未加上地主牌
+
+    有 NumPy 时 decks 为 (N, 54) 数组，返回 (N, 3) 和 (N,) 的 uint64 数组；
+    否则 decks 为每局54个编号的序列，返回列表。
+    """
+    if np is not None:
+        units = np.array(CARD_UNITS, dtype=np.uint64)[np.asarray(decks)]
+        hands = np.stack([units[:, positions].sum(axis=1, dtype=np.uint64)
+                          for positions in _SEAT_POSITIONS], axis=1)
+        return hands, units[:, :_KITTY_SIZE].sum(axis=1, dtype=np.uint64)
+
+    hands, kitties = [], []
+    for deck in decks:
+        hands.append([sum(CARD_UNITS[deck[p]] for p in positions) for positions in _SEAT_POSITIONS])
+        kitties.append(sum(CARD_UNITS[card_id] for card_id in deck[:_KITTY_SIZE]))
+    return hands, kitties
+
+
+def write_corpus(path: str, chunks: Iterable[DealChunk]) -> int:
+    """把牌局流式写入牌局库文件，返回局数"""
+    firsts = bytearray()
+    with open(path, "wb") as f:
+        f.write(b"\0" * _HEADER.size)
+        for decks, chunk_firsts in chunks:
+            if len(decks) != DECK_SIZE * len(chunk_firsts):
+                raise ValueError("牌编号与首叫座位的局数不一致")
+            f.write(decks)
+            firsts += chunk_firsts
+        f.write(firsts)
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, len(firsts)))
+    return len(firsts)
+
+
+class DealCorpus:
+    """内存映射的只读牌局库"""
+
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = _HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} 不是牌局库文件")
+        self._firsts = _HEADER.size + DECK_SIZE * self.count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, n: int) -> Deal:
+        """第 n 局 (54张牌的编号, 首叫座位)"""
+        if n < 0:
+            n += self.count
+        if not 0 <= n < self.count:
+            raise IndexError(n)
+        start = _HEADER.size + DECK_SIZE * n
+        return self._map[start:start + DECK_SIZE], self._map[self._firsts + n]
+
+    def __iter__(self) -> Iterator[Deal]:
+        for n in range(self.count):
+            yield self[n]
+
+    def decks(self):
+        """全部牌编号：有 NumPy 时为零拷贝的 (N, 54) ndarray，否则为每局的 bytes 列表
+
+        ndarray 直接引用映射区，close() 时仍被引用的话照常可读，映射区在它释放后才解除映射。
+        """
+        if np is not None:
+            return np.frombuffer(self._map, dtype=np.uint8, count=DECK_SIZE * self.count,
+                                 offset=_HEADER.size).reshape(self.count, DECK_SIZE)
+        return [deck for deck, _ in self]
+
+    def firsts(self) -> bytes:
+        """全部首叫座位"""
+        return self._map[self._firsts:self._firsts + self.count]
+
+    def simulate(self, strategies: Optional[List[Strategy]] = None,
+                 start: int = 0, stop: Optional[int] = None) -> Iterator[GameResult]:
+        """依次用第 start..stop-1 局无界面模拟，逐局产生结果"""
+        for n in range(start, self.count if stop is None else min(stop, self.count)):
+            deck, first = self[n]
+            yield simulate_deal(deck, first, strategies)
+
+    def close(self):
+        """关闭牌局库；调用方仍持有 decks() 的 ndarray 时，映射区留到它释放后再解除映射"""
+        try:
+            self._map.close()
+        except BufferError:
+            pass  # 映射区随最后一个引用它的视图一起释放
+        self._file.close()
+
+    def __enter__(self) -> 'DealCorpus':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def iter_chunk_deals(chunks: Iterable[DealChunk]) -> Iterator[Deal]:
+    """把成块的牌局拆成逐局"""
+    for decks, firsts in chunks:
+        for i, first in enumerate(firsts):
+            yield decks[DECK_SIZE * i:DECK_SIZE * (i + 1)], first
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="斗地主批量发牌与牌局库")
+    commands = parser.add_subparsers(dest="command", required=True)
+    generate = commands.add_parser("generate", help="生成牌局库")
+    generate.add_argument("path", help="输出的牌局库文件")
+    generate.add_argument("--count", type=int, default=100000, help="局数")
+    generate.add_argument("--seed", type=int, default=0, help="随机种子")
+    generate.add_argument("--from-seeds", action="store_true",
+                          help="第 i 局使用 Game(seed + i) 的牌局（逐局洗牌）")
+    simulate = commands.add_parser("simulate", help="用牌局库无界面模拟")
+    simulate.add_argument("path", help="牌局库文件")
+    simulate.add_argument("--limit", type=int, default=None, help="最多模拟的局数")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == "generate":
+        if args.from_seeds:
+            chunks = deals_from_seeds(range(args.seed, args.seed + args.count))
+        else:
+            chunks = generate_deals(args.count, args.seed)
+        count = write_corpus(args.path, chunks)
+        print(f"已生成{count}局，用时{time.perf_counter() - start:.2f}秒")
+        return
+
+    with DealCorpus(args.path) as corpus:
+        results = list(corpus.simulate(stop=args.limit))
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        "games": len(results),
+        "games_per_second": round(len(results) / elapsed, 1),
+        "landlord_win_rate": round(sum(r.landlord_won for r in results) / max(len(results), 1), 4),
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -31,15 +31,20 @@ def main():
     landlord = game.choose_landlord()
     
     print(f"✓ {landlord.name} 成为地主，获得额外3张牌")
-    print(f"✓ 地主现在有{len(landlord.cards)}张牌")
+    print(f"✓ 地主现在有{landlord.card_count}张牌")
     
     # 显示各玩家手牌数量
     print("\n当前玩家状态：")
     for player in game.players:
         role = "地主" if player.is_landlord else "农民"
-        print(f"  {player.name}({role})：{len(player.cards)}张牌")
+        print(f"  {player.name}({role})：{player.card_count}张牌")
     
     print("\n✅ 斗地主游戏初始化完成！")
+    
+    # 无界面模式完整打一局
+    result = Game(seed=2024, verbose=False).run()
+    winner_role = "地主" if result.landlord_won else "农民"
+    print(f"\n无界面对局：共{result.turns}回合，{winner_role}获胜")
     print("\n游戏特性：")
     print("• 完整的54张牌（包含大小王）")
     print("• 支持所有经典牌型识别")
@@ -4,11 +4,17 @@
 斗地主扑克游戏 - 命令行版本
 """
 
+import json
 import random
 import sys
-from typing import List, Dict, Tuple, Optional
+import threading
+import time
+from typing import List, Dict, Tuple, Optional, Iterator, Callable, NamedTuple, Sequence
+from array import array
+from collections import OrderedDict
 from enum import Enum
-from collections import Counter
+from functools import lru_cache
+from itertools import combinations
 
 
 class Suit(Enum):
@@ -43,33 +49,131 @@ class CardValue(Enum):
         self.display = display
 
 
+# ---------------------------------------------------------------------------
+# 引擎内部表示
+#
+# 点数索引 rank 取 0..14，依次对应 3,4,...,K,A,2,小王,大王。
+# 一手牌（或一组牌）按点数统计张数，每个点数占 4 位，15 个槽位打包成一个整数，
+# 称为"张数签名"。合并两组牌就是整数相加，判断包含关系也只需一次位运算。
+# 每张具体的牌另有 0..53 的编号，玩家手牌用 54 位掩码记录具体花色。
+# ---------------------------------------------------------------------------
+RANK_COUNT = 15
+RANK_KING = 10
+RANK_ACE = 11
+RANK_TWO = 12
+RANK_SMALL_JOKER = 13
+RANK_BIG_JOKER = 14
+SLOT_BITS = 4
+SLOT_MASK = (1 << SLOT_BITS) - 1
+RANK_UNITS = [1 << (SLOT_BITS * rank) for rank in range(RANK_COUNT)]
+# 每个槽位的最高位，用于无借位的包含判断（单个点数最多4张，不会触及该位）
+_SLOT_GUARDS = sum(8 << (SLOT_BITS * rank) for rank in range(RANK_COUNT))
+
+_SUIT_INDEX = {Suit.SPADES: 0, Suit.HEARTS: 1, Suit.DIAMONDS: 2, Suit.CLUBS: 3, Suit.JOKER: 0}
+
+
+def counts_to_list(counts: int) -> List[int]:
+    """把张数签名展开成长度为15的张数列表"""
+    return [(counts >> (SLOT_BITS * rank)) & SLOT_MASK for rank in range(RANK_COUNT)]
+
+
+def counts_from_list(slots: List[int]) -> int:
+    """把张数列表打包成张数签名"""
+    counts = 0
+    for rank, count in enumerate(slots):
+        counts |= count << (SLOT_BITS * rank)
+    return counts
+
+
+def counts_contains(counts: int, other: int) -> bool:
+    """判断 counts 的每个点数张数都不少于 other"""
+    return ((counts | _SLOT_GUARDS) - other) & _SLOT_GUARDS == _SLOT_GUARDS
+
+
+def counts_size(counts: int) -> int:
+    """张数签名中的总张数"""
+    total = 0
+    while counts:
+        total += counts & SLOT_MASK
+        counts >>= SLOT_BITS
+    return total
+
+
 class Card:
-    """扑克牌类"""
+    """扑克牌类
+    
+    54张牌都是进程内唯一的不可变对象：Card(花色, 牌值) 总是返回同一张牌，
+    相等即为同一对象。编号、哈希和显示字符串都在创建时算好。
+    """
     
-    def __init__(self, suit: Suit, card_value: CardValue):
-        self.suit = suit
-        self.value = card_value
+    __slots__ = ("suit", "value", "rank", "id", "bit", "_str")
+    _interned: Dict[Tuple[Suit, CardValue], 'Card'] = {}
+    
+    def __new__(cls, suit: Suit, card_value: CardValue):
+        card = cls._interned.get((suit, card_value))
+        if card is not None:
+            return card
+        
+        rank = card_value.numeric_value - 3
+        if (rank >= RANK_SMALL_JOKER) != (suit == Suit.JOKER):
+            raise ValueError(f"无效的牌：{suit.value}{card_value.display}")
+        if rank >= RANK_SMALL_JOKER:
+            card_id = 52 + rank - RANK_SMALL_JOKER
+            text = card_value.display
+        else:
+            card_id = rank * 4 + _SUIT_INDEX[suit]
+            text = f"{suit.value}{card_value.display}"
+        
+        card = object.__new__(cls)
+        for name, value in (("suit", suit), ("value", card_value), ("rank", rank),
+                            ("id", card_id), ("bit", 1 << card_id), ("_str", text)):
+            object.__setattr__(card, name, value)
+        cls._interned[(suit, card_value)] = card
+        return card
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("Card 不可修改")
+    
+    def __delattr__(self, name):
+        raise AttributeError("Card 不可修改")
+    
+    def __reduce__(self):
+        # 反序列化时取回同一个单例
+        return Card, (self.suit, self.value)
     
     def __str__(self):
-        if self.value in [CardValue.SMALL_JOKER, CardValue.BIG_JOKER]:
-            return f"{self.value.display}"
-        return f"{self.suit.value}{self.value.display}"
+        return self._str
     
     def __repr__(self):
-        return str(self)
-    
-    def __eq__(self, other):
-        if not isinstance(other, Card):
-            return False
-        return self.suit == other.suit and self.value == other.value
+        return self._str
     
     def __lt__(self, other):
         if not isinstance(other, Card):
             return False
-        return self.value.numeric_value < other.value.numeric_value
+        return self.rank < other.rank
     
     def __hash__(self):
-        return hash((self.suit, self.value))
+        return self.id
+
+
+_NORMAL_SUITS = [Suit.SPADES, Suit.HEARTS, Suit.DIAMONDS, Suit.CLUBS]
+# 按编号排列的54张牌
+CARDS: Tuple[Card, ...] = tuple(sorted(
+    [Card(suit, value) for suit in _NORMAL_SUITS for value in list(CardValue)[:RANK_SMALL_JOKER]]
+    + [Card(Suit.JOKER, CardValue.SMALL_JOKER), Card(Suit.JOKER, CardValue.BIG_JOKER)],
+    key=lambda card: card.id))
+# 新牌的顺序（按花色、再按点数，最后是大小王），洗牌只是打乱这些编号
+DECK_IDS = [rank * 4 + suit for suit in range(4) for rank in range(RANK_SMALL_JOKER)] + [52, 53]
+
+
+def mask_to_cards(mask: int) -> List[Card]:
+    """54位掩码中的牌，按编号（即先点数、后花色）排列"""
+    cards = []
+    while mask:
+        low = mask & -mask
+        cards.append(CARDS[low.bit_length() - 1])
+        mask ^= low
+    return cards
 
 
 class CardType(Enum):
@@ -88,324 +192,997 @@ class CardType(Enum):
     INVALID = "无效"
 
 
-class Hand:
-    """手牌组合类"""
+def cards_to_counts(cards: List[Card]) -> int:
+    """统计一组牌的张数签名"""
+    counts = 0
+    for card in cards:
+        counts += RANK_UNITS[card.rank]
+    return counts
+
+
+def cards_from_counts(counts: int) -> List[Card]:
+    """按张数签名构造一组具体的牌（每个点数的花色依次取黑桃、红桃、方块、梅花）"""
+    values = list(CardValue)
+    cards = []
+    for rank, count in enumerate(counts_to_list(counts)):
+        suits = [Suit.JOKER] if rank >= RANK_SMALL_JOKER else _NORMAL_SUITS
+        cards.extend(Card(suits[i], values[rank]) for i in range(count))
+    return cards
+
+
+def cards_to_mask(cards: List[Card]) -> int:
+    """一组牌对应的54位掩码"""
+    mask = 0
+    for card in cards:
+        mask |= card.bit
+    return mask
+
+
+def _is_consecutive(ranks: List[int]) -> bool:
+    """有序点数是否连续且不含2和王"""
+    return ranks[-1] < RANK_TWO and ranks[-1] - ranks[0] == len(ranks) - 1
+
+
+def _is_straight(slots: List[int]) -> bool:
+    """判断是否为顺子"""
+    ranks = [rank for rank, count in enumerate(slots) if count]
+    if any(count > 1 for count in slots):  # 有重复
+        return False
+    return _is_consecutive(ranks)
+
+
+def _is_pair_straight(slots: List[int]) -> bool:
+    """判断是否为连对"""
+    ranks = [rank for rank, count in enumerate(slots) if count]
+    # 每个值都必须出现2次
+    if not all(slots[rank] == 2 for rank in ranks):
+        return False
+    return _is_consecutive(ranks)
+
+
+def _is_triple_straight(slots: List[int]) -> bool:
+    """判断是否为飞机：连续两个以上的三张，不带，或带同样数量的单张或对子
+
+    带的牌点数互不相同且不与机身重复，所以机身的点数恰好各3张，
+    333444+5、33334444 这类把第四张当作翅膀的组合不是飞机。
+    """
+    triple_ranks = [rank for rank, count in enumerate(slots) if count == 3]
+    if len(triple_ranks) < 2 or not _is_consecutive(triple_ranks):
+        return False
+    wings = [count for count in slots if count and count != 3]
+    return not wings or (len(wings) == len(triple_ranks) and len(set(wings)) == 1 and wings[0] <= 2)
+
+
+def _determine_type(slots: List[int]) -> CardType:
+    """根据张数列表判断出牌类型"""
+    card_count = sum(slots)
+    if not card_count:
+        return CardType.INVALID
+
+    counts = sorted((count for count in slots if count), reverse=True)
+
+    # 火箭（双王）
+    if card_count == 2 and slots[RANK_SMALL_JOKER] == 1 and slots[RANK_BIG_JOKER] == 1:
+        return CardType.ROCKET
+
+    # 炸弹
+    if card_count == 4 and counts == [4]:
+        return CardType.BOMB
+
+    # 单张
+    if card_count == 1:
+        return CardType.SINGLE
+
+    # 对子
+    if card_count == 2 and counts == [2]:
+        return CardType.PAIR
+
+    # 三张
+    if card_count == 3 and counts == [3]:
+        return CardType.TRIPLE
+
+    # 三带一
+    if card_count == 4 and counts == [3, 1]:
+        return CardType.TRIPLE_WITH_SINGLE
+
+    # 三带对
+    if card_count == 5 and counts == [3, 2]:
+        return CardType.TRIPLE_WITH_PAIR
+
+    # 四带二
+    if card_count == 6 and counts == [4, 1, 1]:
+        return CardType.FOUR_WITH_TWO
+
+    # 顺子（5张以上连续单牌，不包含2和王）
+    if card_count >= 5 and _is_straight(slots):
+        return CardType.STRAIGHT
+
+    # 连对（3对以上连续对子，不包含2和王）
+    if card_count >= 6 and card_count % 2 == 0 and _is_pair_straight(slots):
+        return CardType.PAIR_STRAIGHT
+
+    # 飞机（连续三张）
+    if card_count >= 6 and _is_triple_straight(slots):
+        return CardType.TRIPLE_STRAIGHT
+
+    return CardType.INVALID
+
+
+def _get_main_value(slots: List[int], card_type: CardType) -> int:
+    """获取主牌值（用于比较的关键值）"""
+    if card_type in [CardType.TRIPLE_WITH_SINGLE, CardType.TRIPLE_WITH_PAIR,
+                     CardType.TRIPLE, CardType.TRIPLE_STRAIGHT]:
+        # 三张类型以最小的三张的值为主
+        for rank, count in enumerate(slots):
+            if count >= 3:
+                return rank + 3
+
+    if card_type == CardType.FOUR_WITH_TWO:
+        # 四带二以四张的值为主
+        for rank, count in enumerate(slots):
+            if count == 4:
+                return rank + 3
+
+    # 其他类型以最大值为主
+    for rank in range(RANK_COUNT - 1, -1, -1):
+        if slots[rank]:
+            return rank + 3
+    return 0
+
+
+# ---------------------------------------------------------------------------
+# 牌型分类表
+#
+# 不计花色时，斗地主所有合法出牌的张数签名是有限的（约一万三千种）。
+# 导入时一次性枚举全部合法出牌，以张数签名为键记录
+# (牌型, 主牌值, 长度, 出牌编号)，Hand 的牌型识别只需查一次表。
+# 长度对顺子、连对、飞机是连续的点数个数，其他牌型为1。
+#
+# 每种出牌有一个从1开始的稠密编号（0表示不出或不合法）。编号按
+# (张数, 牌型, 长度) 把同形状的出牌排在一段连续区间内，段内按主牌值从小到大；
+# 炸弹排在所有其他出牌之后，火箭最后。于是能压过某手牌的出牌恰好是
+# 同一区间内主牌值更大的那一段，再加上（对非炸弹而言）全部炸弹和火箭，
+# 大小比较只需比较编号与预先算好的区间端点 BEAT_START / GROUP_END。
+# 编号顺序同时就是"最小优先"的出牌顺序。
+# ---------------------------------------------------------------------------
+MAX_HAND_SIZE = 20  # 地主手牌上限
+NO_MOVE = 0         # 不出或不合法出牌的编号
+_TYPE_ORDER = {card_type: i for i, card_type in enumerate(CardType)}
+
+
+def _chain_counts(low: int, length: int, count: int) -> int:
+    """从点数 low 开始、连续 length 个点数各 count 张的签名"""
+    counts = 0
+    for rank in range(low, low + length):
+        counts += count * RANK_UNITS[rank]
+    return counts
+
+
+def enumerate_plays():
+    """枚举全部合法出牌，产生 (签名, 牌型, 主牌值, 长度)"""
+    unit = RANK_UNITS
+    normal_ranks = range(RANK_SMALL_JOKER)  # 不含王
     
-    def __init__(self, cards: List[Card], card_type: CardType = CardType.INVALID):
-        self.cards = sorted(cards)
-        self.card_type = card_type if card_type != CardType.INVALID else self._determine_type()
-        self.weight = self._calculate_weight()
+    for rank in range(RANK_COUNT):
+        yield unit[rank], CardType.SINGLE, rank + 3, 1
+    for rank in normal_ranks:
+        yield 2 * unit[rank], CardType.PAIR, rank + 3, 1
+        yield 3 * unit[rank], CardType.TRIPLE, rank + 3, 1
+        yield 4 * unit[rank], CardType.BOMB, rank + 3, 1
+    yield unit[RANK_SMALL_JOKER] + unit[RANK_BIG_JOKER], CardType.ROCKET, RANK_BIG_JOKER + 3, 1
     
-    def _determine_type(self) -> CardType:
-        """判断出牌类型"""
-        if not self.cards:
-            return CardType.INVALID
-        
-        card_count = len(self.cards)
-        value_counts = Counter([card.value.numeric_value for card in self.cards])
-        counts = sorted(value_counts.values(), reverse=True)
-        
-        # 火箭（双王）
-        if (card_count == 2 and 
-            set(card.value for card in self.cards) == {CardValue.SMALL_JOKER, CardValue.BIG_JOKER}):
-            return CardType.ROCKET
-        
-        # 炸弹
-        if card_count == 4 and counts == [4]:
-            return CardType.BOMB
-        
-        # 单张
-        if card_count == 1:
-            return CardType.SINGLE
-        
-        # 对子
-        if card_count == 2 and counts == [2]:
-            return CardType.PAIR
-        
-        # 三张
-        if card_count == 3 and counts == [3]:
-            return CardType.TRIPLE
-        
-        # 三带一
-        if card_count == 4 and counts == [3, 1]:
-            return CardType.TRIPLE_WITH_SINGLE
-        
-        # 三带对
-        if card_count == 5 and counts == [3, 2]:
-            return CardType.TRIPLE_WITH_PAIR
-        
-        # 四带二
-        if card_count == 6 and counts == [4, 1, 1]:
-            return CardType.FOUR_WITH_TWO
-        
-        # 顺子（5张以上连续单牌，不包含2和王）
-        if card_count >= 5 and self._is_straight():
-            return CardType.STRAIGHT
-        
-        # 连对（3对以上连续对子，不包含2和王）
-        if card_count >= 6 and card_count % 2 == 0 and self._is_pair_straight():
-            return CardType.PAIR_STRAIGHT
-        
-        # 飞机（连续三张）
-        if card_count >= 6 and self._is_triple_straight():
-            return CardType.TRIPLE_STRAIGHT
-        
-        return CardType.INVALID
+    for rank in normal_ranks:
+        others = [other for other in range(RANK_COUNT) if other != rank]
+        for other in others:
+            yield 3 * unit[rank] + unit[other], CardType.TRIPLE_WITH_SINGLE, rank + 3, 1
+            if other < RANK_SMALL_JOKER:
+                yield 3 * unit[rank] + 2 * unit[other], CardType.TRIPLE_WITH_PAIR, rank + 3, 1
+        for first, second in combinations(others, 2):
+            yield (4 * unit[rank] + unit[first] + unit[second],
+                   CardType.FOUR_WITH_TWO, rank + 3, 1)
     
-    def _is_straight(self) -> bool:
-        """判断是否为顺子"""
-        values = [card.value.numeric_value for card in self.cards]
-        
-        # 不能包含2和王
-        if any(v >= 15 for v in values):
-            return False
-        
-        # 检查是否连续
-        values = sorted(set(values))
-        if len(values) != len(self.cards):  # 有重复
-            return False
-        
-        for i in range(1, len(values)):
-            if values[i] - values[i-1] != 1:
-                return False
-        
-        return True
+    # 顺子、连对只能由 3..A 组成
+    for length in range(5, RANK_TWO + 1):
+        for low in range(RANK_TWO - length + 1):
+            yield _chain_counts(low, length, 1), CardType.STRAIGHT, low + length + 2, length
+    for length in range(3, MAX_HAND_SIZE // 2 + 1):
+        for low in range(RANK_TWO - length + 1):
+            yield _chain_counts(low, length, 2), CardType.PAIR_STRAIGHT, low + length + 2, length
     
-    def _is_pair_straight(self) -> bool:
-        """判断是否为连对"""
-        value_counts = Counter([card.value.numeric_value for card in self.cards])
-        
-        # 每个值都必须出现2次
-        if not all(count == 2 for count in value_counts.values()):
-            return False
-        
-        # 不能包含2和王
-        values = list(value_counts.keys())
-        if any(v >= 15 for v in values):
-            return False
-        
-        # 检查是否连续
-        values = sorted(values)
-        for i in range(1, len(values)):
-            if values[i] - values[i-1] != 1:
-                return False
-        
-        return True
+    # 飞机：不带、带同样数量的单张或对子，翅膀点数互不相同且不与机身重复
+    for length in range(2, MAX_HAND_SIZE // 3 + 1):
+        for low in range(RANK_TWO - length + 1):
+            body = _chain_counts(low, length, 3)
+            yield body, CardType.TRIPLE_STRAIGHT, low + 3, length
+            others = [rank for rank in range(RANK_COUNT) if not low <= rank < low + length]
+            if length * 4 <= MAX_HAND_SIZE:
+                for wings in combinations(others, length):
+                    yield (body + sum(unit[rank] for rank in wings),
+                           CardType.TRIPLE_STRAIGHT, low + 3, length)
+            if length * 5 <= MAX_HAND_SIZE:
+                pair_ranks = [rank for rank in others if rank < RANK_SMALL_JOKER]
+                for wings in combinations(pair_ranks, length):
+                    yield (body + sum(2 * unit[rank] for rank in wings),
+                           CardType.TRIPLE_STRAIGHT, low + 3, length)
+
+
+def _id_order(play: Tuple[int, CardType, int, int]) -> Tuple[int, int, int, int, int]:
+    """出牌编号的排序键：炸弹、火箭放最后，其余按 (张数, 牌型, 长度, 主牌值)"""
+    counts, card_type, main_value, length = play
+    special = _TYPE_ORDER[card_type] if card_type in (CardType.BOMB, CardType.ROCKET) else -1
+    return special, counts_size(counts), _TYPE_ORDER[card_type], length, main_value
+
+
+def _build_play_table() -> Dict[int, Tuple[CardType, int, int, int]]:
+    """构建签名到 (牌型, 主牌值, 长度, 出牌编号) 的分类表
+
+    排序是稳定的，同形状、同主牌值的出牌保持 iter_shape_moves 的产生顺序。
+    """
+    table = {}
+    plays = sorted(enumerate_plays(), key=_id_order)
+    for move_id, (counts, card_type, main_value, length) in enumerate(plays, 1):
+        table[counts] = (card_type, main_value, length, move_id)
+    return table
+
+
+PLAY_TABLE = _build_play_table()
+_INVALID_PLAY = (CardType.INVALID, 0, 0, NO_MOVE)
+
+MOVE_COUNT = len(PLAY_TABLE) + 1
+
+
+def _build_move_arrays() -> Tuple[array, List[CardType], array, array]:
+    """按编号索引的出牌签名、牌型、主牌值和长度（下标0为不出）"""
+    counts_by_id = array("Q", [0] * MOVE_COUNT)
+    types: List[CardType] = [CardType.INVALID] * MOVE_COUNT
+    mains = array("B", [0] * MOVE_COUNT)
+    lengths = array("B", [0] * MOVE_COUNT)
+    for counts, (card_type, main_value, length, move_id) in PLAY_TABLE.items():
+        counts_by_id[move_id] = counts
+        types[move_id] = card_type
+        mains[move_id] = main_value
+        lengths[move_id] = length
+    return counts_by_id, types, mains, lengths
+
+
+MOVE_COUNTS, MOVE_TYPES, MOVE_MAINS, MOVE_LENGTHS = _build_move_arrays()
+BOMB_START = MOVE_TYPES.index(CardType.BOMB)
+
+
+def _build_beat_ranges() -> Tuple[array, array]:
+    """每个编号能被哪一段编号压过：[BEAT_START, GROUP_END)，炸弹和火箭另算"""
+    beat_start = array("H", [0] * MOVE_COUNT)
+    group_end = array("H", [0] * MOVE_COUNT)
+    beat_start[NO_MOVE], group_end[NO_MOVE] = 1, MOVE_COUNT  # 任何出牌都能压过"没有出牌"
     
-    def _is_triple_straight(self) -> bool:
-        """判断是否为飞机"""
-        value_counts = Counter([card.value.numeric_value for card in self.cards])
-        triple_values = [v for v, count in value_counts.items() if count >= 3]
-        
-        if len(triple_values) < 2:
-            return False
-        
-        # 不能包含2和王
-        if any(v >= 15 for v in triple_values):
-            return False
-        
-        # 检查三张是否连续
-        triple_values = sorted(triple_values)
-        for i in range(1, len(triple_values)):
-            if triple_values[i] - triple_values[i-1] != 1:
-                return False
-        
-        return True
+    first = 1
+    while first < MOVE_COUNT:
+        if first >= BOMB_START:
+            end = MOVE_COUNT  # 炸弹和火箭是同一段，火箭的主牌值最大
+        else:
+            shape = (MOVE_TYPES[first], MOVE_LENGTHS[first], counts_size(MOVE_COUNTS[first]))
+            end = first + 1
+            while end < BOMB_START and (MOVE_TYPES[end], MOVE_LENGTHS[end],
+                                        counts_size(MOVE_COUNTS[end])) == shape:
+                end += 1
+        above = end
+        for move_id in range(end - 1, first - 1, -1):
+            if move_id + 1 < end and MOVE_MAINS[move_id + 1] > MOVE_MAINS[move_id]:
+                above = move_id + 1
+            beat_start[move_id] = above
+            group_end[move_id] = end
+        first = end
+    return beat_start, group_end
+
+
+BEAT_START, GROUP_END = _build_beat_ranges()
+
+
+def move_id_beats(move_id: int, last_id: int) -> bool:
+    """按编号判断出牌能否压过上家"""
+    return BEAT_START[last_id] <= move_id < GROUP_END[last_id] or move_id >= BOMB_START > last_id
+
+
+def classify_counts(counts: int) -> Tuple[CardType, int, int]:
+    """查表得到一手牌的 (牌型, 主牌值, 长度)，不合法时牌型为 INVALID"""
+    return PLAY_TABLE.get(counts, _INVALID_PLAY)[:3]
+
+
+# ---------------------------------------------------------------------------
+# 出牌生成
+#
+# 出牌按"形状" (牌型, 长度, 张数) 分组：只有形状相同的出牌才能互相比较，
+# 炸弹和火箭除外。接牌时只枚举与上家形状相同、主牌值更大的出牌，再加上炸弹和火箭。
+# ---------------------------------------------------------------------------
+Shape = Tuple[CardType, int, int]
+PLAY_SHAPES: List[Shape] = sorted(
+    {(card_type, length, counts_size(counts))
+     for counts, (card_type, _, length, _) in PLAY_TABLE.items()},
+    key=lambda shape: (shape[2], _TYPE_ORDER[shape[0]], shape[1]))
+_GROUP_NEED = {CardType.PAIR: 2, CardType.TRIPLE: 3, CardType.BOMB: 4}
+_CHAIN_NEED = {CardType.STRAIGHT: 1, CardType.PAIR_STRAIGHT: 2, CardType.TRIPLE_STRAIGHT: 3}
+
+
+def play_shape(counts: int) -> Optional[Shape]:
+    """出牌的形状，不合法时返回 None"""
+    card_type, _, length, _ = PLAY_TABLE.get(counts, _INVALID_PLAY)
+    if card_type == CardType.INVALID:
+        return None
+    return card_type, length, counts_size(counts)
+
+
+def iter_shape_moves(slots: List[int], shape: Shape, above: int = 0) -> Iterator[int]:
+    """产生手牌中指定形状、主牌值大于 above 的全部出牌签名，按主牌值从小到大"""
+    card_type, length, size = shape
+    unit = RANK_UNITS
+    start = max(above - 2, 0)  # 主牌值 rank + 3 > above
     
-    def _calculate_weight(self) -> int:
-        """计算牌型权重，用于比较大小"""
-        if self.card_type == CardType.INVALID:
-            return 0
-        
-        # 火箭最大
-        if self.card_type == CardType.ROCKET:
-            return 1000
-        
-        # 炸弹次之
-        if self.card_type == CardType.BOMB:
-            return 900 + max(card.value.numeric_value for card in self.cards)
-        
-        # 其他牌型按主牌值计算
-        main_value = self._get_main_value()
-        base_weights = {
-            CardType.SINGLE: 100,
-            CardType.PAIR: 200,
-            CardType.TRIPLE: 300,
-            CardType.TRIPLE_WITH_SINGLE: 400,
-            CardType.TRIPLE_WITH_PAIR: 500,
-            CardType.STRAIGHT: 600,
-            CardType.PAIR_STRAIGHT: 700,
-            CardType.TRIPLE_STRAIGHT: 800,
-            CardType.FOUR_WITH_TWO: 850
-        }
-        
-        return base_weights.get(self.card_type, 0) + main_value
+    if card_type == CardType.SINGLE:
+        for rank in range(start, RANK_COUNT):
+            if slots[rank]:
+                yield unit[rank]
     
-    def _get_main_value(self) -> int:
-        """获取主牌值（用于比较的关键值）"""
-        value_counts = Counter([card.value.numeric_value for card in self.cards])
-        
-        if self.card_type in [CardType.TRIPLE_WITH_SINGLE, CardType.TRIPLE_WITH_PAIR, 
-                             CardType.TRIPLE, CardType.TRIPLE_STRAIGHT]:
-            # 三张类型以三张的值为主
-            for value, count in value_counts.items():
-                if count >= 3:
-                    return value
-        
-        if self.card_type == CardType.FOUR_WITH_TWO:
-            # 四带二以四张的值为主
-            for value, count in value_counts.items():
-                if count == 4:
-                    return value
+    elif card_type in _GROUP_NEED:
+        need = _GROUP_NEED[card_type]
+        for rank in range(start, RANK_SMALL_JOKER):
+            if slots[rank] >= need:
+                yield need * unit[rank]
+    
+    elif card_type == CardType.ROCKET:
+        if slots[RANK_SMALL_JOKER] and slots[RANK_BIG_JOKER] and above < RANK_BIG_JOKER + 3:
+            yield unit[RANK_SMALL_JOKER] + unit[RANK_BIG_JOKER]
+    
+    elif card_type in (CardType.TRIPLE_WITH_SINGLE, CardType.TRIPLE_WITH_PAIR):
+        kicker = 1 if card_type == CardType.TRIPLE_WITH_SINGLE else 2
+        kicker_ranks = RANK_COUNT if kicker == 1 else RANK_SMALL_JOKER
+        for rank in range(start, RANK_SMALL_JOKER):
+            if slots[rank] >= 3:
+                body = 3 * unit[rank]
+                for other in range(kicker_ranks):
+                    if other != rank and slots[other] >= kicker:
+                        yield body + kicker * unit[other]
+    
+    elif card_type == CardType.FOUR_WITH_TWO:
+        for rank in range(start, RANK_SMALL_JOKER):
+            if slots[rank] == 4:
+                body = 4 * unit[rank]
+                others = [other for other in range(RANK_COUNT) if other != rank and slots[other]]
+                for first, second in combinations(others, 2):
+                    yield body + unit[first] + unit[second]
+    
+    elif card_type in _CHAIN_NEED:
+        need = _CHAIN_NEED[card_type]
+        wing = (size - need * length) // length if card_type == CardType.TRIPLE_STRAIGHT else 0
+        for low in range(RANK_TWO - length + 1):
+            main_value = low + 3 if card_type == CardType.TRIPLE_STRAIGHT else low + length + 2
+            if main_value <= above:
+                continue
+            if not all(slots[rank] >= need for rank in range(low, low + length)):
+                continue
+            body = _chain_counts(low, length, need)
+            if not wing:
+                yield body
+                continue
+            wing_ranks = [rank for rank in range(RANK_COUNT if wing == 1 else RANK_SMALL_JOKER)
+                          if slots[rank] >= wing and not low <= rank < low + length]
+            for wings in combinations(wing_ranks, length):
+                yield body + wing * sum(unit[rank] for rank in wings)
+
+
+def generate_moves(counts: int) -> Dict[Shape, List[int]]:
+    """生成手牌全部合法出牌，按形状索引"""
+    slots = counts_to_list(counts)
+    total = sum(slots)
+    index = {}
+    for shape in PLAY_SHAPES:
+        if shape[2] > total:
+            break
+        moves = list(iter_shape_moves(slots, shape))
+        if moves:
+            index[shape] = moves
+    return index
+
+
+def generate_responses(counts: int, last_counts: int) -> List[int]:
+    """生成能压过上家出牌的全部出牌：同形状更大的牌，以及炸弹和火箭"""
+    return list(_iter_responses(counts_to_list(counts), last_counts))
+
+
+class MoveOrder(Enum):
+    """出牌枚举顺序"""
+    GENERATED = "生成顺序"          # 按形状索引的顺序
+    CHEAPEST_FIRST = "最小优先"     # 按出牌编号：张数少、主牌值小的先出，炸弹和火箭放最后
+    FULL_CLEAR_FIRST = "出完优先"   # 能一次出完的排在最前，其余按最小优先
+
+
+_BOMB_SHAPE: Shape = (CardType.BOMB, 1, 4)
+_ROCKET_SHAPE: Shape = (CardType.ROCKET, 1, 2)
+
+
+# 依次枚举这些形状，产生的出牌编号恰好从小到大
+_CHEAPEST_SHAPES = [shape for shape in PLAY_SHAPES if shape not in (_BOMB_SHAPE, _ROCKET_SHAPE)]
+
+
+def move_beats(counts: int, last_counts: int) -> bool:
+    """按签名判断出牌能否压过上家"""
+    return move_id_beats(PLAY_TABLE[counts][3], PLAY_TABLE[last_counts][3])
+
+
+def _iter_leading_moves(slots: List[int], order: MoveOrder) -> Iterator[int]:
+    """主动出牌时按顺序产生全部出牌"""
+    total = sum(slots)
+    if order == MoveOrder.GENERATED:
+        for shape in PLAY_SHAPES:
+            if shape[2] > total:
+                return
+            yield from iter_shape_moves(slots, shape)
+        return
+    
+    for shape in _CHEAPEST_SHAPES:
+        if shape[2] > total:
+            break
+        yield from iter_shape_moves(slots, shape)
+    yield from iter_shape_moves(slots, _BOMB_SHAPE)
+    yield from iter_shape_moves(slots, _ROCKET_SHAPE)
+
+
+def _iter_responses(slots: List[int], last_counts: int) -> Iterator[int]:
+    """接牌时产生同形状更大的牌，再产生炸弹和火箭（本身就是最小优先的顺序）"""
+    card_type, main_value, length, _ = PLAY_TABLE[last_counts]
+    if card_type == CardType.ROCKET:
+        return
+    if card_type != CardType.BOMB:
+        yield from iter_shape_moves(slots, (card_type, length, counts_size(last_counts)), main_value)
+        main_value = 0
+    yield from iter_shape_moves(slots, _BOMB_SHAPE, main_value)
+    yield from iter_shape_moves(slots, _ROCKET_SHAPE)
+
+
+def iter_moves(counts: int, last_counts: Optional[int] = None,
+               order: MoveOrder = MoveOrder.GENERATED) -> Iterator[int]:
+    """惰性产生全部合法出牌签名；last_counts 为 None 表示主动出牌"""
+    slots = counts_to_list(counts)
+    full_clear = 0
+    if order == MoveOrder.FULL_CLEAR_FIRST and counts in PLAY_TABLE:
+        if last_counts is None or move_beats(counts, last_counts):
+            full_clear = counts
+            yield counts
+    
+    if last_counts is None:
+        moves = _iter_leading_moves(slots, order)
+    else:
+        moves = _iter_responses(slots, last_counts)
+    for move in moves:
+        if move != full_clear:
+            yield move
+
+
+def generate_move_ids(counts: int, last_id: int = NO_MOVE) -> array:
+    """按编号从小到大生成全部合法出牌（last_id 为上家出牌编号），结果为紧凑的 array('H')"""
+    last_counts = MOVE_COUNTS[last_id] if last_id else None
+    return array("H", [PLAY_TABLE[move][3] for move in iter_moves(counts, last_counts, MoveOrder.CHEAPEST_FIRST)])
+
+
+MOVE_CACHE_SIZE = 1 << 16  # 默认最多缓存的 (手牌, 上家出牌) 组合数
+
+
+class MoveCache:
+    """(手牌签名, 上家出牌编号) 到全部合法出牌编号的有界 LRU 缓存
+    
+    只缓存与花色无关的出牌编号，具体的牌由各玩家用自己的手牌组成，
+    所以同一进程内的所有对局和玩家可以共用一个缓存；读写都加锁，多线程共享也安全。
+    maxsize 限制的是条目数而不是内存：每个条目是一组出牌编号（每个2字节），
+    手牌越大条目越长，主动出牌时一个20张手牌的条目常有上百个编号。maxsize 为0时不缓存。
+    """
+    
+    def __init__(self, maxsize: int = MOVE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: 'OrderedDict[Tuple[int, int], array]' = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, counts: int, last_id: int = NO_MOVE) -> memoryview:
+        """按生成顺序返回全部合法出牌编号（不含"不出"），未命中时生成并存入缓存
+        
+        返回缓存条目的只读视图，调用方无法改动缓存的内容；需要修改时先复制。
+        """
+        key = (counts, last_id)
+        with self._lock:
+            moves = self._entries.get(key)
+            if moves is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return memoryview(moves).toreadonly()
+            self.misses += 1
+        
+        last_counts = MOVE_COUNTS[last_id] if last_id else None
+        moves = array("H", [PLAY_TABLE[move][3] for move in iter_moves(counts, last_counts)])
+        if self.maxsize > 0:
+            with self._lock:
+                self._entries[key] = moves
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return memoryview(moves).toreadonly()
+    
+    def clear(self):
+        """清空缓存和统计"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def stats(self) -> Dict[str, int]:
+        """命中、未命中、淘汰次数和当前大小"""
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "size": len(self._entries), "maxsize": self.maxsize}
+
+
+MOVE_CACHE = MoveCache()  # 进程内共享的默认缓存
+
+
+# ---------------------------------------------------------------------------
+# 手牌拆分评估
+#
+# "最少几手出完"：把手牌拆成尽量少的合法出牌。最小的点数一定属于某一手，
+# 所以只需枚举包含最小点数的出牌（作为主牌、顺子/飞机的起点或带牌），
+# 再对剩余手牌递归。结果以张数签名为键存入全局共享的有界缓存。
+# ---------------------------------------------------------------------------
+DECOMPOSE_CACHE_SIZE = 1 << 18
+
+
+def _plays_with_lowest(slots: List[int], low: int) -> Iterator[int]:
+    """产生手牌中所有包含最小点数 low 的出牌（不重复）"""
+    unit = RANK_UNITS
+    count = slots[low]
+    base = unit[low]
+    
+    # 以 low 为主牌
+    yield base
+    if low < RANK_SMALL_JOKER:
+        if count >= 2:
+            yield 2 * base
+        if count >= 3:
+            yield 3 * base
+            for other in range(low + 1, RANK_COUNT):
+                if slots[other]:
+                    yield 3 * base + unit[other]
+                    if slots[other] >= 2 and other < RANK_SMALL_JOKER:
+                        yield 3 * base + 2 * unit[other]
+        if count == 4:
+            yield 4 * base
+            others = [other for other in range(low + 1, RANK_COUNT) if slots[other]]
+            for first, second in combinations(others, 2):
+                yield 4 * base + unit[first] + unit[second]
+    elif low == RANK_SMALL_JOKER and slots[RANK_BIG_JOKER]:
+        yield base + unit[RANK_BIG_JOKER]
+    
+    # 以 low 开头的顺子、连对、飞机
+    for need, min_length in ((1, 5), (2, 3), (3, 2)):
+        length = 0
+        while low + length < RANK_TWO and slots[low + length] >= need:
+            length += 1
+            if length < min_length:
+                continue
+            body = _chain_counts(low, length, need)
+            yield body
+            if need == 3:
+                yield from _airplane_wings(slots, body, low, length, low + length, ())
+    
+    # low 作为带牌：主牌点数都比 low 大
+    for rank in range(low + 1, RANK_SMALL_JOKER):
+        if slots[rank] >= 3:
+            yield 3 * unit[rank] + base
+            if count >= 2 and low < RANK_SMALL_JOKER:
+                yield 3 * unit[rank] + 2 * base
+        if slots[rank] == 4:
+            for other in range(low + 1, RANK_COUNT):
+                if other != rank and slots[other]:
+                    yield 4 * unit[rank] + base + unit[other]
+    for start in range(low + 1, RANK_TWO - 1):
+        length = 0
+        while start + length < RANK_TWO and slots[start + length] >= 3:
+            length += 1
+            if length >= 2:
+                yield from _airplane_wings(slots, _chain_counts(start, length, 3), start, length,
+                                           low + 1, (low,))
+
+
+def _airplane_wings(slots: List[int], body: int, start: int, length: int,
+                    first_wing: int, fixed: Tuple[int, ...]) -> Iterator[int]:
+    """给机身加上翅膀：fixed 为必须包含的翅膀点数，其余从 first_wing 起的点数中选"""
+    for wing in (1, 2):
+        if (3 + wing) * length > MAX_HAND_SIZE:
+            continue
+        if any(slots[rank] < wing or (wing == 2 and rank >= RANK_SMALL_JOKER) for rank in fixed):
+            continue
+        choices = [rank for rank in range(first_wing, RANK_COUNT)
+                   if not start <= rank < start + length and slots[rank] >= wing
+                   and (wing == 1 or rank < RANK_SMALL_JOKER)]
+        for wings in combinations(choices, length - len(fixed)):
+            yield body + wing * sum(RANK_UNITS[rank] for rank in fixed + wings)
+
+
+@lru_cache(maxsize=DECOMPOSE_CACHE_SIZE)
+def min_plays(counts: int) -> int:
+    """手牌最少几手出完（不考虑被别人压）"""
+    if not counts:
+        return 0
+    slots = counts_to_list(counts)
+    low = next(rank for rank, count in enumerate(slots) if count)
+    best = MAX_HAND_SIZE
+    for play in _plays_with_lowest(slots, low):
+        plays = min_plays(counts - play) + 1
+        if plays < best:
+            best = plays
+            if best == 1:
+                break
+    return best
+
+
+def best_decomposition(counts: int) -> List[int]:
+    """一种手数最少的拆法，按出牌签名列出"""
+    plays = []
+    while counts:
+        slots = counts_to_list(counts)
+        low = next(rank for rank, count in enumerate(slots) if count)
+        target = min_plays(counts) - 1
+        play = next(play for play in _plays_with_lowest(slots, low) if min_plays(counts - play) == target)
+        plays.append(play)
+        counts -= play
+    return plays
+
+
+class Hand:
+    """手牌组合类"""
+    
+    def __init__(self, cards: List[Card], card_type: CardType = CardType.INVALID):
+        self.cards = sorted(cards)
+        self.counts = cards_to_counts(self.cards)
+        self.card_type, self.main_value, self.length, self.move_id = \
+            PLAY_TABLE.get(self.counts, _INVALID_PLAY)
+        # 牌型和出牌编号都由实际的牌决定，指定的牌型只用来校验
+        if card_type != CardType.INVALID and card_type != self.card_type:
+            raise ValueError(f"这手牌是{self.card_type.value}，不是{card_type.value}")
+    
+    @property
+    def weight(self) -> int:
+        """旧接口的权重，即出牌编号：同形状的出牌权重大的更大，炸弹和火箭大于其他一切出牌
         
-        # 其他类型以最大值为主
-        return max(card.value.numeric_value for card in self.cards)
+        不同形状之间的权重大小没有意义，大小比较请用 can_beat。
+        """
+        return self.move_id
     
     def can_beat(self, other: 'Hand') -> bool:
         """判断是否能压过另一手牌"""
         if not other or other.card_type == CardType.INVALID:
             return True
-        
-        # 火箭可以压任何牌
-        if self.card_type == CardType.ROCKET:
-            return True
-        
-        # 炸弹可以压非炸弹和火箭的牌
-        if self.card_type == CardType.BOMB and other.card_type not in [CardType.BOMB, CardType.ROCKET]:
-            return True
-        
-        # 相同类型才能比较（除了炸弹和火箭）
-        if self.card_type != other.card_type:
-            return False
-        
-        # 比较权重
-        return self.weight > other.weight
+        return move_id_beats(self.move_id, other.move_id)
     
     def __str__(self):
         cards_str = " ".join(str(card) for card in self.cards)
         return f"{cards_str} ({self.card_type.value})"
 
 
+# ---------------------------------------------------------------------------
+# 性能统计
+#
+# 可选的热点路径统计。Game、Player 和 simulate_game 只在设置了统计对象时才计时，
+# 未启用时每个热点只多一次 None 判断，可以常驻在正式运行的代码里。
+# ---------------------------------------------------------------------------
+
+class LatencyHistogram:
+    """按2的幂分桶的延迟直方图，第 i 桶统计耗时在 [2**(i-1), 2**i) 微秒的样本"""
+    
+    BUCKETS = 25  # 最后一桶收容约8秒以上的样本
+    
+    def __init__(self):
+        self.buckets = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0.0  # 秒
+        self.max = 0.0    # 秒
+    
+    def record(self, seconds: float):
+        """记入一个样本"""
+        self.buckets[min(int(seconds * 1e6).bit_length(), self.BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+    
+    def merge(self, other: 'LatencyHistogram'):
+        """合并另一个直方图"""
+        for i, n in enumerate(other.buckets):
+            self.buckets[i] += n
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+    
+    def percentile(self, q: float) -> float:
+        """q 分位数所在桶的上界（微秒），不超过最大样本"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target:
+                return min(float(1 << i), self.max * 1e6)
+        return self.max * 1e6
+    
+    def to_dict(self) -> Dict:
+        return {"buckets": list(self.buckets), "count": self.count, "total": self.total, "max": self.max}
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'LatencyHistogram':
+        histogram = cls()
+        histogram.buckets = list(data["buckets"])
+        histogram.count = data["count"]
+        histogram.total = data["total"]
+        histogram.max = data["max"]
+        return histogram
+    
+    def summary(self) -> Dict:
+        """便于输出的汇总（微秒），只列出非空的桶"""
+        return {
+            "count": self.count,
+            "mean_us": round(self.total / self.count * 1e6, 2) if self.count else 0.0,
+            "p50_us": round(self.percentile(0.5), 2),
+            "p99_us": round(self.percentile(0.99), 2),
+            "max_us": round(self.max * 1e6, 2),
+            "buckets": {f"<{1 << i}us": n for i, n in enumerate(self.buckets) if n},
+        }
+
+
+class Instrumentation:
+    """热点路径统计：计数器、累计耗时（秒）和延迟直方图
+    
+    Game 和 simulate_game 记录电脑玩家 turn（整回合）和 decision（决策）的延迟（人类玩家等待输入的
+    时间不计入），以及 rule_check（执行出牌与胜负判断）的耗时；Game 中电脑玩家的惰性生成和
+    Player.get_valid_hands 还记录 move_generation 的延迟。每次决策都记录手牌能组成的全部出牌数
+    hands_generated，接牌时另记其中能压过上家的 hands_beating，这两个计数不计入任何耗时。
+    
+    记录、合并和导出都加锁，可以在其他线程仍在记录时合并或导出（如服务器的统计查询）。
+    """
+    
+    def __init__(self):
+        self.counters: Dict[str, int] = {}
+        self.timers: Dict[str, float] = {}
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+    
+    def count(self, name: str, n: int = 1):
+        """计数器加 n"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+    
+    def add_time(self, name: str, seconds: float):
+        """累计耗时"""
+        with self._lock:
+            self.timers[name] = self.timers.get(name, 0.0) + seconds
+    
+    def observe(self, name: str, seconds: float):
+        """累计耗时并记入同名直方图"""
+        with self._lock:
+            self.timers[name] = self.timers.get(name, 0.0) + seconds
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = LatencyHistogram()
+            histogram.record(seconds)
+    
+    def merge(self, other: 'Instrumentation'):
+        """合并另一份统计（如锦标赛的各个分片），合并的是 other 此刻的快照"""
+        data = other.to_dict()
+        with self._lock:
+            for name, n in data["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + n
+            for name, seconds in data["timers"].items():
+                self.timers[name] = self.timers.get(name, 0.0) + seconds
+            for name, histogram in data["histograms"].items():
+                if name in self.histograms:
+                    self.histograms[name].merge(LatencyHistogram.from_dict(histogram))
+                else:
+                    self.histograms[name] = LatencyHistogram.from_dict(histogram)
+    
+    def to_dict(self) -> Dict:
+        """当前统计的快照"""
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "timers": dict(self.timers),
+                "histograms": {name: h.to_dict() for name, h in self.histograms.items()},
+            }
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Instrumentation':
+        instrumentation = cls()
+        instrumentation.counters = dict(data["counters"])
+        instrumentation.timers = dict(data["timers"])
+        instrumentation.histograms = {name: LatencyHistogram.from_dict(h)
+                                      for name, h in data["histograms"].items()}
+        return instrumentation
+    
+    def summary(self) -> Dict:
+        """便于输出的汇总结果"""
+        with self._lock:
+            return {
+                "counters": dict(sorted(self.counters.items())),
+                "seconds": {name: round(seconds, 6) for name, seconds in sorted(self.timers.items())},
+                "latency": {name: h.summary() for name, h in sorted(self.histograms.items())},
+            }
+    
+    def to_json(self) -> str:
+        return json.dumps(self.summary(), ensure_ascii=False, indent=2)
+
+
+def _record_move_counts(instrumentation: Instrumentation, counts: int, last_id: int = NO_MOVE,
+                        cache: Optional[MoveCache] = MOVE_CACHE):
+    """记录手牌能组成的全部出牌数，接牌时（last_id 不为 NO_MOVE）另记其中能压过上家的出牌数"""
+    if cache is not None:
+        instrumentation.count("hands_generated", len(cache.get(counts)))
+        if last_id:
+            instrumentation.count("hands_beating", len(cache.get(counts, last_id)))
+        return
+    instrumentation.count("hands_generated", sum(1 for _ in iter_moves(counts)))
+    if last_id:
+        instrumentation.count("hands_beating", sum(1 for _ in iter_moves(counts, MOVE_COUNTS[last_id])))
+
+
 class Player:
     """玩家类"""
     
     def __init__(self, name: str, is_human: bool = False):
         self.name = name
         self.is_human = is_human
-        self.cards: List[Card] = []
+        # 手牌只保存为张数签名和掩码（每个点数的花色位），排好序的 cards 仅在显示时生成
+        self.counts = 0  # 手牌的张数签名
+        self.mask = 0    # 手牌的54位掩码
         self.is_landlord = False
         self.is_winner = False
+        # 残局求解器（如 solver.EndgameSolver），设置后AI在残局中按明牌精确求解
+        self.endgame_solver = None
+        # 无界面策略函数（如 montecarlo.MonteCarloAI），设置后AI用它代替内置策略
+        self.strategy: Optional[Callable[['GameState'], int]] = None
+        self.instrumentation: Optional[Instrumentation] = None  # 性能统计，None 表示不统计
+        self.move_cache: Optional[MoveCache] = MOVE_CACHE  # get_valid_hands 的缓存，None 表示不缓存
+        self.tracker: Optional['CardTracker'] = None  # 所在对局的记牌器，由 Game 在发牌时设置
+    
+    @property
+    def cards(self) -> List[Card]:
+        """按点数排好序的手牌"""
+        return mask_to_cards(self.mask)
+    
+    @property
+    def card_count(self) -> int:
+        """手牌张数"""
+        return bin(self.mask).count("1")
     
     def add_cards(self, cards: List[Card]):
         """添加手牌"""
-        self.cards.extend(cards)
-        self.cards.sort()
+        for card in cards:
+            if not self.mask & card.bit:
+                self.counts += RANK_UNITS[card.rank]
+                self.mask |= card.bit
     
     def remove_cards(self, cards: List[Card]):
         """移除手牌"""
         for card in cards:
-            if card in self.cards:
-                self.cards.remove(card)
+            if self.mask & card.bit:
+                self.counts -= RANK_UNITS[card.rank]
+                self.mask ^= card.bit
     
     def has_cards(self, cards: List[Card]) -> bool:
         """检查是否拥有指定的牌"""
-        card_count = Counter(self.cards)
-        check_count = Counter(cards)
-        
-        for card, count in check_count.items():
-            if card_count[card] < count:
-                return False
-        return True
+        check_mask = cards_to_mask(cards)
+        # 同一张牌不可能出现两次
+        if len(cards) != bin(check_mask).count("1"):
+            return False
+        return self.mask & check_mask == check_mask
     
     def get_valid_hands(self, last_hand: Optional[Hand] = None) -> List[Hand]:
         """获取所有有效的出牌组合"""
-        valid_hands = []
-        
-        # 如果没有上家出牌，可以出任意有效组合
+        instrumentation = self.instrumentation
+        if instrumentation is None:
+            return self._valid_hands(last_hand)
+        
+        start = time.perf_counter()
+        hands = self._valid_hands(last_hand)
+        instrumentation.observe("move_generation", time.perf_counter() - start)
+        self.count_moves(last_hand)
+        return hands
+    
+    def count_moves(self, last_hand: Optional[Hand] = None):
+        """在统计中记录筛选前的候选数和能压过上家的出牌数，调用方保证不计入计时"""
+        _record_move_counts(self.instrumentation, self.counts,
+                            NO_MOVE if last_hand is None else last_hand.move_id, self.move_cache)
+    
+    def _valid_hands(self, last_hand: Optional[Hand]) -> List[Hand]:
+        """全部有效出牌，设置了缓存时按手牌签名和上家出牌编号查缓存"""
+        if self.move_cache is None:
+            return list(self.iter_valid_hands(last_hand))
+        
+        last_id = NO_MOVE if last_hand is None else last_hand.move_id
+        groups = self._group_by_rank()
+        hands = [self._make_hand(MOVE_COUNTS[move_id], groups)
+                 for move_id in self.move_cache.get(self.counts, last_id)]
+        if last_hand is not None:
+            hands.append(Hand([]))  # 不出
+        return hands
+    
+    def iter_valid_hands(self, last_hand: Optional[Hand] = None,
+                         order: MoveOrder = MoveOrder.GENERATED) -> Iterator[Hand]:
+        """按指定顺序逐个产生有效的出牌组合，调用方可以随时停止"""
+        # 如果没有上家出牌，可以出任意有效组合；否则只枚举能压过上家的牌
         if last_hand is None or last_hand.card_type == CardType.INVALID:
-            valid_hands = self._get_all_possible_hands()
+            last_counts = None
         else:
-            # 需要找能压过上家的牌
-            all_hands = self._get_all_possible_hands()
-            valid_hands = [hand for hand in all_hands if hand.can_beat(last_hand)]
+            last_counts = last_hand.counts
+        
+        groups = self._group_by_rank()
+        for move in iter_moves(self.counts, last_counts, order):
+            yield self._make_hand(move, groups)
         
         # 添加不出牌的选项（如果不是主动出牌）
         if last_hand is not None:
-            valid_hands.append(Hand([]))  # 空手表示不出
-        
-        return valid_hands
+            yield Hand([])  # 空手表示不出
     
-    def _get_all_possible_hands(self) -> List[Hand]:
-        """获取所有可能的出牌组合"""
-        hands = []
-        
-        # 单张
-        for card in self.cards:
-            hands.append(Hand([card]))
-        
-        # 对子
-        value_groups = {}
+    def _group_by_rank(self) -> List[List[Card]]:
+        """按点数索引分组手牌"""
+        groups: List[List[Card]] = [[] for _ in range(RANK_COUNT)]
         for card in self.cards:
-            if card.value not in value_groups:
-                value_groups[card.value] = []
-            value_groups[card.value].append(card)
-        
-        for value, cards in value_groups.items():
-            if len(cards) >= 2:
-                hands.append(Hand(cards[:2]))
-            if len(cards) >= 3:
-                hands.append(Hand(cards[:3]))
-            if len(cards) == 4:
-                hands.append(Hand(cards))
-        
-        # 复杂组合（三带一、三带对等）
-        hands.extend(self._get_complex_hands(value_groups))
-        
-        return hands
+            groups[card.rank].append(card)
+        return groups
     
-    def _get_complex_hands(self, value_groups: Dict) -> List[Hand]:
-        """获取复杂的牌型组合"""
-        hands = []
-        
-        triples = [(value, cards) for value, cards in value_groups.items() if len(cards) >= 3]
-        pairs = [(value, cards) for value, cards in value_groups.items() if len(cards) >= 2]
-        singles = [(value, cards) for value, cards in value_groups.items() if len(cards) >= 1]
-        
-        # 三带一
-        for triple_value, triple_cards in triples:
-            for single_value, single_cards in singles:
-                if triple_value != single_value:
-                    hand_cards = triple_cards[:3] + single_cards[:1]
-                    hands.append(Hand(hand_cards))
-        
-        # 三带对
-        for triple_value, triple_cards in triples:
-            for pair_value, pair_cards in pairs:
-                if triple_value != pair_value and len(pair_cards) >= 2:
-                    hand_cards = triple_cards[:3] + pair_cards[:2]
-                    hands.append(Hand(hand_cards))
-        
-        # 顺子（简化版，只检查连续5张）
-        single_values = sorted([value.numeric_value for value, cards in singles if value.numeric_value < 15])
-        for i in range(len(single_values) - 4):
-            if all(single_values[j] == single_values[i] + j - i for j in range(i, i + 5)):
-                straight_cards = []
-                for j in range(i, i + 5):
-                    for value, cards in singles:
-                        if value.numeric_value == single_values[j]:
-                            straight_cards.append(cards[0])
-                            break
-                if len(straight_cards) == 5:
-                    hands.append(Hand(straight_cards))
-        
-        return hands
+    def _make_hand(self, move: int, groups: List[List[Card]]) -> Hand:
+        """用手牌中的具体牌组成签名为 move 的出牌"""
+        cards = []
+        for rank, count in enumerate(counts_to_list(move)):
+            if count:
+                cards.extend(groups[rank][:count])
+        return Hand(cards)
+    
+    def decide_hand(self, last_hand: Optional[Hand] = None,
+                    state: Optional['GameState'] = None) -> Hand:
+        """根据上家出牌决定本回合出什么，state 为供策略函数和残局求解器使用的完整局面"""
+        if self.is_human:
+            return self._human_choose_hand(self.get_valid_hands(last_hand))
+        return self.ai_decide_hand(last_hand, state)
+    
+    def ai_decide_hand(self, last_hand: Optional[Hand] = None,
+                       state: Optional['GameState'] = None) -> Hand:
+        """按电脑策略决定出什么（人类玩家超时或断线时也可用它代出）"""
+        if self.strategy is not None and state is not None:
+            move = self.strategy(state)
+            return self._make_hand(move, self._group_by_rank()) if move else Hand([])
+        
+        if self.endgame_solver is not None and state is not None:
+            move = self.endgame_solver.choose_move(state)
+            if move is not None:
+                return self._make_hand(move, self._group_by_rank()) if move else Hand([])
+        
+        # AI的选择恰好是"出完优先"顺序中的第一个，无需生成完整列表
+        if self.instrumentation is None:
+            return next(self.iter_valid_hands(last_hand, MoveOrder.FULL_CLEAR_FIRST), Hand([]))
+        start = time.perf_counter()
+        hand = next(self.iter_valid_hands(last_hand, MoveOrder.FULL_CLEAR_FIRST), Hand([]))
+        self.instrumentation.observe("move_generation", time.perf_counter() - start)
+        return hand
     
     def choose_hand(self, valid_hands: List[Hand]) -> Hand:
         """选择要出的牌"""
         if self.is_human:
             return self._human_choose_hand(valid_hands)
-        else:
+        if self.instrumentation is None:
             return self._ai_choose_hand(valid_hands)
+        
+        start = time.perf_counter()
+        hand = self._ai_choose_hand(valid_hands)
+        self.instrumentation.observe("decision", time.perf_counter() - start)
+        return hand
     
     def _human_choose_hand(self, valid_hands: List[Hand]) -> Hand:
         """人类玩家选择出牌"""
@@ -430,6 +1207,25 @@ class Player:
             except (ValueError, IndexError):
                 print("输入无效，请重新选择")
     
+    def bid(self, highest: int = 0) -> int:
+        """叫地主：返回叫分（高于 highest，最多3分），0为不叫"""
+        if self.is_human:
+            return self._human_bid(highest)
+        return choose_bid(self.counts, highest)
+    
+    def _human_bid(self, highest: int) -> int:
+        """人类玩家叫分"""
+        print(f"\n{self.name}的手牌：")
+        print(" ".join(str(card) for card in self.cards))
+        choices = list(range(highest + 1, MAX_BID + 1))
+        if not choices:
+            return 0
+        while True:
+            choice = input(f"\n请叫分 ({'/'.join(map(str, choices))}，0为不叫): ").strip()
+            if choice.isdigit() and (int(choice) == 0 or int(choice) in choices):
+                return int(choice)
+            print("输入无效，请重新选择")
+    
     def _ai_choose_hand(self, valid_hands: List[Hand]) -> Hand:
         """AI玩家选择出牌"""
         if not valid_hands:
@@ -441,7 +1237,7 @@ class Player:
         
         # 检查是否能一次出完
         for hand in valid_hands:
-            if len(hand.cards) == len(self.cards):
+            if hand.counts == self.counts:
                 return hand
         
         # 排除不出牌的选项
@@ -450,18 +1246,457 @@ class Player:
         if not play_hands:
             return Hand([])  # 不出
         
-        # 选择最小的牌
-        return min(play_hands, key=lambda h: (len(h.cards), h.weight))
+        # 选择最小的牌（编号最小），炸弹和火箭留到最后
+        return min(play_hands, key=lambda h: h.move_id)
     
     def __str__(self):
         role = "地主" if self.is_landlord else "农民"
         return f"{self.name}({role})"
 
 
+# ---------------------------------------------------------------------------
+# 无界面对局引擎
+#
+# 只用张数签名表示三家手牌，不创建 Card/Hand 对象，也没有任何输入输出，
+# 供自我对弈和批量评估使用。策略是一个函数，接收当前局面、返回要出的签名（0为不出）。
+# ---------------------------------------------------------------------------
+PLAYER_COUNT = 3
+HAND_SIZE = 17
+MAX_TURNS = 1000  # 防止无限循环
+PASS = 0
+
+# 与 Game.create_deck 相同顺序的54张牌的点数，便于用同一随机数序列洗牌
+DECK_RANKS = [CARDS[card_id].rank for card_id in DECK_IDS]
+
+
+class GameResult(NamedTuple):
+    """一局游戏的结果"""
+    winner: int                    # 最先出完牌的座位，异常结束时为 -1
+    landlord: int                  # 地主座位
+    moves: List[Tuple[int, int]]   # 依次为 (座位, 出牌签名)，签名为0表示不出
+    turns: int                     # 回合数（含不出）
+    
+    @property
+    def landlord_won(self) -> bool:
+        return self.winner == self.landlord
+
+
+def _zobrist_tables():
+    """生成固定种子的 Zobrist 随机数表"""
+    rng = random.Random(0x5EED)
+    hands = [[[rng.getrandbits(64) for _ in range(5)] for _ in range(RANK_COUNT)]
+             for _ in range(PLAYER_COUNT)]
+    last_move = {move: rng.getrandbits(64) for move in PLAY_TABLE}
+    last_move[PASS] = 0
+    last_player = [rng.getrandbits(64) for _ in range(PLAYER_COUNT + 1)]  # 下标 -1 表示无人出牌
+    to_move = [rng.getrandbits(64) for _ in range(PLAYER_COUNT)]
+    return hands, last_move, last_player, to_move
+
+
+# 手牌每个点数每种张数、每种上家出牌、上家座位和轮到谁出牌各有一个随机数，局面哈希为它们的异或
+_ZOBRIST_HANDS, _ZOBRIST_LAST_MOVE, _ZOBRIST_LAST_PLAYER, _ZOBRIST_TO_MOVE = _zobrist_tables()
+
+
+def _zobrist_hand(seat: int, counts: int) -> int:
+    key = 0
+    table = _ZOBRIST_HANDS[seat]
+    for rank in range(RANK_COUNT):
+        key ^= table[rank][(counts >> (SLOT_BITS * rank)) & SLOT_MASK]
+    return key
+
+
+class GameState:
+    """对局局面：三家手牌签名、上家出牌和轮到谁出牌
+
+    play/undo 都是常数时间，并增量维护局面的 Zobrist 哈希 zobrist，
+    搜索时可以在同一个对象上反复走子、悔棋而无需复制。
+    """
+    
+    def __init__(self, hands: List[int], landlord: int, kitty: int = 0):
+        self.hands = list(hands)
+        self.landlord = landlord
+        self.kitty = kitty  # 亮出的地主牌签名，三家都知道
+        self.current = landlord  # 地主先出牌
+        self.last_move = PASS
+        self.last_player = -1
+        self.winner = -1
+        self.moves: List[Tuple[int, int]] = []
+        self._undo: List[Tuple[int, int, int, int]] = []
+        self.zobrist = self.compute_zobrist()
+        self.tracker: Optional['CardTracker'] = None  # 记牌器，设置后随 play/undo 增量更新
+    
+    def compute_zobrist(self) -> int:
+        """从头计算局面哈希"""
+        key = _ZOBRIST_TO_MOVE[self.current] ^ _ZOBRIST_LAST_PLAYER[self.last_player]
+        key ^= _ZOBRIST_LAST_MOVE[self.last_move]
+        for seat in range(PLAYER_COUNT):
+            key ^= _zobrist_hand(seat, self.hands[seat])
+        return key
+    
+    @property
+    def is_over(self) -> bool:
+        return self.winner >= 0
+    
+    def track(self) -> 'CardTracker':
+        """局面的记牌器：没有时按已有的出牌记录重放建立一个，之后随 play/undo 增量更新"""
+        if self.tracker is None:
+            tracker = CardTracker()
+            tracker.reveal_kitty(self.landlord, self.kitty)
+            last_move, last_player = PASS, -1
+            for seat, move in self.moves:
+                tracker.record(seat, move, last_move)
+                if move:
+                    last_move, last_player = move, seat
+                elif (seat + 1) % PLAYER_COUNT == last_player:
+                    last_move, last_player = PASS, -1
+            self.tracker = tracker
+        return self.tracker
+    
+    def iter_legal_moves(self, order: MoveOrder = MoveOrder.GENERATED) -> Iterator[int]:
+        """逐个产生当前玩家的合法出牌，接牌时最后产生"不出" """
+        last_move = self.last_move or None
+        yield from iter_moves(self.hands[self.current], last_move, order)
+        if last_move:
+            yield PASS
+    
+    def play(self, move: int):
+        """当前玩家出牌（0为不出）并轮到下一家"""
+        seat = self.current
+        if self.tracker is not None:
+            self.tracker.record(seat, move, self.last_move)
+        self._undo.append((seat, self.last_move, self.last_player, self.zobrist))
+        self.moves.append((seat, move))
+        key = self.zobrist ^ _ZOBRIST_TO_MOVE[seat]
+        
+        if move:
+            # 只有出牌涉及的点数需要更新手牌哈希
+            hand = self.hands[seat]
+            table = _ZOBRIST_HANDS[seat]
+            rank, rest = 0, move
+            while rest:
+                count = rest & SLOT_MASK
+                if count:
+                    old = (hand >> (SLOT_BITS * rank)) & SLOT_MASK
+                    key ^= table[rank][old] ^ table[rank][old - count]
+                rest >>= SLOT_BITS
+                rank += 1
+            self.hands[seat] = hand - move
+            key ^= _ZOBRIST_LAST_MOVE[self.last_move] ^ _ZOBRIST_LAST_MOVE[move]
+            key ^= _ZOBRIST_LAST_PLAYER[self.last_player] ^ _ZOBRIST_LAST_PLAYER[seat]
+            self.last_move = move
+            self.last_player = seat
+            if not self.hands[seat]:
+                self.winner = seat
+                self.zobrist = key ^ _ZOBRIST_TO_MOVE[seat]
+                return
+        
+        self.current = (seat + 1) % PLAYER_COUNT
+        
+        # 如果一圈都没人出牌，重新开始
+        if self.current == self.last_player:
+            key ^= _ZOBRIST_LAST_MOVE[self.last_move] ^ _ZOBRIST_LAST_PLAYER[self.last_player]
+            key ^= _ZOBRIST_LAST_PLAYER[-1]
+            self.last_move = PASS
+            self.last_player = -1
+        self.zobrist = key ^ _ZOBRIST_TO_MOVE[self.current]
+    
+    def undo(self):
+        """撤销最近一次 play"""
+        seat, move = self.moves.pop()
+        self.current, self.last_move, self.last_player, self.zobrist = self._undo.pop()
+        self.hands[seat] += move
+        if self.tracker is not None:
+            self.tracker.unrecord(seat, move, self.last_move)
+        self.winner = -1
+    
+    def result(self) -> GameResult:
+        return GameResult(self.winner, self.landlord, self.moves, len(self.moves))
+
+
+Strategy = Callable[[GameState], int]
+
+
+def simple_ai(state: GameState) -> int:
+    """与 Player 内置AI相同的策略：能出完就出完，否则出最小的牌"""
+    return next(state.iter_legal_moves(MoveOrder.FULL_CLEAR_FIRST), PASS)
+
+
+def _move_cost(move: int) -> int:
+    """与"最小优先"一致的出牌代价，即出牌编号：炸弹和火箭最贵，其次张数多、主牌值大的"""
+    return PLAY_TABLE[move][3]
+
+
+def decomposition_ai(state: GameState) -> int:
+    """按最少手数拆牌的策略：主动出牌时出拆法中最小的一手，
+    接牌时选剩余手数最少的出牌；压队友或拆坏牌型时选择不出"""
+    hand = state.hands[state.current]
+    if hand in PLAY_TABLE and (not state.last_move or move_beats(hand, state.last_move)):
+        return hand
+    
+    if not state.last_move:
+        return min(best_decomposition(hand), key=_move_cost)
+    
+    farmers = state.current != state.landlord and state.last_player != state.landlord
+    if farmers:
+        return PASS  # 不压队友
+    base = min_plays(hand)
+    best, best_key = PASS, None
+    for move in iter_moves(hand, state.last_move):
+        key = (min_plays(hand - move), _move_cost(move))
+        if best_key is None or key < best_key:
+            best, best_key = move, key
+    # 对手快出完时不惜拆牌也要压
+    if best_key is not None and (best_key[0] <= base or counts_size(state.hands[state.last_player]) <= 4):
+        return best
+    return PASS
+
+
+# ---------------------------------------------------------------------------
+# 叫地主
+#
+# 从随机的一家开始，每家按17张手牌的牌力依次叫1～3分或不叫（0），叫分必须高于
+# 当前最高分，叫到3分立即结束；一轮下来叫分最高的当地主，都不叫时由首叫者当地主。
+# ---------------------------------------------------------------------------
+MAX_BID = 3
+BID_THRESHOLDS = (12, 14, 16)  # 叫1、2、3分所需的最低牌力
+BID_CACHE_SIZE = 1 << 16
+
+
+@lru_cache(maxsize=BID_CACHE_SIZE)
+def hand_strength(counts: int) -> int:
+    """手牌牌力：大小王、2、A、K 和炸弹加分，权重按 simple_ai 自我对弈的地主胜率拟合"""
+    slots = counts_to_list(counts)
+    bombs = sum(1 for count in slots[:RANK_SMALL_JOKER] if count == 4)
+    bombs += slots[RANK_SMALL_JOKER] and slots[RANK_BIG_JOKER]
+    return (2 * bombs + 4 * slots[RANK_BIG_JOKER] + 3 * slots[RANK_SMALL_JOKER]
+            + 3 * slots[RANK_TWO] + 2 * slots[RANK_ACE] + slots[RANK_KING])
+
+
+def choose_bid(counts: int, highest: int = 0) -> int:
+    """按牌力叫分，叫不过当前最高分时不叫（0）"""
+    strength = hand_strength(counts)
+    bid = sum(1 for threshold in BID_THRESHOLDS if strength >= threshold)
+    return bid if bid > highest else 0
+
+
+def bid_landlord(hands: List[int], first: int) -> Tuple[int, int]:
+    """从座位 first 开始叫地主，返回 (地主座位, 叫分)，都不叫时首叫者以0分当地主"""
+    landlord, highest = first, 0
+    for i in range(PLAYER_COUNT):
+        seat = (first + i) % PLAYER_COUNT
+        bid = choose_bid(hands[seat], highest)
+        if bid:
+            landlord, highest = seat, bid
+            if bid == MAX_BID:
+                break
+    return landlord, highest
+
+
+def deal_counts(rng: random.Random) -> Tuple[List[int], int, int]:
+    """洗牌发牌并叫地主，返回 (三家手牌签名（地主已加地主牌）, 地主牌签名, 地主座位)
+
+    与 Game 用同一个种子时得到完全相同的牌局。
+    """
+    deck = list(DECK_RANKS)
+    rng.shuffle(deck)
+    hands = [0] * PLAYER_COUNT
+    for _ in range(HAND_SIZE):
+        for seat in range(PLAYER_COUNT):
+            hands[seat] += RANK_UNITS[deck.pop()]
+    kitty = sum(RANK_UNITS[rank] for rank in deck)
+    landlord, _ = bid_landlord(hands, rng.randrange(PLAYER_COUNT))
+    hands[landlord] += kitty
+    return hands, kitty, landlord
+
+
+# 每张牌（按编号）在张数签名中的单位
+CARD_UNITS = [RANK_UNITS[card.rank] for card in CARDS]
+
+
+def deal_deck(deck: Sequence[int], first: int) -> Tuple[List[int], int, int]:
+    """按洗好的牌编号发牌（与 Game.deal_cards 相同，从末尾依次发给三家，前3张为地主牌），
+    再从座位 first 开始叫地主，返回值同 deal_counts"""
+    hands = [0] * PLAYER_COUNT
+    position = len(deck)
+    for _ in range(HAND_SIZE):
+        for seat in range(PLAYER_COUNT):
+            position -= 1
+            hands[seat] += CARD_UNITS[deck[position]]
+    kitty = sum(CARD_UNITS[card_id] for card_id in deck[:position])
+    landlord, _ = bid_landlord(hands, first)
+    hands[landlord] += kitty
+    return hands, kitty, landlord
+
+
+def simulate_game(seed: Optional[int] = None,
+                  strategies: Optional[List[Strategy]] = None,
+                  instrumentation: Optional[Instrumentation] = None) -> GameResult:
+    """无界面地完整模拟一局，strategies 按座位给出策略，默认全部为 simple_ai"""
+    hands, kitty, landlord = deal_counts(random.Random(seed))
+    return _play_out(GameState(hands, landlord, kitty), strategies, instrumentation)
+
+
+def simulate_deal(deck: Sequence[int], first: int,
+                  strategies: Optional[List[Strategy]] = None,
+                  instrumentation: Optional[Instrumentation] = None) -> GameResult:
+    """用给定的牌局（发牌顺序的牌编号和首先叫分的座位）无界面模拟一局"""
+    hands, kitty, landlord = deal_deck(deck, first)
+    return _play_out(GameState(hands, landlord, kitty), strategies, instrumentation)
+
+
+def _play_out(state: GameState, strategies: Optional[List[Strategy]],
+              instrumentation: Optional[Instrumentation]) -> GameResult:
+    """从开局局面一直打到结束"""
+    if strategies is None:
+        strategies = [simple_ai] * PLAYER_COUNT
+    if instrumentation is not None:
+        return _simulate_instrumented(state, strategies, instrumentation)
+    while not state.is_over and len(state.moves) < MAX_TURNS:
+        state.play(strategies[state.current](state))
+    return state.result()
+
+
+def _simulate_instrumented(state: GameState, strategies: List[Strategy],
+                           instrumentation: Instrumentation) -> GameResult:
+    """与 simulate_game 的主循环相同，另外记录每回合的策略耗时、规则耗时和候选出牌数"""
+    clock = time.perf_counter
+    while not state.is_over and len(state.moves) < MAX_TURNS:
+        last_move = state.last_move
+        _record_move_counts(instrumentation, state.hands[state.current],
+                            PLAY_TABLE[last_move][3] if last_move else NO_MOVE)
+        start = clock()
+        move = strategies[state.current](state)
+        decided = clock()
+        state.play(move)
+        end = clock()
+        instrumentation.observe("decision", decided - start)
+        instrumentation.add_time("rule_check", end - decided)
+        instrumentation.observe("turn", end - start)
+    instrumentation.count("games")
+    instrumentation.count("turns", len(state.moves))
+    return state.result()
+
+
+FULL_DECK_COUNTS = sum(RANK_UNITS[rank] for rank in DECK_RANKS)  # 整副牌的签名
+_BOMB_RANKS = RANK_SMALL_JOKER  # 3..2 都可能成为炸弹
+_ROCKET_COUNTS = RANK_UNITS[RANK_SMALL_JOKER] + RANK_UNITS[RANK_BIG_JOKER]
+
+
+class CardTracker:
+    """记牌器：随每一手出牌增量更新，所有查询都是常数时间
+    
+    记录还没出过的牌、每名玩家出过的牌、每名玩家面对各牌型时不出的次数，
+    以及亮出的地主牌中还没出的部分。从某名玩家的角度看，"其他人手里的牌"
+    就是还没出过的牌减去自己的手牌。
+    """
+    
+    def __init__(self):
+        self.remaining = FULL_DECK_COUNTS  # 还没出过的牌
+        self.played = [0] * PLAYER_COUNT   # 每名玩家出过的牌
+        self.passes = [[0] * len(CardType) for _ in range(PLAYER_COUNT)]  # 按上家牌型计的不出次数
+        self.bombs_left = _BOMB_RANKS      # 四张都还没出过的点数个数
+        self.landlord = -1
+        self.kitty = 0
+        self.kitty_left = 0  # 地主手里一定还有的地主牌
+    
+    def reveal_kitty(self, landlord: int, kitty: int):
+        """地主确定、地主牌亮出"""
+        self.landlord = landlord
+        self.kitty = kitty
+        self.kitty_left = kitty
+    
+    def copy(self) -> 'CardTracker':
+        """独立的副本"""
+        tracker = CardTracker()
+        tracker.remaining = self.remaining
+        tracker.played = list(self.played)
+        tracker.passes = [list(passes) for passes in self.passes]
+        tracker.bombs_left = self.bombs_left
+        tracker.landlord = self.landlord
+        tracker.kitty = self.kitty
+        tracker.kitty_left = self.kitty_left
+        return tracker
+    
+    def record(self, seat: int, move: int, last_move: int = PASS):
+        """记入 seat 的一手出牌（0为不出），last_move 为当时的上家出牌"""
+        if not move:
+            if last_move:
+                self.passes[seat][_TYPE_ORDER[PLAY_TABLE[last_move][0]]] += 1
+            return
+        
+        self.played[seat] += move
+        remaining = self.remaining
+        rank = 0
+        rest = move
+        while rest:
+            count = rest & SLOT_MASK
+            if count:
+                shift = SLOT_BITS * rank
+                if rank < _BOMB_RANKS and (remaining >> shift) & SLOT_MASK == 4:
+                    self.bombs_left -= 1
+                if seat == self.landlord:
+                    known = (self.kitty_left >> shift) & SLOT_MASK
+                    self.kitty_left -= min(known, count) << shift
+            rest >>= SLOT_BITS
+            rank += 1
+        self.remaining = remaining - move
+    
+    def unrecord(self, seat: int, move: int, last_move: int = PASS):
+        """撤销最近一次 record 记入的同一手出牌（悔棋时使用）"""
+        if not move:
+            if last_move:
+                self.passes[seat][_TYPE_ORDER[PLAY_TABLE[last_move][0]]] -= 1
+            return
+        
+        played = self.played[seat] = self.played[seat] - move
+        remaining = self.remaining = self.remaining + move
+        rank = 0
+        rest = move
+        while rest:
+            if rest & SLOT_MASK:
+                shift = SLOT_BITS * rank
+                if rank < _BOMB_RANKS and (remaining >> shift) & SLOT_MASK == 4:
+                    self.bombs_left += 1
+                if seat == self.landlord:
+                    known = max(0, ((self.kitty >> shift) & SLOT_MASK) - ((played >> shift) & SLOT_MASK))
+                    self.kitty_left += (known - ((self.kitty_left >> shift) & SLOT_MASK)) << shift
+            rest >>= SLOT_BITS
+            rank += 1
+    
+    def remaining_count(self, rank: int) -> int:
+        """点数 rank 还有几张没出"""
+        return (self.remaining >> (SLOT_BITS * rank)) & SLOT_MASK
+    
+    def played_count(self, seat: int, rank: int) -> int:
+        """seat 出过几张点数为 rank 的牌"""
+        return (self.played[seat] >> (SLOT_BITS * rank)) & SLOT_MASK
+    
+    def pass_count(self, seat: int, card_type: CardType) -> int:
+        """seat 面对该牌型时不出的次数"""
+        return self.passes[seat][_TYPE_ORDER[card_type]]
+    
+    def unseen(self, hand: int) -> int:
+        """手牌为 hand 的玩家看不到的牌（其他两家手里的牌）"""
+        return self.remaining - hand
+    
+    def bomb_possible(self, rank: int, hand: int = 0) -> bool:
+        """手牌为 hand 的玩家看来，别人手里是否可能有点数 rank 的炸弹"""
+        return rank < _BOMB_RANKS and ((self.remaining - hand) >> (SLOT_BITS * rank)) & SLOT_MASK == 4
+    
+    def rocket_possible(self, hand: int = 0) -> bool:
+        """手牌为 hand 的玩家看来，别人手里是否可能有火箭"""
+        return counts_contains(self.remaining - hand, _ROCKET_COUNTS)
+
+
 class Game:
     """斗地主游戏主类"""
     
-    def __init__(self):
+    def __init__(self, seed: Optional[int] = None, verbose: bool = True,
+                 instrumentation: Optional[Instrumentation] = None, recorder=None):
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.verbose = verbose  # 为 False 时不输出任何信息
+        self.instrumentation = instrumentation  # 性能统计，开局时同步给每名玩家
         self.players: List[Player] = []
         self.deck: List[Card] = []
         self.landlord_cards: List[Card] = []  # 地主牌
@@ -470,27 +1705,35 @@ class Game:
         self.last_player_idx = -1
         self.game_over = False
         self.winner: Optional[Player] = None
+        self.moves: List[Tuple[int, int]] = []  # 依次为 (座位, 出牌签名)
+        self.tracker = CardTracker()  # 记牌器，发牌时同步给每名玩家
+        self.first_bidder = -1  # 首先叫分的座位
+        self.bids: List[Tuple[int, int]] = []  # 叫地主时依次的 (座位, 叫分)
+        self.highest_bid = 0
+        self.highest_bidder = -1
+        self.deck_ids: List[int] = []  # 洗好的牌（发牌前）的编号顺序
+        # 对局记录器（如 gamerecord.GameRecordWriter），设置后每局结束时调用其 write_game(self)
+        self.recorder = recorder
+    
+    def _log(self, *args):
+        """输出游戏信息"""
+        if self.verbose:
+            print(*args)
     
     def create_deck(self):
-        """创建一副牌"""
-        self.deck = []
-        
-        # 普通牌：每种花色A到K各一张，3到2各一张
-        for suit in [Suit.SPADES, Suit.HEARTS, Suit.DIAMONDS, Suit.CLUBS]:
-            for value in [CardValue.THREE, CardValue.FOUR, CardValue.FIVE, 
-                         CardValue.SIX, CardValue.SEVEN, CardValue.EIGHT, 
-                         CardValue.NINE, CardValue.TEN, CardValue.JACK, 
-                         CardValue.QUEEN, CardValue.KING, CardValue.ACE, CardValue.TWO]:
-                self.deck.append(Card(suit, value))
-        
-        # 大小王
-        self.deck.append(Card(Suit.JOKER, CardValue.SMALL_JOKER))
-        self.deck.append(Card(Suit.JOKER, CardValue.BIG_JOKER))
-        
-        random.shuffle(self.deck)
+        """创建一副牌并洗牌"""
+        ids = list(DECK_IDS)
+        self.rng.shuffle(ids)
+        self.deck_ids = ids
+        self.deck = [CARDS[card_id] for card_id in ids]
     
     def deal_cards(self):
         """发牌"""
+        for player in self.players:
+            player.tracker = self.tracker
+            if self.instrumentation is not None:
+                player.instrumentation = self.instrumentation
+        
         # 每人17张牌
         for i in range(17):
             for player in self.players:
@@ -501,50 +1744,125 @@ class Game:
         self.deck = self.deck[3:]
     
     def choose_landlord(self) -> Player:
-        """选择地主"""
-        print("\n=== 叫地主阶段 ===")
-        
-        # 简化版：随机选择地主
-        landlord = random.choice(self.players)
+        """叫地主并确定地主"""
+        self.start_bidding()
+        while not self.bidding_over:
+            self.submit_bid(self.players[self.current_player_idx].bid(self.highest_bid))
+        return self.settle_landlord()
+    
+    def start_bidding(self):
+        """随机选出首先叫分的玩家，开始叫地主"""
+        self._log("\n=== 叫地主阶段 ===")
+        self.first_bidder = self.rng.randrange(len(self.players))
+        self.current_player_idx = self.first_bidder
+        self.bids = []
+        self.highest_bid = 0
+        self.highest_bidder = -1
+    
+    @property
+    def bidding_over(self) -> bool:
+        """每人都叫过一次，或有人叫到了3分"""
+        return len(self.bids) == len(self.players) or self.highest_bid == MAX_BID
+    
+    def submit_bid(self, bid: int):
+        """当前玩家叫分（0为不叫），叫分不合法时抛出 ValueError"""
+        if self.bidding_over:
+            raise ValueError("叫地主已经结束")
+        if bid != 0 and not self.highest_bid < bid <= MAX_BID:
+            raise ValueError(f"叫分应高于{self.highest_bid}分且不超过{MAX_BID}分")
+        player = self.players[self.current_player_idx]
+        self.bids.append((self.current_player_idx, bid))
+        if bid:
+            self.highest_bid, self.highest_bidder = bid, self.current_player_idx
+            self._log(f"{player.name} 叫{bid}分")
+        else:
+            self._log(f"{player.name} 不叫")
+        self._next_player()
+    
+    def settle_landlord(self) -> Player:
+        """叫分最高者（都不叫时为首叫者）成为地主，拿走地主牌并先出牌"""
+        seat = self.highest_bidder if self.highest_bidder >= 0 else self.first_bidder
+        landlord = self.players[seat]
         landlord.is_landlord = True
         landlord.add_cards(self.landlord_cards)
+        self.tracker.reveal_kitty(seat, cards_to_counts(self.landlord_cards))
         
-        print(f"{landlord.name} 成为了地主！")
-        print(f"地主牌：{' '.join(str(card) for card in self.landlord_cards)}")
+        self._log(f"{landlord.name} 成为了地主！")
+        self._log(f"地主牌：{' '.join(str(card) for card in self.landlord_cards)}")
         
         # 地主先出牌
-        self.current_player_idx = self.players.index(landlord)
+        self.current_player_idx = seat
         
         return landlord
     
     def play_round(self):
         """进行一轮游戏"""
+        instrumentation = self.instrumentation
         current_player = self.players[self.current_player_idx]
+        if instrumentation is not None:
+            if not current_player.is_human:  # 人类玩家在 get_valid_hands 中记录
+                current_player.count_moves(self.last_hand)
+            start = time.perf_counter()
         
-        print(f"\n=== {current_player.name} 的回合 ===")
-        print(f"手牌数量：{len(current_player.cards)}")
-        
-        # 获取有效出牌
-        valid_hands = current_player.get_valid_hands(self.last_hand)
+        self._log(f"\n=== {current_player.name} 的回合 ===")
+        self._log(f"手牌数量：{current_player.card_count}")
         
-        if not valid_hands:
-            print(f"{current_player.name} 无法出牌")
-            self._next_player()
+        # 玩家选择出牌
+        chosen_hand = self.decide_current()
+        if instrumentation is None:
+            self._apply_hand(current_player, chosen_hand)
             return
         
-        # 玩家选择出牌
-        chosen_hand = current_player.choose_hand(valid_hands)
+        decided = time.perf_counter()
+        self._apply_hand(current_player, chosen_hand)
+        end = time.perf_counter()
+        instrumentation.add_time("rule_check", end - decided)
+        if not current_player.is_human:  # 人类玩家的回合包含等待输入的时间，不计入延迟
+            instrumentation.observe("decision", decided - start)
+            instrumentation.observe("turn", end - start)
+    
+    def decide_current(self, ai: bool = False) -> Hand:
+        """当前玩家决定出牌（人类玩家会等待命令行输入），ai 为 True 时一律按电脑策略代出"""
+        current_player = self.players[self.current_player_idx]
+        needs_state = current_player.strategy is not None or current_player.endgame_solver is not None
+        state = self.to_state() if needs_state else None
+        if ai:
+            return current_player.ai_decide_hand(self.last_hand, state)
+        return current_player.decide_hand(self.last_hand, state)
+    
+    def is_legal(self, hand: Hand) -> bool:
+        """当前玩家能否出这手牌（空手为不出，主动出牌时不能不出）"""
+        if not hand.cards:
+            return self.last_hand is not None
+        current_player = self.players[self.current_player_idx]
+        if hand.card_type == CardType.INVALID or not current_player.has_cards(hand.cards):
+            return False
+        return self.last_hand is None or hand.can_beat(self.last_hand)
+    
+    def submit_hand(self, hand: Hand):
+        """由外部（如网络对局）替当前玩家出牌，出牌不合法时抛出 ValueError"""
+        if self.game_over:
+            raise ValueError("对局已经结束")
+        if not self.is_legal(hand):
+            raise ValueError(f"不能出：{hand}" if hand.cards else "主动出牌时不能不出")
+        self._apply_hand(self.players[self.current_player_idx], hand)
+    
+    def _apply_hand(self, current_player: Player, chosen_hand: Hand):
+        """执行出牌、判断胜负并轮到下一家"""
+        self.moves.append((self.current_player_idx, chosen_hand.counts))
+        self.tracker.record(self.current_player_idx, chosen_hand.counts,
+                            self.last_hand.counts if self.last_hand is not None else PASS)
         
         if not chosen_hand.cards:
-            print(f"{current_player.name} 选择不出")
+            self._log(f"{current_player.name} 选择不出")
         else:
-            print(f"{current_player.name} 出牌：{chosen_hand}")
+            self._log(f"{current_player.name} 出牌：{chosen_hand}")
             current_player.remove_cards(chosen_hand.cards)
             self.last_hand = chosen_hand
             self.last_player_idx = self.current_player_idx
             
             # 检查是否获胜
-            if len(current_player.cards) == 0:
+            if current_player.counts == 0:
                 self.game_over = True
                 self.winner = current_player
                 return
@@ -553,40 +1871,74 @@ class Game:
         
         # 如果一圈都没人出牌，重新开始
         if self.current_player_idx == self.last_player_idx:
-            print("\n一圈都没人出牌，重新开始出牌")
+            self._log("\n一圈都没人出牌，重新开始出牌")
             self.last_hand = None
             self.last_player_idx = -1
     
+    def to_state(self) -> GameState:
+        """当前对局的明牌局面"""
+        landlord = next(i for i, player in enumerate(self.players) if player.is_landlord)
+        state = GameState([player.counts for player in self.players], landlord,
+                          cards_to_counts(self.landlord_cards))
+        state.moves = list(self.moves)
+        state.current = self.current_player_idx
+        if self.last_hand is not None and self.last_hand.cards:
+            state.last_move = self.last_hand.counts
+            state.last_player = self.last_player_idx
+        state.zobrist = state.compute_zobrist()
+        state.tracker = self.tracker.copy()
+        return state
+    
     def _next_player(self):
         """切换到下一个玩家"""
         self.current_player_idx = (self.current_player_idx + 1) % len(self.players)
     
     def print_game_state(self):
         """显示游戏状态"""
-        print("\n" + "="*50)
-        print("当前游戏状态：")
+        self._log("\n" + "="*50)
+        self._log("当前游戏状态：")
         for player in self.players:
             role = "地主" if player.is_landlord else "农民"
-            print(f"{player.name}({role})：{len(player.cards)}张牌")
+            self._log(f"{player.name}({role})：{player.card_count}张牌")
         
         if self.last_hand and self.last_hand.cards:
             last_player = self.players[self.last_player_idx]
-            print(f"上次出牌：{last_player.name} - {self.last_hand}")
+            self._log(f"上次出牌：{last_player.name} - {self.last_hand}")
         else:
-            print("上次出牌：无")
-        print("="*50)
+            self._log("上次出牌：无")
+        self._log("="*50)
     
     def check_winner(self):
         """检查游戏是否结束"""
         for player in self.players:
-            if len(player.cards) == 0:
+            if player.counts == 0:
                 self.game_over = True
                 self.winner = player
                 break
     
+    def run(self) -> GameResult:
+        """不经过命令行完整进行一局，返回对局结果（未设置玩家时使用三名AI）"""
+        if not self.players:
+            self.players = [Player(f"电脑{i + 1}", is_human=False) for i in range(PLAYER_COUNT)]
+        
+        self.create_deck()
+        self.deal_cards()
+        landlord = self.choose_landlord()
+        
+        while not self.game_over and len(self.moves) < MAX_TURNS:
+            self.play_round()
+        
+        if self.instrumentation is not None:
+            self.instrumentation.count("games")
+            self.instrumentation.count("turns", len(self.moves))
+        if self.recorder is not None:
+            self.recorder.write_game(self)
+        winner = self.players.index(self.winner) if self.winner else -1
+        return GameResult(winner, self.players.index(landlord), self.moves, len(self.moves))
+    
     def play(self):
         """开始游戏"""
-        print("欢迎来到斗地主游戏！")
+        self._log("欢迎来到斗地主游戏！")
         
         # 创建玩家
         self.players = [
@@ -608,15 +1960,17 @@ class Game:
             self.print_game_state()
             self.play_round()
             round_count += 1
+        if self.recorder is not None:
+            self.recorder.write_game(self)
         
         # 游戏结束
         if self.winner:
             if self.winner.is_landlord:
-                print(f"\n🎉 游戏结束！地主 {self.winner.name} 获胜！")
+                self._log(f"\n🎉 游戏结束！地主 {self.winner.name} 获胜！")
             else:
-                print(f"\n🎉 游戏结束！农民获胜！{self.winner.name} 最先出完牌！")
+                self._log(f"\n🎉 游戏结束！农民获胜！{self.winner.name} 最先出完牌！")
         else:
-            print("\n游戏异常结束")
+            self._log("\n游戏异常结束")
 
 
 def main():
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+斗地主对局记录
+
+紧凑的二进制追加格式，每局一条记录：种子、洗好的54张牌编号（发牌顺序）、地主座位、
+胜者和依次的出牌编号（座位按出牌顺序轮转，不必保存）。文件以魔数开头，之后每条记录
+带长度前缀，可以不断追加；写到一半中断留下的残缺记录在读取时被忽略，
+再次打开文件追加前被截掉。
+
+读取时可以把记录重放到无界面引擎中，得到任意回合之后的 GameState。
+
+    python3 gamerecord.py games.ddz --games 1000 --seed 0   # 模拟并追加记录
+    python3 gamerecord.py games.ddz --show                   # 列出文件中的对局
+"""
+
+import argparse
+import os
+import random
+import struct
+import sys
+from array import array
+from typing import BinaryIO, Iterator, List, NamedTuple, Optional, Union
+
+from doudizhu import (CARD_UNITS, DECK_IDS, HAND_SIZE, MOVE_COUNTS, PASS, PLAY_TABLE,
+                      PLAYER_COUNT, Game, GameResult, GameState, Strategy, counts_contains,
+                      move_beats, simulate_game)
+
+MAGIC = b"DDZR\x01"
+DECK_SIZE = len(DECK_IDS)
+NO_WINNER = 0xFF
+_LENGTH = struct.Struct("<I")
+# 标志、种子、地主、胜者、54张牌、出牌数
+_HEAD = struct.Struct(f"<BQBB{DECK_SIZE}sH")
+_HAS_SEED = 1
+
+
+class GameRecord(NamedTuple):
+    """一局的记录"""
+    seed: Optional[int]   # 洗牌种子，无法用64位无符号整数表示时为 None
+    deck: bytes           # 洗好的牌的编号，Game.deal_cards 从末尾依次发给三家，前3张为地主牌
+    landlord: int
+    winner: int           # 异常结束时为 -1
+    moves: array          # 依次的出牌编号（array('H')，0为不出）
+
+    def deal(self):
+        """发牌结果：(三家初始手牌签名（地主未加地主牌）, 地主牌签名)"""
+        ids = list(self.deck)
+        hands = [0] * PLAYER_COUNT
+        for _ in range(HAND_SIZE):
+            for seat in range(PLAYER_COUNT):
+                hands[seat] += CARD_UNITS[ids.pop()]
+        kitty = sum(CARD_UNITS[card_id] for card_id in ids)
+        return hands, kitty
+
+    def to_state(self, turns: Optional[int] = None) -> GameState:
+        """把前 turns 手出牌（默认全部）重放到无界面引擎，出牌不合法时抛出 ValueError"""
+        hands, kitty = self.deal()
+        hands[self.landlord] += kitty
+        state = GameState(hands, self.landlord, kitty)
+        for move_id in self.moves[:turns]:
+            move = MOVE_COUNTS[move_id]
+            if state.is_over or not _legal(state, move):
+                raise ValueError(f"第{len(state.moves) + 1}手出牌不合法")
+            state.play(move)
+        return state
+
+    def result(self) -> GameResult:
+        """与 Game.run / simulate_game 相同形式的对局结果"""
+        moves = self.to_state().moves
+        return GameResult(self.winner, self.landlord, moves, len(moves))
+
+
+def _legal(state: GameState, move: int) -> bool:
+    hand = state.hands[state.current]
+    if move == PASS:
+        return bool(state.last_move)
+    if move not in PLAY_TABLE or not counts_contains(hand, move):
+        return False
+    return not state.last_move or move_beats(move, state.last_move)
+
+
+def _seed_field(seed) -> Optional[int]:
+    if isinstance(seed, int) and 0 <= seed < 1 << 64:
+        return seed
+    return None
+
+
+def encode_payload(record: GameRecord) -> bytes:
+    """编码一条记录（不含长度前缀）"""
+    seed = _seed_field(record.seed)
+    flags = _HAS_SEED if seed is not None else 0
+    winner = record.winner if record.winner >= 0 else NO_WINNER
+    payload = _HEAD.pack(flags, seed or 0, record.landlord, winner, bytes(record.deck),
+                         len(record.moves))
+    return payload + struct.pack(f"<{len(record.moves)}H", *record.moves)
+
+
+def encode_record(record: GameRecord) -> bytes:
+    """编码一条记录（含长度前缀）"""
+    payload = encode_payload(record)
+    return _LENGTH.pack(len(payload)) + payload
+
+
+def decode_record(payload: bytes) -> GameRecord:
+    """解码一条记录（不含长度前缀）"""
+    flags, seed, landlord, winner, deck, count = _HEAD.unpack_from(payload)
+    moves = array("H")
+    moves.frombytes(payload[_HEAD.size:_HEAD.size + 2 * count])
+    if sys.byteorder == "big":
+        moves.byteswap()
+    return GameRecord(seed if flags & _HAS_SEED else None, deck, landlord,
+                      -1 if winner == NO_WINNER else winner, moves)
+
+
+def record_from_game(game: Game) -> GameRecord:
+    """从结束（或中止）的 Game 生成记录"""
+    landlord = next(i for i, player in enumerate(game.players) if player.is_landlord)
+    winner = game.players.index(game.winner) if game.winner else -1
+    moves = array("H", [PLAY_TABLE[move][3] if move else 0 for _, move in game.moves])
+    return GameRecord(_seed_field(game.seed), bytes(game.deck_ids), landlord, winner, moves)
+
+
+def record_from_simulation(seed: int, result: GameResult) -> GameRecord:
+    """从 simulate_game(seed) 的结果生成记录（同一种子的洗牌与 Game 完全相同）"""
+    deck = list(DECK_IDS)
+    random.Random(seed).shuffle(deck)
+    moves = array("H", [PLAY_TABLE[move][3] if move else 0 for _, move in result.moves])
+    return GameRecord(seed, bytes(deck), result.landlord, result.winner, moves)
+
+
+def _complete_end(f: BinaryIO) -> int:
+    """检查魔数并扫描长度前缀，返回最后一条完整记录的结束位置；空文件返回0"""
+    size = f.seek(0, os.SEEK_END)
+    f.seek(0)
+    head = f.read(len(MAGIC))
+    if head != MAGIC:
+        if MAGIC.startswith(head):  # 空文件或魔数只写了一半
+            return 0
+        raise ValueError("不是对局记录文件")
+    end = len(MAGIC)
+    while end + _LENGTH.size <= size:
+        f.seek(end)
+        (length,) = _LENGTH.unpack(f.read(_LENGTH.size))
+        if end + _LENGTH.size + length > size:
+            break
+        end += _LENGTH.size + length
+    return end
+
+
+class GameRecordWriter:
+    """流式追加写入对局记录，可直接作为 Game 的 recorder
+
+    target 为路径时追加到已有文件末尾：先检查魔数，并截掉上次写到一半中断留下的残缺记录。
+    """
+
+    def __init__(self, target: Union[str, BinaryIO]):
+        if isinstance(target, str):
+            try:
+                self.file = open(target, "r+b")
+            except FileNotFoundError:
+                self.file = open(target, "w+b")
+            self._owns_file = True
+            try:
+                end = _complete_end(self.file)
+            except ValueError:
+                self.file.close()
+                raise
+            self.file.seek(end)
+            self.file.truncate()
+        else:
+            self.file = target
+            self._owns_file = False
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+        self.count = 0
+
+    def write(self, record: GameRecord):
+        """追加一条记录"""
+        self.file.write(encode_record(record))
+        self.count += 1
+
+    def write_game(self, game: Game):
+        """追加一局 Game 的记录（Game 结束时自动调用）"""
+        self.write(record_from_game(game))
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        if self._owns_file:
+            self.file.close()
+        else:
+            self.file.flush()
+
+    def __enter__(self) -> 'GameRecordWriter':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def iter_records(source: Union[str, BinaryIO]) -> Iterator[GameRecord]:
+    """逐条读取记录；文件末尾写了一半的记录被忽略"""
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            yield from iter_records(f)
+        return
+
+    if source.read(len(MAGIC)) != MAGIC:
+        raise ValueError("不是对局记录文件")
+    while True:
+        prefix = source.read(_LENGTH.size)
+        if len(prefix) < _LENGTH.size:
+            return
+        (length,) = _LENGTH.unpack(prefix)
+        payload = source.read(length)
+        if len(payload) < length:
+            return
+        yield decode_record(payload)
+
+
+def record_games(path: str, games: int, seed: int = 0,
+                 strategies: Optional[List[Strategy]] = None) -> int:
+    """用种子 seed..seed+games-1 无界面模拟并把记录追加到 path，返回写入的局数"""
+    with GameRecordWriter(path) as writer:
+        for game_seed in range(seed, seed + games):
+            writer.write(record_from_simulation(game_seed, simulate_game(game_seed, strategies)))
+        return writer.count
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="斗地主对局记录")
+    parser.add_argument("path", help="记录文件")
+    parser.add_argument("--games", type=int, default=0, help="模拟并追加的对局数")
+    parser.add_argument("--seed", type=int, default=0, help="第一局的种子")
+    parser.add_argument("--show", action="store_true", help="列出文件中的对局")
+    args = parser.parse_args()
+
+    if args.games:
+        record_games(args.path, args.games, args.seed)
+        print(f"已追加{args.games}局，文件大小{os.path.getsize(args.path)}字节")
+    if args.show:
+        for i, record in enumerate(iter_records(args.path)):
+            outcome = "地主胜" if record.winner == record.landlord else "农民胜"
+            if record.winner < 0:
+                outcome = "未结束"
+            print(f"{i}: 种子={record.seed} 地主={record.landlord} {outcome} {len(record.moves)}手")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+斗地主蒙特卡洛确定化AI
+
+AI只能看到自己的手牌、亮出的地主牌、已经出过的牌和各家剩余张数。
+每次决策时反复抽样与这些信息一致的对手手牌（确定化），
+对每个候选出牌用无界面引擎以 simple_ai 模拟到终局，选胜率最高的一步。
+搜索随时可以停止：到达时间预算就返回目前最好的出牌。
+给定执行器（进程池或线程池）时，抽样和模拟分散到多个工作者上并行进行，
+到截止时刻还没完成的任务被放弃，只合并已完成的部分。
+"""
+
+import random
+import time
+from concurrent.futures import Executor, TimeoutError
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from doudizhu import (MAX_TURNS, PASS, PLAYER_COUNT, RANK_COUNT, RANK_UNITS, GameState, Shape,
+                      counts_from_list, counts_size, counts_to_list, play_shape, simple_ai)
+
+
+class Observation(NamedTuple):
+    """某个座位在决策时能看到的全部信息"""
+    seat: int
+    hand: int                 # 自己的手牌签名
+    landlord: int
+    sizes: List[int]          # 各家剩余张数
+    unseen: List[int]         # 其余两家手里的牌（按点数计的张数列表）
+    landlord_known: List[int]  # 地主手里一定还有的牌（未出完的地主牌）
+    last_move: int
+    last_player: int
+
+
+def observe(state: GameState) -> Observation:
+    """从完整局面中提取当前玩家能看到的信息
+
+    未见的牌和地主手里一定还有的牌都从局面的记牌器读取，记牌器随每手出牌增量更新，
+    不需要重新扫描出牌记录。
+    """
+    seat = state.current
+    tracker = state.track()
+    hand = state.hands[seat]
+    unseen = counts_to_list(tracker.unseen(hand))
+    if seat != state.landlord:
+        landlord_known = counts_to_list(tracker.kitty_left)
+    else:
+        landlord_known = [0] * RANK_COUNT
+    sizes = [counts_size(h) for h in state.hands]
+    return Observation(seat, hand, state.landlord, sizes, unseen, landlord_known,
+                       state.last_move, state.last_player)
+
+
+def sample_hands(view: Observation, rng: random.Random) -> List[int]:
+    """抽样一组与观察一致的三家手牌签名"""
+    hands = [0] * PLAYER_COUNT
+    hands[view.seat] = view.hand
+    others = [seat for seat in range(PLAYER_COUNT) if seat != view.seat]
+
+    pool = []
+    for rank in range(RANK_COUNT):
+        pool.extend([rank] * (view.unseen[rank] - view.landlord_known[rank]))
+    rng.shuffle(pool)
+
+    for seat in others:
+        need = view.sizes[seat]
+        counts = 0
+        if seat == view.landlord:
+            counts = counts_from_list(view.landlord_known)
+            need -= sum(view.landlord_known)
+        for rank in pool[:need]:
+            counts += RANK_UNITS[rank]
+        del pool[:need]
+        hands[seat] = counts
+    return hands
+
+
+def candidate_moves(state: GameState, max_candidates: int) -> List[int]:
+    """候选出牌：能出完的一步、每种形状中最小的一手，以及"不出" """
+    candidates = []
+    seen_shapes: Dict[Shape, int] = {}
+    hand = state.hands[state.current]
+    for move in state.iter_legal_moves():
+        if move == hand:
+            candidates.insert(0, move)
+            continue
+        if move == PASS:
+            continue
+        shape = play_shape(move)
+        if shape not in seen_shapes:
+            seen_shapes[shape] = move
+            candidates.append(move)
+    candidates = candidates[:max_candidates]
+    if state.last_move:
+        candidates.append(PASS)
+    return candidates
+
+
+def _playout(view: Observation, hands: List[int], move: int) -> bool:
+    """在确定化后的局面上走 move，再用 simple_ai 模拟到底，返回己方是否获胜"""
+    state = GameState(hands, view.landlord)
+    state.current = view.seat
+    state.last_move = view.last_move
+    state.last_player = view.last_player
+    state.play(move)
+    while not state.is_over and len(state.moves) < MAX_TURNS:
+        state.play(simple_ai(state))
+    if not state.is_over:
+        return False
+    return (state.winner == view.landlord) == (view.seat == view.landlord)
+
+
+def run_playouts(view: Observation, candidates: List[int], seed: int, deadline: float,
+                 max_rounds: Optional[int] = None, min_rounds: int = 0) -> Tuple[List[int], List[int]]:
+    """在 time.monotonic() 到达 deadline 之前反复确定化并模拟，返回每个候选的 (胜局数, 模拟数)
+
+    每一轮抽一次手牌，所有候选都在同一组手牌上各模拟一局，减小比较时的方差。
+    按上一轮的耗时估计，来不及在 deadline 前完成的一轮不再开始；min_rounds 轮不受时间限制。
+    """
+    rng = random.Random(seed)
+    wins = [0] * len(candidates)
+    played = [0] * len(candidates)
+    rounds = 0
+    round_time = 0.0
+    now = time.monotonic()
+    while rounds < min_rounds or (now + round_time < deadline
+                                  and (max_rounds is None or rounds < max_rounds)):
+        hands = sample_hands(view, rng)
+        for i, move in enumerate(candidates):
+            wins[i] += _playout(view, hands, move)
+            played[i] += 1
+        rounds += 1
+        start, now = now, time.monotonic()
+        round_time = now - start
+    return wins, played
+
+
+class MonteCarloAI:
+    """蒙特卡洛确定化策略，可直接作为无界面引擎或 Player.strategy 的策略函数"""
+
+    def __init__(self, time_limit: float = 0.1, max_candidates: int = 12,
+                 executor: Optional[Executor] = None, workers: int = 1,
+                 max_rounds: Optional[int] = None, seed: Optional[int] = None):
+        self.time_limit = time_limit          # 每次决策的时间预算（秒）
+        self.max_candidates = max_candidates  # 参与模拟的候选出牌数上限
+        self.executor = executor              # 并行执行模拟的执行器，None 表示在本进程内模拟
+        self.workers = workers                # 使用执行器时分成多少份任务
+        self.max_rounds = max_rounds          # 每份任务的确定化轮数上限，None 表示只受时间限制
+        self.rng = random.Random(seed)
+        self.last_stats: List[Tuple[int, int, int]] = []  # 最近一次决策各候选的 (出牌, 胜局, 模拟数)
+
+    def __call__(self, state: GameState) -> int:
+        return self.choose_move(state)
+
+    def choose_move(self, state: GameState) -> int:
+        """在时间预算内选出胜率最高的出牌"""
+        candidates = candidate_moves(state, self.max_candidates)
+        if len(candidates) == 1 or candidates[0] == state.hands[state.current]:
+            self.last_stats = []
+            return candidates[0]  # 唯一选择或能直接出完
+
+        # 整个决策共用一个截止时刻，任务在执行器里排队的时间也计入预算
+        deadline = time.monotonic() + self.time_limit
+        view = observe(state)
+        wins = [0] * len(candidates)
+        played = [0] * len(candidates)
+        if self.executor is None:
+            parts = [run_playouts(view, candidates, self.rng.getrandbits(32), deadline,
+                                  self.max_rounds, min_rounds=1)]
+        else:
+            futures = [self.executor.submit(run_playouts, view, candidates, self.rng.getrandbits(32),
+                                            deadline, self.max_rounds)
+                       for _ in range(self.workers)]
+            parts = []
+            for future in futures:
+                try:
+                    parts.append(future.result(timeout=max(deadline - time.monotonic(), 0.0)))
+                except TimeoutError:
+                    future.cancel()  # 还没开始的任务不再执行；已在执行的到截止时刻自行结束
+        for part_wins, part_played in parts:
+            for i in range(len(candidates)):
+                wins[i] += part_wins[i]
+                played[i] += part_played[i]
+
+        self.last_stats = list(zip(candidates, wins, played))
+        if not any(played):
+            return simple_ai(state)  # 预算内没有任何模拟完成
+        # 按胜率选择，胜率相同时保留靠前（更便宜）的出牌
+        best = max(range(len(candidates)),
+                   key=lambda i: (wins[i] / played[i] if played[i] else -1.0, -i))
+        return candidates[best]
+
+
+_DEFAULT_AI = MonteCarloAI()
+
+
+def montecarlo_ai(state: GameState) -> int:
+    """使用默认参数的蒙特卡洛策略（模块级函数，可传给锦标赛工作进程）"""
+    return _DEFAULT_AI.choose_move(state)
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+斗地主批量策略推理
+
+许多对局同时进行时，把各局待做的AI决策收集起来一次性评估：每个候选出牌（含不出）
+提取一行特征，整批特征交给评估器做一次向量化打分，再按局取得分最高的出牌，
+让各局带着结果继续。DecisionScheduler 用最大批量和最长等待时间在吞吐和延迟之间取舍。
+
+评估器是一个函数：接收 (M, FEATURE_COUNT) 的特征矩阵，返回 M 个得分。
+安装了 NumPy 时特征矩阵是 float64 的 ndarray，否则是嵌套列表（结果相同，只是慢）。
+
+    python3 policy.py --games 1000 --batch 256 --wait 0.001
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from doudizhu import (BOMB_START, MAX_TURNS, MOVE_CACHE, MOVE_COUNTS, NO_MOVE, PASS,
+                      PLAY_TABLE, PLAYER_COUNT, RANK_COUNT, GameResult, GameState,
+                      Instrumentation, Strategy, counts_size, counts_to_list, deal_counts)
+
+try:
+    import numpy as np
+    from batch import from_signatures
+except ImportError:  # NumPy 是可选依赖，没有时逐行计算
+    np = None
+
+# 每个候选出牌的特征：出牌后剩下的各点数张数、出牌的各点数张数，以及以下各项
+FEATURE_NAMES: List[str] = (
+    [f"left_{rank}" for rank in range(RANK_COUNT)]
+    + [f"move_{rank}" for rank in range(RANK_COUNT)]
+    + [
+        "pass",           # 不出
+        "bomb",           # 炸弹或火箭
+        "cards_left",     # 出牌后剩余张数
+        "clears",         # 出完
+        "responding",     # 是否在接牌
+        "over_teammate",  # 压队友的牌
+        "landlord",       # 自己是地主
+        "opponent_min",   # 对手中最少的剩余张数
+    ]
+)
+FEATURE_COUNT = len(FEATURE_NAMES)
+_COLUMN = {name: i for i, name in enumerate(FEATURE_NAMES)}
+_STATE_FEATURES = ["responding", "landlord", "opponent_min"]  # 同一局的候选相同
+
+Evaluator = Callable[[Sequence], Sequence[float]]
+
+
+def _default_weights() -> List[float]:
+    weights = [0.0] * FEATURE_COUNT
+    for rank in range(RANK_COUNT):
+        weights[_COLUMN[f"move_{rank}"]] = -0.05 * rank  # 先出小牌
+    weights[_COLUMN["pass"]] = -2.0
+    weights[_COLUMN["bomb"]] = -6.0
+    weights[_COLUMN["cards_left"]] = -1.0
+    weights[_COLUMN["clears"]] = 100.0
+    weights[_COLUMN["over_teammate"]] = -4.0
+    return weights
+
+
+DEFAULT_WEIGHTS = _default_weights()
+
+
+class LinearPolicy:
+    """线性评估器：得分为特征与权重的点积，可以直接替换为学习得到的权重"""
+
+    def __init__(self, weights: Optional[Sequence[float]] = None):
+        self.weights = list(DEFAULT_WEIGHTS if weights is None else weights)
+        if len(self.weights) != FEATURE_COUNT:
+            raise ValueError(f"需要{FEATURE_COUNT}个权重，实际为{len(self.weights)}")
+
+    def __call__(self, features):
+        if np is not None:
+            return features @ np.asarray(self.weights, dtype=np.float64)
+        return [sum(f * w for f, w in zip(row, self.weights)) for row in features]
+
+
+def candidate_moves(state: GameState) -> List[int]:
+    """当前玩家的全部候选出牌签名，接牌时最后一个是不出"""
+    last_id = PLAY_TABLE[state.last_move][3] if state.last_move else NO_MOVE
+    moves = [MOVE_COUNTS[move_id] for move_id in MOVE_CACHE.get(state.hands[state.current], last_id)]
+    if state.last_move:
+        moves.append(PASS)
+    return moves
+
+
+def _state_features(state: GameState) -> Tuple[int, int, int, bool]:
+    """(responding, landlord, opponent_min, teammate_led)"""
+    seat = state.current
+    opponents = [other for other in range(PLAYER_COUNT) if other != seat and
+                 (seat == state.landlord or other == state.landlord)]
+    teammate_led = bool(state.last_move) and state.last_player not in opponents
+    return (int(bool(state.last_move)), int(seat == state.landlord),
+            min(counts_size(state.hands[other]) for other in opponents), teammate_led)
+
+
+def featurize(states: Sequence[GameState], candidates: Sequence[List[int]]):
+    """把各局的全部候选出牌提取成一个 (M, FEATURE_COUNT) 的特征矩阵"""
+    hands, moves, state_rows, over_teammate = [], [], [], []
+    for state, moves_of_state in zip(states, candidates):
+        hand = state.hands[state.current]
+        *row, teammate_led = _state_features(state)
+        hands.extend([hand] * len(moves_of_state))
+        moves.extend(moves_of_state)
+        state_rows.extend([row] * len(moves_of_state))
+        over_teammate.extend(int(teammate_led and move != PASS) for move in moves_of_state)
+
+    if np is None:
+        return [_feature_row(hand, move, row, teammate)
+                for hand, move, row, teammate in zip(hands, moves, state_rows, over_teammate)]
+
+    hand_array = np.array(hands, dtype=np.uint64)
+    move_array = np.array(moves, dtype=np.uint64)
+    left = from_signatures(hand_array - move_array)
+    played = from_signatures(move_array)
+    move_ids = np.array([PLAY_TABLE[move][3] if move else NO_MOVE for move in moves])
+    features = np.zeros((len(moves), FEATURE_COUNT), dtype=np.float64)
+    features[:, :RANK_COUNT] = left
+    features[:, RANK_COUNT:2 * RANK_COUNT] = played
+    features[:, _COLUMN["pass"]] = move_array == 0
+    features[:, _COLUMN["bomb"]] = move_ids >= BOMB_START
+    cards_left = left.sum(axis=1)
+    features[:, _COLUMN["cards_left"]] = cards_left
+    features[:, _COLUMN["clears"]] = cards_left == 0
+    features[:, _COLUMN["over_teammate"]] = over_teammate
+    features[:, [_COLUMN[name] for name in _STATE_FEATURES]] = np.array(state_rows).reshape(-1, 3)
+    return features
+
+
+def _feature_row(hand: int, move: int, state_row: List[int], over_teammate: int) -> List[float]:
+    """不用 NumPy 时的一行特征，与向量化版本相同"""
+    left = counts_to_list(hand - move)
+    row = [float(n) for n in left + counts_to_list(move)]
+    cards_left = sum(left)
+    row += [float(move == PASS), float(move != PASS and PLAY_TABLE[move][3] >= BOMB_START),
+            float(cards_left), float(cards_left == 0)]
+    row += [0.0] * (FEATURE_COUNT - len(row))
+    row[_COLUMN["over_teammate"]] = float(over_teammate)
+    for name, value in zip(_STATE_FEATURES, state_row):
+        row[_COLUMN[name]] = float(value)
+    return row
+
+
+def choose_moves(states: Sequence[GameState], evaluator: Evaluator) -> List[int]:
+    """一次评估多局的全部候选出牌，返回每局得分最高的出牌（同分时取靠前的）"""
+    candidates = [candidate_moves(state) for state in states]
+    scores = evaluator(featurize(states, candidates))
+    if np is not None:
+        scores = np.asarray(scores)
+    chosen, start = [], 0
+    for moves in candidates:
+        end = start + len(moves)
+        if np is not None:
+            best = int(np.argmax(scores[start:end]))
+        else:
+            segment = scores[start:end]
+            best = max(range(len(moves)), key=lambda i: (segment[i], -i))
+        chosen.append(moves[best])
+        start = end
+    return chosen
+
+
+class PolicyAI:
+    """逐局决策的策略函数，结果与批量调度完全相同（可用作 Player.strategy 或 simulate_game 的策略）"""
+
+    def __init__(self, evaluator: Optional[Evaluator] = None):
+        self.evaluator = evaluator or LinearPolicy()
+
+    def __call__(self, state: GameState) -> int:
+        return choose_moves([state], self.evaluator)[0]
+
+
+class DecisionScheduler:
+    """收集多局的待定决策，凑满 max_batch_size 或等待超过 max_wait 秒时批量评估"""
+
+    def __init__(self, evaluator: Optional[Evaluator] = None, max_batch_size: int = 256,
+                 max_wait: float = 0.001, instrumentation: Optional[Instrumentation] = None):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size 至少为1")
+        self.evaluator = evaluator or LinearPolicy()
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.instrumentation = instrumentation or Instrumentation()
+        self.largest_batch = 0
+        self._pending: List[Tuple[GameState, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    async def decide(self, state: GameState) -> int:
+        """提交一个决策并等待批量评估的结果（等待期间不能修改 state）"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((state, future, time.perf_counter()))
+        if len(self._pending) >= self.max_batch_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self.flush)
+        return await future
+
+    def flush(self):
+        """立即评估全部待定决策"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch = self._pending[:self.max_batch_size]
+            del self._pending[:self.max_batch_size]
+            self._evaluate(batch)
+
+    def _evaluate(self, batch: List[Tuple[GameState, asyncio.Future, float]]):
+        start = time.perf_counter()
+        try:
+            moves = choose_moves([state for state, _, _ in batch], self.evaluator)
+        except Exception as error:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        end = time.perf_counter()
+        instrumentation = self.instrumentation
+        instrumentation.observe("batch_eval", end - start)
+        instrumentation.count("batches")
+        instrumentation.count("decisions", len(batch))
+        self.largest_batch = max(self.largest_batch, len(batch))
+        for (_, future, submitted), move in zip(batch, moves):
+            instrumentation.observe("decision_wait", end - submitted)
+            if not future.done():
+                future.set_result(move)
+
+    def stats(self):
+        """批量和延迟统计"""
+        counters = self.instrumentation.counters
+        batches = counters.get("batches", 0)
+        return {
+            "mean_batch_size": round(counters.get("decisions", 0) / batches, 2) if batches else 0.0,
+            "largest_batch": self.largest_batch,
+            **self.instrumentation.summary(),
+        }
+
+
+async def play_game(seed: Optional[int], scheduler: DecisionScheduler,
+                    strategies: Optional[List[Optional[Strategy]]] = None) -> GameResult:
+    """与 simulate_game 相同的一局，座位策略为 None（默认全部）时由调度器决策"""
+    hands, kitty, landlord = deal_counts(random.Random(seed))
+    state = GameState(hands, landlord, kitty)
+    while not state.is_over and len(state.moves) < MAX_TURNS:
+        strategy = strategies[state.current] if strategies is not None else None
+        move = strategy(state) if strategy is not None else await scheduler.decide(state)
+        state.play(move)
+    return state.result()
+
+
+def run_games(seeds: Sequence[Optional[int]], evaluator: Optional[Evaluator] = None,
+              max_batch_size: int = 256, max_wait: float = 0.001,
+              strategies: Optional[List[Optional[Strategy]]] = None
+              ) -> Tuple[List[GameResult], DecisionScheduler]:
+    """同时进行多局，AI决策经同一个调度器批量评估，返回 (各局结果, 调度器)"""
+    async def run():
+        scheduler = DecisionScheduler(evaluator, max_batch_size, max_wait)
+        results = await asyncio.gather(*(play_game(seed, scheduler, strategies) for seed in seeds))
+        return list(results), scheduler
+    return asyncio.run(run())
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="斗地主批量策略推理")
+    parser.add_argument("--games", type=int, default=1000, help="同时进行的对局数")
+    parser.add_argument("--seed", type=int, default=0, help="第一局的种子")
+    parser.add_argument("--batch", type=int, default=256, help="最大批量")
+    parser.add_argument("--wait", type=float, default=0.001, help="最长等待时间（秒）")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results, scheduler = run_games(range(args.seed, args.seed + args.games),
+                                   max_batch_size=args.batch, max_wait=args.wait)
+    elapsed = time.perf_counter() - start
+    report = {
+        "games": len(results),
+        "games_per_second": round(len(results) / elapsed, 1),
+        "landlord_win_rate": round(sum(r.landlord_won for r in results) / len(results), 4),
+        "numpy": np is not None,
+        **scheduler.stats(),
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,484 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+斗地主多桌对局服务器
+
+一个 asyncio 进程同时运行任意多张互不相关的牌桌，玩家（人或机器人）通过 TCP 连接，
+每行一条 JSON 消息。AI 的回合放到线程池中计算，不阻塞事件循环；每张牌桌用
+Instrumentation 记录每回合、AI 决策和人类玩家决策的延迟。
+
+客户端消息：
+    {"op": "join", "name": "小明", "bots": 2}      # 入座，可让电脑补满空位；"table" 指定牌桌
+    {"op": "bid", "bid": 2}                        # 叫地主，0为不叫
+    {"op": "play", "cards": [3, 16]}               # 按牌的编号出牌，[] 为不出
+    {"op": "play", "option": 0}                    # 或选择 turn 消息中的第几个方案
+    {"op": "stats"}                                # 服务器统计，"table" 指定牌桌
+服务器消息的 "event" 依次为 joined、start（发牌）、bidding（轮到自己叫分）、bid（任何人叫分）、
+landlord（地主和地主牌）、turn（轮到自己出牌）、play（任何人出牌）、over，出错时为 error。
+人类玩家断线后由电脑接管，超过 turn_timeout 未叫分或出牌时由电脑代叫、代出一次。
+
+    python3 server.py --port 9527 --workers 4
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from doudizhu import (CARDS, MAX_BID, MAX_TURNS, PLAYER_COUNT, Game, GameResult, Hand,
+                      Instrumentation, Player, choose_bid)
+
+DEFAULT_PORT = 9527
+
+
+def _card_ids(cards) -> List[int]:
+    return [card.id for card in cards]
+
+
+def _is_int(value) -> bool:
+    """是否为 JSON 整数（true/false 不算）"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _table_id(message: Dict) -> Optional[int]:
+    """消息中可选的牌桌编号"""
+    table_id = message.get("table")
+    if table_id is not None and not _is_int(table_id):
+        raise ValueError("table 应为牌桌编号")
+    return table_id
+
+
+async def _read_line(reader: asyncio.StreamReader) -> bytes:
+    """读一行，连接关闭时返回空串；一行超过长度上限时丢弃整行并抛出 ValueError"""
+    try:
+        return await reader.readuntil(b"\n")
+    except asyncio.IncompleteReadError as e:
+        return e.partial
+    except asyncio.LimitOverrunError as e:
+        consumed = e.consumed
+    while True:
+        try:
+            await reader.readexactly(consumed)
+            await reader.readuntil(b"\n")
+            break
+        except asyncio.LimitOverrunError as e:
+            consumed = e.consumed
+        except asyncio.IncompleteReadError:
+            return b""
+    raise ValueError("消息过长")
+
+
+class Connection:
+    """一个客户端连接"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.table: Optional['Table'] = None
+        self.seat = -1
+        self.closed = False
+
+    async def send(self, message: Dict):
+        """发送一条消息，对方已断开时忽略"""
+        if self.closed:
+            return
+        self.writer.write((json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8"))
+        try:
+            await self.writer.drain()
+        except ConnectionError:
+            self.closed = True
+
+
+class Table:
+    """一张牌桌：座位、对局和本桌的延迟统计"""
+
+    def __init__(self, table_id: int, seed: Optional[int] = None,
+                 turn_timeout: Optional[float] = None):
+        self.id = table_id
+        self.instrumentation = Instrumentation()
+        self.game = Game(seed=seed, verbose=False, instrumentation=self.instrumentation)
+        self.connections: List[Optional[Connection]] = []  # 每个座位的连接，电脑为 None
+        self.turn_timeout = turn_timeout
+        self.task: Optional[asyncio.Task] = None
+        self.result: Optional[GameResult] = None
+        self._pending: Optional[asyncio.Future] = None  # 等待中的人类玩家叫分或出牌
+        self._waiting = ""  # 等待的操作："bid" 或 "play"
+        self._options: List[Hand] = []
+
+    @property
+    def is_full(self) -> bool:
+        return len(self.connections) == PLAYER_COUNT
+
+    def seat_human(self, connection: Connection, name: str) -> int:
+        """人类玩家入座，返回座位号"""
+        connection.table, connection.seat = self, len(self.connections)
+        self.connections.append(connection)
+        self.game.players.append(Player(name, is_human=True))
+        return connection.seat
+
+    def seat_bot(self) -> int:
+        """电脑入座，返回座位号"""
+        self.connections.append(None)
+        self.game.players.append(Player(f"电脑{len(self.connections)}", is_human=False))
+        return len(self.connections) - 1
+
+    def leave(self, connection: Connection):
+        """玩家离开：开局前让出座位，开局后由电脑接管"""
+        seat = connection.seat
+        connection.table, connection.seat = None, -1
+        if self.task is None:
+            del self.connections[seat]
+            del self.game.players[seat]
+            for other in self.connections[seat:]:
+                if other is not None:
+                    other.seat -= 1
+            return
+        self.connections[seat] = None
+        self.game.players[seat].is_human = False
+        if self._pending is not None and not self._pending.done() \
+                and self.game.current_player_idx == seat:
+            self._pending.set_result(None)
+
+    def release(self):
+        """对局结束：让仍在座的玩家离座，之后可以在同一连接上再次入座"""
+        for connection in self.connections:
+            if connection is not None and connection.table is self:
+                connection.table, connection.seat = None, -1
+
+    def _expecting(self, connection: Connection, op: str) -> bool:
+        """是否正在等待该玩家的这一操作"""
+        return self._pending is not None and not self._pending.done() and self._waiting == op \
+            and self.connections[self.game.current_player_idx] is connection
+
+    def submit_bid(self, connection: Connection, message: Dict) -> Optional[str]:
+        """处理玩家的叫分消息，返回错误说明，成功时返回 None"""
+        if not self._expecting(connection, "bid"):
+            return "还没轮到你叫分"
+        bid = message.get("bid")
+        if not _is_int(bid) or (bid != 0 and not self.game.highest_bid < bid <= MAX_BID):
+            return f"叫分应为0或高于{self.game.highest_bid}分且不超过{MAX_BID}分"
+        self._pending.set_result(bid)
+        return None
+
+    def submit(self, connection: Connection, message: Dict) -> Optional[str]:
+        """处理玩家的出牌消息，返回错误说明，成功时返回 None"""
+        game = self.game
+        if not self._expecting(connection, "play"):
+            return "还没轮到你"
+        if "option" in message:
+            option = message["option"]
+            if not _is_int(option) or not 0 <= option < len(self._options):
+                return "没有这个出牌方案"
+            hand = self._options[option]
+        else:
+            card_ids = message.get("cards")
+            if not isinstance(card_ids, list) or \
+                    not all(_is_int(i) and 0 <= i < len(CARDS) for i in card_ids):
+                return "cards 应为牌的编号列表"
+            hand = Hand([CARDS[i] for i in card_ids])
+        if not game.is_legal(hand):
+            return "主动出牌时不能不出" if not hand.cards else "出牌不合法"
+        self._pending.set_result(hand)
+        return None
+
+    async def broadcast(self, message: Dict):
+        for connection in self.connections:
+            if connection is not None:
+                await connection.send(message)
+
+    async def run(self, executor: Optional[Executor] = None) -> GameResult:
+        """进行一局，返回对局结果"""
+        game = self.game
+        game.create_deck()
+        game.deal_cards()
+        for seat, connection in enumerate(self.connections):
+            if connection is not None:
+                await connection.send({
+                    "event": "start", "table": self.id, "seat": seat,
+                    "players": [player.name for player in game.players],
+                    "hand": _card_ids(game.players[seat].cards),
+                })
+        await self._bidding()
+        landlord = game.players.index(game.settle_landlord())
+        await self.broadcast({"event": "landlord", "landlord": landlord, "bid": game.highest_bid,
+                              "kitty": _card_ids(game.landlord_cards)})
+
+        clock = time.perf_counter
+        while not game.game_over and len(game.moves) < MAX_TURNS:
+            seat = game.current_player_idx
+            player = game.players[seat]
+            if self.connections[seat] is None:  # 人类玩家在 get_valid_hands 中记录
+                player.count_moves(game.last_hand)
+            start = clock()
+            hand = None
+            if self.connections[seat] is not None:
+                hand = await self._human_turn(seat)
+                self.instrumentation.observe("human_decision", clock() - start)
+            if hand is None:
+                decided = clock()
+                hand = await self._ai_turn(executor)
+                self.instrumentation.observe("ai_decision", clock() - decided)
+            game.submit_hand(hand)
+            await self.broadcast({
+                "event": "play", "seat": seat, "cards": _card_ids(hand.cards),
+                "text": str(hand) if hand.cards else "不出", "left": player.card_count,
+            })
+            self.instrumentation.observe("turn", clock() - start)
+
+        self.instrumentation.count("games")
+        self.instrumentation.count("turns", len(game.moves))
+        if game.recorder is not None:
+            game.recorder.write_game(game)
+        winner = game.players.index(game.winner) if game.winner else -1
+        self.result = GameResult(winner, landlord, game.moves, len(game.moves))
+        self.release()
+        await self.broadcast({"event": "over", "table": self.id, "winner": winner,
+                              "landlord": landlord, "turns": len(game.moves)})
+        return self.result
+
+    async def _bidding(self):
+        """叫地主：人类玩家通过 bid 消息叫分，电脑按牌力叫分（计算量很小，直接在事件循环中完成）"""
+        game = self.game
+        game.start_bidding()
+        while not game.bidding_over:
+            seat = game.current_player_idx
+            bid = None
+            if self.connections[seat] is not None:
+                bid = await self._wait(seat, "bid", {"event": "bidding", "seat": seat,
+                                                     "highest": game.highest_bid})
+            if bid is None:
+                bid = choose_bid(game.players[seat].counts, game.highest_bid)
+            game.submit_bid(bid)
+            await self.broadcast({"event": "bid", "seat": seat, "bid": bid})
+
+    async def _human_turn(self, seat: int) -> Optional[Hand]:
+        """等待人类玩家出牌；断线或超时返回 None，由电脑代出"""
+        game = self.game
+        self._options = game.players[seat].get_valid_hands(game.last_hand)
+        last = game.last_hand
+        try:
+            return await self._wait(seat, "play", {
+                "event": "turn", "seat": seat,
+                "hand": _card_ids(game.players[seat].cards),
+                "last": _card_ids(last.cards) if last is not None else None,
+                "options": [_card_ids(hand.cards) for hand in self._options],
+            })
+        finally:
+            self._options = []
+
+    async def _wait(self, seat: int, op: str, prompt: Dict):
+        """提示人类玩家并等待其 op 操作的结果；断线或超时返回 None"""
+        await self.connections[seat].send(prompt)
+        self._pending = asyncio.get_running_loop().create_future()
+        self._waiting = op
+        try:
+            return await asyncio.wait_for(self._pending, self.turn_timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self._pending = None
+            self._waiting = ""
+
+    async def _ai_turn(self, executor: Optional[Executor]) -> Hand:
+        """在线程池中为当前玩家计算出牌（人类玩家超时时也按电脑策略代出）"""
+        return await asyncio.get_running_loop().run_in_executor(
+            executor, functools.partial(self.game.decide_current, ai=True))
+
+
+class GameServer:
+    """多桌对局服务器"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT,
+                 executor: Optional[Executor] = None, seed: Optional[int] = None,
+                 turn_timeout: Optional[float] = None):
+        self.host = host
+        self.port = port
+        self.executor = executor
+        self.seed = seed  # 设置后第 n 张牌桌的种子为 seed + n，便于复现
+        self.turn_timeout = turn_timeout
+        self.tables: Dict[int, Table] = {}        # 进行中和等待玩家的牌桌
+        self.instrumentation = Instrumentation()  # 已结束牌桌的合计
+        self.finished_tables = 0
+        self.connection_count = 0
+        self._next_table = 1
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._clients: Dict[asyncio.Task, Connection] = {}  # 各连接的处理任务
+
+    async def start(self):
+        """开始监听（port 为0时由系统分配，启动后写回 self.port）"""
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        """停止监听，取消进行中的牌桌，关闭全部连接并等待其处理任务结束"""
+        if self._server is not None:
+            self._server.close()
+        tasks = [table.task for table in self.tables.values() if table.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        clients = list(self._clients.items())
+        for _, connection in clients:
+            connection.closed = True
+            connection.writer.close()  # 处理任务读到连接关闭后自行结束
+        await asyncio.gather(*(task for task, _ in clients), return_exceptions=True)
+        if self._server is not None:
+            await self._server.wait_closed()
+
+    def open_table(self) -> Table:
+        """新开一张空牌桌"""
+        table_id = self._next_table
+        self._next_table += 1
+        seed = self.seed + table_id if self.seed is not None else None
+        table = self.tables[table_id] = Table(table_id, seed, self.turn_timeout)
+        return table
+
+    def start_bot_table(self) -> Table:
+        """开一张三名电脑的牌桌并立即开局（用于压测和自我对弈）"""
+        table = self.open_table()
+        while not table.is_full:
+            table.seat_bot()
+        self._start_table(table)
+        return table
+
+    def _start_table(self, table: Table):
+        table.task = asyncio.ensure_future(table.run(self.executor))
+        table.task.add_done_callback(lambda _: self._finish_table(table))
+
+    def _finish_table(self, table: Table):
+        table.release()  # 对局被取消或出错时也让玩家离座
+        self.tables.pop(table.id, None)
+        self.instrumentation.merge(table.instrumentation)
+        self.finished_tables += 1
+
+    def _find_table(self, table_id) -> Table:
+        """要加入的牌桌：指定编号的牌桌，或第一张有空位的牌桌，都没有时新开一张"""
+        if table_id is not None:
+            table = self.tables.get(table_id)
+            if table is None or table.task is not None or table.is_full:
+                raise ValueError(f"牌桌 {table_id} 不存在或已开局")
+            return table
+        for table in self.tables.values():
+            if table.task is None and not table.is_full:
+                return table
+        return self.open_table()
+
+    def stats(self, table_id: Optional[int] = None) -> Dict:
+        """服务器统计；指定牌桌时只统计该桌"""
+        if table_id is not None:
+            table = self.tables.get(table_id)
+            if table is None:
+                raise ValueError(f"牌桌 {table_id} 不存在或已结束")
+            return {"table": table_id, "started": table.task is not None,
+                    "turns": len(table.game.moves), **table.instrumentation.summary()}
+
+        total = Instrumentation()
+        total.merge(self.instrumentation)
+        for table in self.tables.values():
+            total.merge(table.instrumentation)
+        return {
+            "tables": len(self.tables),
+            "playing": sum(1 for table in self.tables.values() if table.task is not None),
+            "finished": self.finished_tables,
+            "connections": self.connection_count,
+            **total.summary(),
+        }
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        connection = Connection(reader, writer)
+        task = asyncio.current_task()
+        self._clients[task] = connection
+        self.connection_count += 1
+        try:
+            while True:
+                try:
+                    line = await _read_line(reader)
+                    if not line:
+                        break
+                    try:
+                        message = json.loads(line)
+                    except (ValueError, RecursionError):
+                        raise ValueError("消息不是合法的 JSON") from None
+                    if not isinstance(message, dict):
+                        raise ValueError("消息应为 JSON 对象")
+                    await self._dispatch(connection, message)
+                except ValueError as e:
+                    await connection.send({"event": "error", "message": str(e)})
+        except ConnectionError:
+            pass
+        finally:
+            del self._clients[task]
+            self.connection_count -= 1
+            connection.closed = True
+            if connection.table is not None:
+                connection.table.leave(connection)
+            writer.close()
+
+    async def _dispatch(self, connection: Connection, message: Dict):
+        op = message.get("op")
+        if op == "join":
+            if connection.table is not None:
+                raise ValueError("已经入座")
+            bots = message.get("bots", 0)
+            if not _is_int(bots) or bots < 0:
+                raise ValueError("bots 应为非负整数")
+            name = message.get("name", "玩家")
+            if not isinstance(name, str):
+                raise ValueError("name 应为字符串")
+            table = self._find_table(_table_id(message))
+            if PLAYER_COUNT - len(table.connections) - 1 < bots:
+                raise ValueError("空位不足")
+            seat = table.seat_human(connection, name)
+            for _ in range(bots):
+                table.seat_bot()
+            await connection.send({"event": "joined", "table": table.id, "seat": seat})
+            if table.is_full:
+                self._start_table(table)
+        elif op in ("bid", "play"):
+            if connection.table is None:
+                raise ValueError("还没有入座")
+            table = connection.table
+            error = table.submit_bid(connection, message) if op == "bid" else table.submit(connection, message)
+            if error is not None:
+                raise ValueError(error)
+        elif op == "stats":
+            await connection.send({"event": "stats", **self.stats(_table_id(message))})
+        else:
+            raise ValueError(f"未知的操作：{op}")
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="斗地主多桌对局服务器")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="监听端口")
+    parser.add_argument("--workers", type=int, default=4, help="计算AI出牌的线程数")
+    parser.add_argument("--seed", type=int, default=None, help="牌桌种子的起点")
+    parser.add_argument("--turn-timeout", type=float, default=60.0, help="人类玩家每手的限时（秒）")
+    args = parser.parse_args()
+
+    server = GameServer(args.host, args.port, ThreadPoolExecutor(args.workers),
+                        args.seed, args.turn_timeout)
+
+    async def serve():
+        await server.start()
+        print(f"斗地主服务器已启动：{server.host}:{server.port}")
+        await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        print("\n服务器已停止")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+斗地主残局求解器
+
+在明牌（三家手牌都已知）的残局中精确求解地主一方能否获胜。
+地主与两名农民是对抗的两队：轮到地主时只要有一步能赢即可，
+轮到农民时只要有一步能让地主输即可，这是二值的 alpha-beta（与或树）搜索。
+局面用 GameState 的 Zobrist 哈希存入固定大小的置换表，冲突时直接覆盖旧条目。
+每次决策都受节点数和时间预算限制，超出预算时放弃求解，由调用方退回启发式策略。
+"""
+
+import random
+import time
+from typing import List, Optional
+
+from doudizhu import PLAYER_COUNT, GameState, counts_size, simple_ai
+
+# 同一手牌局面在不同地主座位下结果不同，哈希中再混入地主座位
+_LANDLORD_KEYS = [random.Random(0x10AD).getrandbits(64) for _ in range(PLAYER_COUNT)]
+_CLOCK_INTERVAL = 1024  # 每搜索这么多节点检查一次时间
+
+
+class _BudgetExceeded(Exception):
+    """搜索超出节点数或时间预算"""
+
+
+class EndgameSolver:
+    """带置换表的明牌残局求解器"""
+
+    def __init__(self, max_cards: int = 10, max_nodes: int = 5000,
+                 time_limit: Optional[float] = 0.05, table_bits: int = 16):
+        self.max_cards = max_cards    # 三家手牌都不超过这么多张时才求解
+        self.max_nodes = max_nodes    # 每次求解的节点预算
+        self.time_limit = time_limit  # 每次求解的时间预算（秒），None 表示不限
+        self.table: List[Optional[tuple]] = [None] * (1 << table_bits)
+        self.table_mask = (1 << table_bits) - 1
+        self.nodes = 0
+        self.deadline = 0.0
+        self.table_hits = 0
+
+    def applies_to(self, state: GameState) -> bool:
+        """局面是否已经小到值得求解"""
+        return all(counts_size(hand) <= self.max_cards for hand in state.hands)
+
+    def solve(self, state: GameState) -> Optional[bool]:
+        """求解地主能否获胜，超出预算时返回 None"""
+        self._start()
+        try:
+            return self._search(state)
+        except _BudgetExceeded:
+            return None
+
+    def choose_move(self, state: GameState) -> Optional[int]:
+        """返回当前玩家一方必胜的一步，没有必胜着法或超出预算时返回 None"""
+        if state.is_over or not self.applies_to(state):
+            return None
+        landlord_to_move = state.current == state.landlord
+        self._start()
+        try:
+            for move in self._ordered_moves(state):
+                state.play(move)
+                try:
+                    landlord_wins = self._search(state)
+                finally:
+                    state.undo()
+                if landlord_wins == landlord_to_move:
+                    return move
+        except _BudgetExceeded:
+            pass
+        return None
+
+    def _start(self):
+        self.nodes = 0
+        self.deadline = time.perf_counter() + self.time_limit if self.time_limit is not None else 0.0
+
+    def _ordered_moves(self, state: GameState) -> List[int]:
+        """出牌多的优先尝试（能出完的自然排第一），不出放最后"""
+        return sorted(state.iter_legal_moves(), key=counts_size, reverse=True)
+
+    def _search(self, state: GameState) -> bool:
+        """返回地主一方能否获胜"""
+        if state.is_over:
+            return state.winner == state.landlord
+
+        self.nodes += 1
+        if self.nodes > self.max_nodes:
+            raise _BudgetExceeded()
+        if self.time_limit is not None and self.nodes % _CLOCK_INTERVAL == 0:
+            if time.perf_counter() > self.deadline:
+                raise _BudgetExceeded()
+
+        key = state.zobrist ^ _LANDLORD_KEYS[state.landlord]
+        slot = key & self.table_mask
+        entry = self.table[slot]
+        if entry is not None and entry[0] == key:
+            self.table_hits += 1
+            return entry[1]
+
+        landlord_to_move = state.current == state.landlord
+        result = not landlord_to_move
+        for move in self._ordered_moves(state):
+            state.play(move)
+            try:
+                value = self._search(state)
+            finally:
+                state.undo()
+            if value == landlord_to_move:
+                result = value
+                break
+
+        self.table[slot] = (key, result)
+        return result
+
+
+_DEFAULT_SOLVER = EndgameSolver()
+
+
+def endgame_ai(state: GameState) -> int:
+    """无界面引擎用的策略：残局时用求解器，否则与 simple_ai 相同"""
+    move = _DEFAULT_SOLVER.choose_move(state)
+    if move is None:
+        return simple_ai(state)
+    return move
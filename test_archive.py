@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+对局归档测试
+"""
+
+import os
+import tempfile
+
+import pytest
+
+import archive
+from archive import GameArchive, build_archive, count_bombs, summarize
+from doudizhu import RANK_BIG_JOKER, RANK_SMALL_JOKER, RANK_UNITS, simulate_game
+from gamerecord import encode_record, iter_records, record_games
+
+
+def test_archive_random_access_and_scans():
+    """测试按下标读取和按列统计"""
+    print("测试对局归档...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        records_path = os.path.join(tmp, "games.ddz")
+        archive_path = os.path.join(tmp, "games.ddza")
+        record_games(records_path, 60, seed=0)
+        records = list(iter_records(records_path))
+        assert build_archive(iter(records), archive_path) == 60
+
+        with GameArchive(archive_path) as games:
+            assert len(games) == 60
+            for n in (0, 17, 59, -1):
+                assert encode_record(games[n]) == encode_record(records[n])
+            assert games[5].result() == simulate_game(5)
+            try:
+                games[60]
+                assert False, "越界应当报错"
+            except IndexError:
+                pass
+
+            # 列扫描与逐局计算的摘要一致
+            summaries = [summarize(record) for record in records]
+            assert list(games.column("turns")) == [s["turns"] for s in summaries]
+            by_bombs = games.landlord_win_rate_by_bombs()
+            assert sum(n for n, _ in by_bombs.values()) == 60
+            for bombs, (n, rate) in by_bombs.items():
+                group = [s for s in summaries if s["landlord_bombs"] == bombs]
+                assert n == len(group)
+                assert abs(rate - sum(s["landlord_won"] for s in group) / n) < 1e-9
+            by_strength = games.average_turns_by_strength()
+            assert sum(n for n, _ in by_strength.values()) == 60
+            print(f"按炸弹数的地主胜率：{by_bombs}")
+
+        # 仍持有列视图时也能关闭归档
+        games = GameArchive(archive_path)
+        landlords = games.column("landlord")
+        games.close()
+        if archive.np is not None:
+            assert landlords.tolist() == [s["landlord"] for s in summaries]
+        del landlords
+    print("✓ 对局归档测试通过")
+
+
+def test_numpy_scans_match_fallback():
+    """测试 NumPy 的列扫描与纯 Python 的结果一致（需要 NumPy）"""
+    np = pytest.importorskip("numpy")
+    print("\n测试 NumPy 列扫描...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        records_path = os.path.join(tmp, "games.ddz")
+        archive_path = os.path.join(tmp, "games.ddza")
+        record_games(records_path, 40, seed=100)
+        build_archive(iter_records(records_path), archive_path)
+
+        with GameArchive(archive_path) as games:
+            turns = games.column("turns")
+            assert isinstance(turns, np.ndarray)
+            vectorized = (turns.tolist(), games.landlord_win_rate_by_bombs(),
+                          games.average_turns_by_strength())
+            del turns
+            archive.np = None
+            try:
+                turns = games.column("turns")
+                fallback = (list(turns), games.landlord_win_rate_by_bombs(),
+                            games.average_turns_by_strength())
+                del turns
+            finally:
+                archive.np = np
+        assert vectorized[0] == fallback[0]
+        for left, right in zip(vectorized[1:], fallback[1:]):
+            assert left.keys() == right.keys()
+            assert all(left[k][0] == right[k][0] and abs(left[k][1] - right[k][1]) < 1e-9
+                       for k in left)
+    print("✓ NumPy 列扫描与纯 Python 一致")
+
+
+def test_count_bombs():
+    """测试炸弹计数"""
+    hand = 4 * RANK_UNITS[0] + 4 * RANK_UNITS[12] + 3 * RANK_UNITS[5]
+    assert count_bombs(hand) == 2
+    assert count_bombs(hand + RANK_UNITS[RANK_SMALL_JOKER] + RANK_UNITS[RANK_BIG_JOKER]) == 3
+    assert count_bombs(RANK_UNITS[RANK_BIG_JOKER]) == 0
+
+
+if __name__ == "__main__":
+    test_archive_random_access_and_scans()
+    test_numpy_scans_match_fallback()
+    test_count_bombs()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量牌型识别测试（需要 NumPy，未安装时跳过）
+"""
+
+import random
+
+import pytest
+
+from doudizhu import (PLAY_TABLE, RANK_COUNT, RANK_SMALL_JOKER, RANK_TWO, CardType,
+                      classify_counts, counts_from_list, counts_to_list)
+
+np = pytest.importorskip("numpy")
+
+from batch import CARD_TYPES, classify_batch, from_signatures, hand_features, to_signatures
+
+
+def _random_slots(rng: random.Random):
+    """随机的张数（含少量不可能的张数）"""
+    slots = [rng.choice([0, 0, 1, 1, 2, 3, 4]) for _ in range(RANK_SMALL_JOKER)]
+    slots += [rng.randint(0, 1), rng.randint(0, 1)]
+    if rng.random() < 0.05:
+        slots[rng.randrange(RANK_COUNT)] = rng.choice([5, 16, -1])
+    return slots
+
+
+def test_classify_batch_matches_table():
+    """测试批量识别与逐个查表一致"""
+    print("测试批量牌型识别...")
+
+    rng = random.Random(20)
+    rows = [counts_to_list(counts) for counts in PLAY_TABLE]
+    rows += [_random_slots(rng) for _ in range(5000)]
+    result = classify_batch(np.array(rows, dtype=np.int8))
+
+    for i, slots in enumerate(rows):
+        possible = all(0 <= n <= 4 for n in slots) and max(slots[RANK_SMALL_JOKER:]) <= 1
+        card_type, main_value, length = CardType.INVALID, 0, 0
+        if possible:
+            card_type, main_value, length = classify_counts(counts_from_list(slots))
+        assert CARD_TYPES[result.types[i]] == card_type, slots
+        assert bool(result.valid[i]) == (card_type != CardType.INVALID)
+        if result.valid[i]:
+            counts = counts_from_list(slots)
+            assert (result.mains[i], result.lengths[i]) == (main_value, length)
+            assert result.move_ids[i] == PLAY_TABLE[counts][3]
+
+    # 签名打包与展开互逆
+    signatures = to_signatures(np.array(rows[:100]))
+    assert signatures.tolist() == [counts_from_list(slots) for slots in rows[:100]]
+    assert from_signatures(signatures).tolist() == rows[:100]
+    print("✓ 批量识别与查表一致")
+
+
+def test_hand_features():
+    """测试批量手牌特征"""
+    print("测试批量手牌特征...")
+
+    rng = random.Random(21)
+    deck = [rank for rank in range(RANK_SMALL_JOKER) for _ in range(4)]
+    deck += [RANK_SMALL_JOKER, RANK_SMALL_JOKER + 1]
+    rows = []
+    for _ in range(500):
+        slots = [0] * RANK_COUNT
+        for rank in rng.sample(deck, 17):
+            slots[rank] += 1
+        rows.append(slots)
+    features = hand_features(np.array(rows))
+
+    for i, slots in enumerate(rows):
+        chain = slots[:RANK_TWO]
+        rocket = slots[RANK_SMALL_JOKER] and slots[RANK_SMALL_JOKER + 1]
+        assert features["cards"][i] == 17
+        assert features["pairs"][i] == sum(1 for n in slots[:RANK_SMALL_JOKER] if n >= 2)
+        assert features["bombs"][i] == slots[:RANK_SMALL_JOKER].count(4) + rocket
+        assert features["straights"][i] == sum(1 for start in range(RANK_TWO - 4)
+                                               if all(chain[start:start + 5]))
+        assert features["airplanes"][i] == sum(1 for start in range(RANK_TWO - 1)
+                                               if min(chain[start:start + 2]) >= 3)
+        longest, run = 0, 0
+        for n in chain:
+            run = run + 1 if n else 0
+            longest = max(longest, run)
+        assert features["longest_straight"][i] == longest
+    print("✓ 批量特征与逐个计算一致")
+
+
+if __name__ == "__main__":
+    test_classify_batch_matches_table()
+    test_hand_features()
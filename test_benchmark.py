@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+性能基准测试
+"""
+
+import json
+
+from benchmark import BASELINE_PATH, compare, run_benchmarks
+
+
+def test_benchmark_results():
+    """测试基准结果与基线的项目一致"""
+    print("测试性能基准...")
+    results, relative = run_benchmarks(scale=0.01, repeat=1)
+    with open(BASELINE_PATH, encoding="utf-8") as f:
+        baseline = json.load(f)
+    # 基线保存的是与校准循环耗时之比
+    assert set(results) == set(relative) == set(baseline)
+    assert all(value > 0 for value in results.values())
+    assert all(value > 0 for value in relative.values())
+    print("✓ 性能基准测试通过")
+
+
+def test_benchmark_compare():
+    """测试退化判断"""
+    print("\n测试退化判断...")
+    baseline = {"simulate_game": 100.0, "can_beat": 1.0}
+    assert compare({"simulate_game": 140.0, "can_beat": 0.5}, baseline, 1.5) == []
+    regressions = compare({"simulate_game": 160.0, "can_beat": 1.0}, baseline, 1.5)
+    assert len(regressions) == 1 and regressions[0].startswith("simulate_game")
+    print("✓ 退化判断测试通过")
+
+
+if __name__ == "__main__":
+    test_benchmark_results()
+    test_benchmark_compare()
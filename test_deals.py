@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量发牌与牌局库测试
+"""
+
+import os
+import tempfile
+
+from deals import (DECK_SIZE, DealCorpus, deal_hands, deals_from_seeds, generate_deals,
+                   iter_chunk_deals, write_corpus)
+from doudizhu import DECK_IDS, Game, deal_deck, simulate_deal, simulate_game
+
+
+def test_deals_from_seeds():
+    """测试按种子重现 Game 的牌局"""
+    print("测试按种子发牌...")
+
+    for seed, (deck, first) in zip(range(15), iter_chunk_deals(deals_from_seeds(range(15)))):
+        game = Game(seed=seed, verbose=False)
+        game.create_deck()
+        assert list(deck) == game.deck_ids
+        assert simulate_deal(deck, first) == simulate_game(seed)
+    print("✓ 与 Game(seed) 的牌局完全相同")
+
+
+def test_corpus_roundtrip():
+    """测试生成、保存和读取牌局库"""
+    print("\n测试牌局库...")
+
+    chunks = list(generate_deals(300, seed=1, chunk_size=128))
+    assert [len(firsts) for _, firsts in chunks] == [128, 128, 44]
+    assert chunks == list(generate_deals(300, seed=1, chunk_size=128))
+    assert chunks != list(generate_deals(300, seed=2, chunk_size=128))
+    deals = list(iter_chunk_deals(chunks))
+    for deck, first in deals:
+        assert sorted(deck) == sorted(DECK_IDS) and 0 <= first < 3
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "deals.ddzd")
+        assert write_corpus(path, chunks) == 300
+        assert os.path.getsize(path) == 13 + 300 * (DECK_SIZE + 1)
+        with DealCorpus(path) as corpus:
+            assert len(corpus) == 300
+            assert list(corpus) == deals
+            assert corpus[-1] == deals[-1]
+            assert bytes(corpus.firsts()) == bytes(first for _, first in deals)
+            results = list(corpus.simulate(start=10, stop=15))
+            assert results == [simulate_deal(deck, first) for deck, first in deals[10:15]]
+
+            # 批量发牌与逐局发牌一致
+            decks = corpus.decks()
+            hands, kitties = deal_hands(decks)
+            hands, kitties = [list(map(int, row)) for row in hands], list(map(int, kitties))
+            del decks
+            for (deck, first), hand, kitty in zip(deals, hands, kitties):
+                dealt, dealt_kitty, landlord = deal_deck(deck, first)
+                hand[landlord] += kitty
+                assert (hand, kitty) == (dealt, dealt_kitty)
+
+        # 仍持有牌编号数组时也能关闭牌局库
+        corpus = DealCorpus(path)
+        decks = corpus.decks()
+        corpus.close()
+        assert [bytes(deck) for deck in decks[:3]] == [deck for deck, _ in deals[:3]]
+        del decks
+
+        with open(path, "r+b") as f:
+            f.write(b"XXXX")
+        try:
+            DealCorpus(path)
+            assert False, "魔数不对应当报错"
+        except ValueError:
+            pass
+    print("✓ 牌局库测试通过")
+
+
+if __name__ == "__main__":
+    test_deals_from_seeds()
+    test_corpus_roundtrip()
@@ -5,6 +5,7 @@
 """
 
 from doudizhu import *
+import json
 import random
 
 def test_card_creation():
@@ -61,9 +62,60 @@ def test_hand_comparison():
     # 火箭压炸弹
     rocket = Hand([Card(Suit.JOKER, CardValue.SMALL_JOKER), Card(Suit.JOKER, CardValue.BIG_JOKER)])
     print(f"火箭 vs 炸弹: {rocket.can_beat(bomb)}")
+    assert hand2.can_beat(hand1) and bomb.can_beat(single) and rocket.can_beat(bomb)
+    
+    # 旧接口的权重就是出牌编号，与 can_beat 的顺序一致
+    assert [hand.weight for hand in (hand1, hand2, bomb, rocket)] == \
+        [hand.move_id for hand in (hand1, hand2, bomb, rocket)]
+    assert hand1.weight < hand2.weight < single.weight < bomb.weight < rocket.weight
+    assert Hand([]).weight == 0
+    
+    # 指定的牌型必须与实际的牌一致
+    assert Hand(bomb.cards, CardType.BOMB).move_id == bomb.move_id
+    try:
+        Hand(bomb.cards, CardType.FOUR_WITH_TWO)
+        assert False, "牌型与牌不符应当报错"
+    except ValueError:
+        pass
     
     print("✓ 牌型比较测试通过")
 
+def test_move_id_dominance():
+    """测试按出牌编号的大小关系与规则一致"""
+    print("\n测试出牌编号的大小关系...")
+    
+    def rule_beats(move, last):
+        # 原来按牌型、长度、张数和主牌值逐项比较的规则
+        card_type, main_value, length, _ = PLAY_TABLE[move]
+        last_type, last_main, last_length, _ = PLAY_TABLE[last]
+        if card_type == CardType.ROCKET:
+            return True
+        if card_type == CardType.BOMB:
+            return last_type != CardType.ROCKET and (last_type != CardType.BOMB or main_value > last_main)
+        return (card_type == last_type and length == last_length
+                and counts_size(move) == counts_size(last) and main_value > last_main)
+    
+    plays = list(PLAY_TABLE)
+    rng = random.Random(17)
+    special = [move for move in plays if PLAY_TABLE[move][0] in (CardType.BOMB, CardType.ROCKET)]
+    for _ in range(20000):
+        move, last = rng.choice(plays), rng.choice(plays)
+        if rng.random() < 0.3:
+            move = rng.choice(special)
+        assert move_beats(move, last) == rule_beats(move, last), (counts_to_list(move), counts_to_list(last))
+    
+    # 编号区间内的出牌都能压过，区间前一个编号（同形状时）压不过
+    for move in rng.sample(plays, 2000):
+        move_id = PLAY_TABLE[move][3]
+        if BEAT_START[move_id] < GROUP_END[move_id]:
+            assert rule_beats(MOVE_COUNTS[BEAT_START[move_id]], move)
+            assert rule_beats(MOVE_COUNTS[GROUP_END[move_id] - 1], move)
+        below = BEAT_START[move_id] - 1
+        assert not rule_beats(MOVE_COUNTS[below], move) or below >= BOMB_START > move_id
+    assert not move_id_beats(NO_MOVE, 1) and move_id_beats(1, NO_MOVE)
+    print("✓ 出牌编号大小关系测试通过")
+
+
 def test_deck_creation():
     """测试牌堆创建"""
     print("\n测试牌堆创建...")
@@ -107,6 +159,544 @@ def test_ai_player():
     
     print("✓ AI玩家测试通过")
 
+def test_card_interning():
+    """测试扑克牌单例"""
+    print("\n测试扑克牌单例...")
+    import pickle
+    
+    card = Card(Suit.HEARTS, CardValue.TEN)
+    assert Card(Suit.HEARTS, CardValue.TEN) is card
+    assert CARDS[card.id] is card and hash(card) == card.id
+    assert [c.id for c in CARDS] == list(range(54))
+    assert pickle.loads(pickle.dumps(card)) is card
+    assert not hasattr(card, "__dict__")
+    try:
+        card.rank = 0
+        assert False, "牌不应可修改"
+    except AttributeError:
+        pass
+    try:
+        Card(Suit.SPADES, CardValue.BIG_JOKER)
+        assert False, "王只能是王花色"
+    except ValueError:
+        pass
+    
+    # 洗牌只是打乱同一组对象
+    game = Game(seed=1)
+    game.create_deck()
+    assert sorted(c.id for c in game.deck) == list(range(54))
+    assert all(CARDS[c.id] is c for c in game.deck)
+    print("✓ 扑克牌单例测试通过")
+
+
+def test_player_hand_storage():
+    """测试玩家按张数和掩码保存手牌"""
+    print("\n测试玩家手牌存储...")
+    
+    rng = random.Random(5)
+    player = Player("测试")
+    deal = rng.sample(CARDS, 20)
+    for card in deal:
+        player.add_cards([card])
+    assert player.cards == sorted(deal, key=lambda card: card.id)
+    assert player.card_count == 20 and player.counts == cards_to_counts(deal)
+    
+    played = deal[::3]
+    assert player.has_cards(played)
+    player.remove_cards(played)
+    assert not player.has_cards(played[:1])
+    assert player.card_count == 20 - len(played)
+    assert player.counts == cards_to_counts(player.cards)
+    
+    # 重复添加或移除不存在的牌不改变手牌
+    player.add_cards(player.cards[:2])
+    player.remove_cards(played)
+    assert player.card_count == 20 - len(played)
+    print("✓ 玩家手牌存储测试通过")
+
+
+def test_counts_representation():
+    """测试张数签名表示"""
+    print("\n测试张数签名表示...")
+    
+    cards = [Card(Suit.SPADES, CardValue.THREE), Card(Suit.HEARTS, CardValue.THREE),
+             Card(Suit.CLUBS, CardValue.ACE), Card(Suit.JOKER, CardValue.BIG_JOKER)]
+    counts = cards_to_counts(cards)
+    slots = counts_to_list(counts)
+    assert slots[0] == 2 and slots[RANK_ACE] == 1 and slots[RANK_BIG_JOKER] == 1
+    assert counts_from_list(slots) == counts
+    assert counts_size(counts) == 4
+    assert counts_contains(counts, cards_to_counts(cards[:2]))
+    assert not counts_contains(cards_to_counts(cards[:2]), counts)
+    
+    # 牌编号覆盖0..53且互不重复
+    game = Game()
+    game.create_deck()
+    assert sorted(card.id for card in game.deck) == list(range(54))
+    
+    player = Player("测试", is_human=False)
+    player.add_cards(cards)
+    assert player.has_cards(cards[:2])
+    assert not player.has_cards([Card(Suit.DIAMONDS, CardValue.THREE)])
+    player.remove_cards(cards[:2])
+    assert player.counts == cards_to_counts(cards[2:])
+    assert not player.has_cards(cards[:1])
+    print("✓ 张数签名测试通过")
+
+def test_play_table_consistency():
+    """测试牌型分类表与规则函数一致"""
+    print("\n测试牌型分类表...")
+    from doudizhu import _determine_type, _get_main_value
+    
+    # 表中每一种合法出牌都与规则函数的判断一致
+    for counts, (card_type, main_value, length, move_id) in PLAY_TABLE.items():
+        slots = counts_to_list(counts)
+        assert _determine_type(slots) == card_type, f"牌型不一致：{slots}"
+        assert _get_main_value(slots, card_type) == main_value, f"主牌值不一致：{slots}"
+        assert counts_size(counts) <= MAX_HAND_SIZE
+        assert MOVE_COUNTS[move_id] == counts and MOVE_TYPES[move_id] == card_type
+    assert sorted(move_id for *_, move_id in PLAY_TABLE.values()) == list(range(1, MOVE_COUNT))
+    print(f"分类表共{len(PLAY_TABLE)}种出牌")
+    
+    # 随机组合中，规则函数与分类表的判断完全一致
+    rng = random.Random(2024)
+    game = Game(seed=0)
+    game.create_deck()
+    for _ in range(20000):
+        cards = rng.sample(game.deck, rng.randint(1, 8))
+        counts = cards_to_counts(cards)
+        rule_type = _determine_type(counts_to_list(counts))
+        assert classify_counts(counts)[0] == rule_type
+        assert Hand(cards).card_type == rule_type
+    
+    # 飞机只能不带，或带同样数量、点数互不相同且不与机身重复的单张或对子
+    airplanes = {
+        "333444": CardType.TRIPLE_STRAIGHT,
+        "33344456": CardType.TRIPLE_STRAIGHT,
+        "3334442W": CardType.TRIPLE_STRAIGHT,
+        "3334445566": CardType.TRIPLE_STRAIGHT,
+        "333444555789": CardType.TRIPLE_STRAIGHT,
+        "3334445": CardType.INVALID,      # 翅膀数量与机身不同
+        "33344455": CardType.INVALID,     # 两张相同的单张
+        "33334444": CardType.INVALID,     # 机身的第四张不能当翅膀
+        "333344456": CardType.INVALID,
+        "33344456677": CardType.INVALID,  # 单张和对子混带
+        "333555": CardType.INVALID,       # 不连续
+        "222AAA": CardType.INVALID,       # 不能包含2
+    }
+    symbols = "3456789TJQKA2wW"
+    for text, expected in airplanes.items():
+        counts = sum(RANK_UNITS[symbols.index(symbol)] for symbol in text)
+        assert _determine_type(counts_to_list(counts)) == expected, text
+        assert classify_counts(counts)[0] == expected, text
+    
+    assert classify_counts(0)[0] == CardType.INVALID
+    # 由签名构造的具体牌与签名一致
+    assert all(cards_to_counts(cards_from_counts(counts)) == counts for counts in PLAY_TABLE)
+    print("✓ 牌型分类表测试通过")
+
+def test_move_generation():
+    """测试出牌生成覆盖全部牌型"""
+    print("\n测试出牌生成...")
+    import itertools
+    
+    def brute_force(counts):
+        slots = counts_to_list(counts)
+        moves = set()
+        for combo in itertools.product(*[range(count + 1) for count in slots]):
+            move = counts_from_list(list(combo))
+            if move in PLAY_TABLE:
+                moves.add(move)
+        return moves
+    
+    rng = random.Random(7)
+    game = Game(seed=0)
+    game.create_deck()
+    for _ in range(100):
+        cards = rng.sample(game.deck, rng.randint(1, 12))
+        counts = cards_to_counts(cards)
+        index = generate_moves(counts)
+        moves = [move for shape_moves in index.values() for move in shape_moves]
+        assert len(moves) == len(set(moves))
+        all_moves = brute_force(counts)
+        assert set(moves) == all_moves
+        for shape, shape_moves in index.items():
+            assert all(play_shape(move) == shape for move in shape_moves)
+        
+        # 接牌结果与逐一比较的结果一致
+        last = rng.choice(list(PLAY_TABLE))
+        responses = generate_responses(counts, last)
+        last_hand = Hand(cards_from_counts(last))
+        expected = {move for move in all_moves if Hand(cards_from_counts(move)).can_beat(last_hand)}
+        assert set(responses) == expected
+    
+    # 飞机、连对、四带二都能生成
+    cards = [Card(suit, value) for value in (CardValue.THREE, CardValue.FOUR, CardValue.FIVE)
+             for suit in (Suit.SPADES, Suit.HEARTS, Suit.CLUBS)]
+    cards += [Card(suit, CardValue.NINE) for suit in (Suit.SPADES, Suit.HEARTS, Suit.CLUBS, Suit.DIAMONDS)]
+    player = Player("测试", is_human=False)
+    player.add_cards(cards)
+    types = {hand.card_type for hand in player.get_valid_hands()}
+    for card_type in (CardType.PAIR_STRAIGHT, CardType.TRIPLE_STRAIGHT, CardType.FOUR_WITH_TWO):
+        assert card_type in types, card_type
+    print("✓ 出牌生成测试通过")
+
+def test_lazy_move_order():
+    """测试惰性出牌枚举的顺序"""
+    print("\n测试惰性出牌枚举...")
+    
+    def cost(hand):
+        return (hand.card_type in (CardType.BOMB, CardType.ROCKET), hand.card_type == CardType.ROCKET,
+                len(hand.cards), hand.move_id)
+    
+    rng = random.Random(11)
+    game = Game(seed=0)
+    game.create_deck()
+    for _ in range(100):
+        player = Player("测试", is_human=False)
+        player.add_cards(rng.sample(game.deck, rng.randint(1, 20)))
+        last_hand = rng.choice([None, Hand(cards_from_counts(rng.choice(list(PLAY_TABLE))))])
+        
+        all_hands = player.get_valid_hands(last_hand)
+        cheapest = list(player.iter_valid_hands(last_hand, MoveOrder.CHEAPEST_FIRST))
+        assert sorted(hand.counts for hand in cheapest) == sorted(hand.counts for hand in all_hands)
+        plays = [hand for hand in cheapest if hand.cards]
+        assert [cost(hand) for hand in plays] == sorted(cost(hand) for hand in plays)
+        # 最小优先的顺序就是出牌编号从小到大
+        last_id = last_hand.move_id if last_hand else NO_MOVE
+        assert list(generate_move_ids(player.counts, last_id)) == [hand.move_id for hand in plays]
+        
+        # 逐个产生的第一个就是AI在完整列表上的选择
+        assert player.decide_hand(last_hand).counts == player.choose_hand(all_hands).counts
+    print("✓ 惰性出牌枚举测试通过")
+
+def test_move_cache():
+    """测试出牌缓存"""
+    print("\n测试出牌缓存...")
+    
+    cache = MoveCache(maxsize=2)
+    rng = random.Random(23)
+    players = []
+    for _ in range(2):
+        player = Player("测试")
+        player.move_cache = cache
+        players.append(player)
+    # 两名玩家点数相同、花色不同，共用缓存时各自用自己的牌
+    deal = rng.sample(range(13), 8)
+    players[0].add_cards([CARDS[rank * 4] for rank in deal])
+    players[1].add_cards([CARDS[rank * 4 + 1] for rank in deal])
+    last = Hand([CARDS[0]])
+    
+    first = players[0].get_valid_hands(last)
+    second = players[1].get_valid_hands(last)
+    assert cache.stats()["misses"] == 1 and cache.stats()["hits"] == 1
+    assert all(players[1].has_cards(hand.cards) for hand in second)
+    assert [hand.counts for hand in first] == [hand.counts for hand in second]
+    
+    # 与不缓存时的结果相同
+    uncached = Player("测试")
+    uncached.move_cache = None
+    uncached.add_cards(players[0].cards)
+    for last_hand in (None, last, Hand([])):
+        expected = [hand.counts for hand in uncached.get_valid_hands(last_hand)]
+        assert [hand.counts for hand in players[0].get_valid_hands(last_hand)] == expected
+    
+    # 上家没有出牌时与主动出牌共用同一条目；超过容量时淘汰最久未用的条目
+    assert cache.stats() == {"hits": 3, "misses": 2, "evictions": 0, "size": 2, "maxsize": 2}
+    players[0].get_valid_hands(Hand([CARDS[4]]))
+    assert cache.evictions == 1
+    players[0].get_valid_hands(None)
+    players[0].get_valid_hands(last)
+    assert cache.hits == 4 and cache.misses == 4
+    
+    # 返回的是只读视图，调用方改不动缓存
+    moves = cache.get(players[0].counts, last.move_id)
+    try:
+        moves[0] = 0
+        assert False, "缓存的出牌编号不应能被修改"
+    except TypeError:
+        pass
+    assert list(cache.get(players[0].counts, last.move_id)) == list(moves) and moves[0] != 0
+    cache.clear()
+    assert cache.stats() == {"hits": 0, "misses": 0, "evictions": 0, "size": 0, "maxsize": 2}
+    print("✓ 出牌缓存测试通过")
+
+
+def test_headless_game():
+    """测试无界面对局"""
+    print("\n测试无界面对局...")
+    import io
+    import contextlib
+    
+    for seed in range(20):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            result = Game(seed=seed, verbose=False).run()
+        assert output.getvalue() == "", "无界面模式不应输出"
+        
+        # 同一种子下 Game 与纯签名引擎结果完全一致
+        assert result == simulate_game(seed)
+        assert result.winner >= 0 and result.turns == len(result.moves)
+        
+        # 胜者打出的牌正好是发到手里的牌
+        hands, kitty, landlord = deal_counts(random.Random(seed))
+        assert landlord == result.landlord
+        played = sum(move for seat, move in result.moves if seat == result.winner)
+        assert played == hands[result.winner]
+    print("✓ 无界面对局测试通过")
+
+def test_bidding():
+    """测试叫地主"""
+    print("\n测试叫地主...")
+    
+    # 牌力：双王4+3，两张2各3，一张A 2，一张K 1
+    strong = counts_from_list([1, 1, 1, 1, 1, 1, 1, 0, 1, 0, 1, 1, 2, 1, 1])
+    assert hand_strength(strong) == 4 + 3 + 2 + 6 + 2 + 1  # 火箭另算一个炸弹
+    assert choose_bid(strong) == 3 and choose_bid(strong, 3) == 0
+    weak = counts_from_list([2, 2, 2, 2, 2, 2, 2, 2, 1, 0, 0, 0, 0, 0, 0])
+    assert hand_strength(weak) == 0 and choose_bid(weak) == 0
+    
+    # 叫到3分立即结束，都不叫时首叫者当地主
+    assert bid_landlord([weak, strong, weak], 0) == (1, 3)
+    assert bid_landlord([weak, weak, weak], 2) == (2, 0)
+    
+    # Game 的叫分过程与 deal_counts 一致，且只能越叫越高
+    for seed in range(30):
+        game = Game(seed=seed, verbose=False)
+        game.players = [Player(f"电脑{i + 1}") for i in range(3)]
+        game.create_deck()
+        game.deal_cards()
+        hands = [player.counts for player in game.players]
+        landlord = game.players.index(game.choose_landlord())
+        assert landlord == deal_counts(random.Random(seed))[2]
+        assert (landlord, game.highest_bid) == bid_landlord(hands, game.first_bidder)
+        bids = [bid for _, bid in game.bids if bid]
+        assert bids == sorted(set(bids))
+    
+    game = Game(seed=1, verbose=False)
+    game.players = [Player(f"电脑{i + 1}") for i in range(3)]
+    game.create_deck()
+    game.deal_cards()
+    game.start_bidding()
+    game.submit_bid(2)
+    for bad in (1, 2, 4):
+        try:
+            game.submit_bid(bad)
+            assert False, "叫分不合法应当报错"
+        except ValueError:
+            pass
+    game.submit_bid(3)
+    assert game.bidding_over and game.settle_landlord() is game.players[(game.first_bidder + 1) % 3]
+    print("✓ 叫地主测试通过")
+
+def test_card_tracker():
+    """测试记牌器"""
+    print("\n测试记牌器...")
+    
+    for seed in range(5):
+        game = Game(seed=seed, verbose=False)
+        result = game.run()
+        tracker = game.tracker
+        assert all(player.tracker is tracker for player in game.players)
+        
+        # 与重放出牌历史的结果一致
+        played = [0] * PLAYER_COUNT
+        passes = [[0] * len(CardType) for _ in range(PLAYER_COUNT)]
+        last = PASS
+        for turn, (seat, move) in enumerate(result.moves):
+            if move:
+                played[seat] += move
+                last = move
+            elif last:
+                passes[seat][list(CardType).index(PLAY_TABLE[last][0])] += 1
+            # 一圈都不出时上家出牌清空
+            if turn >= 2 and not move and not result.moves[turn - 1][1]:
+                last = PASS
+        assert tracker.played == played and tracker.passes == passes
+        assert tracker.remaining == sum(player.counts for player in game.players)
+        assert tracker.remaining == FULL_DECK_COUNTS - sum(played)
+        for rank in range(RANK_COUNT):
+            assert tracker.remaining_count(rank) == counts_to_list(tracker.remaining)[rank]
+            assert tracker.played_count(0, rank) == counts_to_list(played[0])[rank]
+        assert tracker.bombs_left == sum(1 for rank in range(RANK_SMALL_JOKER)
+                                         if tracker.remaining_count(rank) == 4)
+        assert counts_contains(game.players[result.landlord].counts, tracker.kitty_left)
+    
+    # 从某名玩家的角度判断炸弹和火箭
+    tracker = CardTracker()
+    assert tracker.bomb_possible(0) and tracker.rocket_possible()
+    hand = RANK_UNITS[0] + RANK_UNITS[RANK_BIG_JOKER]
+    assert not tracker.bomb_possible(0, hand) and not tracker.rocket_possible(hand)
+    tracker.record(1, 2 * RANK_UNITS[5])
+    tracker.record(2, PASS, 2 * RANK_UNITS[5])
+    assert not tracker.bomb_possible(5) and tracker.bombs_left == RANK_SMALL_JOKER - 1
+    assert tracker.pass_count(2, CardType.PAIR) == 1
+    
+    # 局面的记牌器随走子和悔棋增量更新，与按出牌记录重放建立的相同
+    def fields(tracker):
+        return (tracker.remaining, tracker.played, tracker.passes, tracker.bombs_left,
+                tracker.kitty_left)
+    
+    def replayed(state):
+        fresh = GameState(hands, landlord, kitty)
+        fresh.moves = list(state.moves)
+        return fields(fresh.track())
+    
+    rng = random.Random(4)
+    for seed in range(20):
+        hands, kitty, landlord = deal_counts(random.Random(seed))
+        state = GameState(hands, landlord, kitty)
+        state.track()
+        while not state.is_over and len(state.moves) < rng.randint(1, 60):
+            state.play(rng.choice(list(state.iter_legal_moves())))
+        assert fields(state.tracker) == replayed(state)
+        for _ in range(rng.randint(0, len(state.moves))):
+            state.undo()
+            assert fields(state.tracker) == replayed(state)
+    
+    # Game 的明牌局面带有记牌器的独立副本
+    game = Game(seed=6, verbose=False)
+    game.players = [Player(f"电脑{i + 1}") for i in range(PLAYER_COUNT)]
+    game.create_deck()
+    game.deal_cards()
+    game.choose_landlord()
+    for _ in range(5):
+        game.play_round()
+    state = game.to_state()
+    assert fields(state.tracker) == fields(game.tracker) and state.tracker is not game.tracker
+    print("✓ 记牌器测试通过")
+
+
+def test_state_undo_and_zobrist():
+    """测试局面的走子、悔棋和 Zobrist 哈希"""
+    print("\n测试局面走子与悔棋...")
+    
+    def snapshot(state):
+        return (list(state.hands), state.current, state.last_move, state.last_player,
+                state.winner, list(state.moves), state.zobrist)
+    
+    rng = random.Random(3)
+    for seed in range(30):
+        hands, _, landlord = deal_counts(random.Random(seed))
+        state = GameState(hands, landlord)
+        history = [snapshot(state)]
+        seen = {}
+        while not state.is_over:
+            moves = list(state.iter_legal_moves())
+            state.play(rng.choice(moves))
+            assert state.zobrist == state.compute_zobrist()
+            # 相同哈希的局面必须相同
+            key = (tuple(state.hands), state.current, state.last_move, state.last_player)
+            assert seen.setdefault(state.zobrist, key) == key
+            history.append(snapshot(state))
+        
+        # 逐步悔棋回到开局，每一步都与当时的局面完全一致
+        while state.moves:
+            state.undo()
+            history.pop()
+            assert snapshot(state) == history[-1]
+    print("✓ 局面走子与悔棋测试通过")
+
+def test_min_plays_decomposition():
+    """测试最少手数拆牌"""
+    print("\n测试最少手数拆牌...")
+    from functools import lru_cache
+    
+    @lru_cache(maxsize=None)
+    def brute_force(counts):
+        if not counts:
+            return 0
+        return min(1 + brute_force(counts - move)
+                   for moves in generate_moves(counts).values() for move in moves)
+    
+    rng = random.Random(13)
+    deck = list(DECK_RANKS)
+    for _ in range(150):
+        rng.shuffle(deck)
+        counts = sum(RANK_UNITS[rank] for rank in deck[:rng.randint(1, 20)])
+        plays = best_decomposition(counts)
+        assert sum(plays) == counts and len(plays) == min_plays(counts)
+        assert all(play in PLAY_TABLE for play in plays)
+        if counts_size(counts) <= 10:
+            assert min_plays(counts) == brute_force(counts)
+    
+    # 3到7的顺子加一对8和三张9带一张王：三手
+    cards = [Card(Suit.SPADES, value) for value in list(CardValue)[:5]]
+    cards += [Card(Suit.SPADES, CardValue.EIGHT), Card(Suit.HEARTS, CardValue.EIGHT)]
+    cards += [Card(suit, CardValue.NINE) for suit in (Suit.SPADES, Suit.HEARTS, Suit.CLUBS)]
+    cards += [Card(Suit.JOKER, CardValue.BIG_JOKER)]
+    assert min_plays(cards_to_counts(cards)) == 3
+    assert min_plays.cache_info().maxsize == DECOMPOSE_CACHE_SIZE
+    
+    for seed in range(5):
+        assert simulate_game(seed, [decomposition_ai] * PLAYER_COUNT).winner >= 0
+    print("✓ 最少手数拆牌测试通过")
+
+def test_instrumentation():
+    """测试性能统计"""
+    print("\n测试性能统计...")
+    
+    # 开启统计不改变对局过程
+    instrumentation = Instrumentation()
+    result = Game(seed=0, verbose=False, instrumentation=instrumentation).run()
+    assert result.moves == Game(seed=0, verbose=False).run().moves
+    assert instrumentation.counters["games"] == 1
+    assert instrumentation.counters["turns"] == result.turns
+    assert instrumentation.histograms["turn"].count == result.turns
+    assert instrumentation.histograms["decision"].count == result.turns
+    # 电脑玩家惰性生成出牌时也记录生成耗时
+    assert instrumentation.histograms["move_generation"].count == result.turns
+    # 电脑玩家每次决策都记录候选数，与同一种子的无界面模拟相同
+    shard = Instrumentation()
+    simulate_game(0, instrumentation=shard)
+    for name in ("hands_generated", "hands_beating"):
+        assert instrumentation.counters[name] == shard.counters[name] > 0
+    assert instrumentation.counters["hands_beating"] < instrumentation.counters["hands_generated"]
+    
+    # get_valid_hands 统计筛选前的候选数和其中能压过上家的出牌数
+    player = Player("测试")
+    player.instrumentation = Instrumentation()
+    player.add_cards(cards_from_counts(counts_from_list([2, 2, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0])))
+    last = Hand(cards_from_counts(RANK_UNITS[0]))
+    hands = player.get_valid_hands(last)
+    candidates = len(list(iter_moves(player.counts)))
+    assert player.instrumentation.counters["hands_generated"] == candidates
+    assert player.instrumentation.counters["hands_beating"] == len(hands) - 1 < candidates
+    assert player.instrumentation.histograms["move_generation"].count == 1
+    player.move_cache = None
+    player.get_valid_hands(last)
+    assert player.instrumentation.counters["hands_generated"] == 2 * candidates
+    
+    # 人类玩家等待输入的时间不计入决策和回合延迟
+    human = Instrumentation()
+    game = Game(seed=1, verbose=False, instrumentation=human)
+    game.players = [Player(f"电脑{i + 1}") for i in range(PLAYER_COUNT)]
+    game.create_deck()
+    game.deal_cards()
+    landlord = game.choose_landlord()
+    landlord.is_human = True
+    game.decide_current = lambda: Hand(landlord.cards[:1])  # 代替等待命令行输入
+    game.play_round()
+    assert len(game.moves) == 1
+    assert "decision" not in human.histograms and "turn" not in human.histograms
+    assert human.timers["rule_check"] > 0
+    
+    # 无界面模拟的统计可以合并，并能导出为 JSON
+    total = Instrumentation()
+    for seed in range(3):
+        shard = Instrumentation()
+        assert simulate_game(seed, instrumentation=shard) == simulate_game(seed)
+        total.merge(Instrumentation.from_dict(shard.to_dict()))
+    assert total.counters["games"] == 3
+    histogram = total.histograms["turn"]
+    assert histogram.count == total.counters["turns"] == sum(histogram.buckets)
+    assert histogram.percentile(0.5) <= histogram.percentile(0.99) <= histogram.max * 1e6
+    summary = json.loads(total.to_json())
+    assert set(summary) == {"counters", "seconds", "latency"}
+    print(f"每回合 p50 {summary['latency']['turn']['p50_us']}us，p99 {summary['latency']['turn']['p99_us']}us")
+    print("✓ 性能统计测试通过")
+
+
 def main():
     """运行所有测试"""
     print("=" * 50)
@@ -117,8 +707,22 @@ def main():
         test_card_creation()
         test_hand_recognition()
         test_hand_comparison()
+        test_move_id_dominance()
         test_deck_creation()
         test_ai_player()
+        test_card_interning()
+        test_player_hand_storage()
+        test_counts_representation()
+        test_play_table_consistency()
+        test_move_generation()
+        test_lazy_move_order()
+        test_move_cache()
+        test_headless_game()
+        test_bidding()
+        test_card_tracker()
+        test_state_undo_and_zobrist()
+        test_min_plays_decomposition()
+        test_instrumentation()
         
         print("\n" + "=" * 50)
         print("🎉 所有测试通过！游戏可以正常运行。")
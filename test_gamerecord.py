@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+对局记录测试
+"""
+
+import io
+import os
+import tempfile
+from array import array
+
+from doudizhu import Game, PLAYER_COUNT, simulate_game
+from gamerecord import (GameRecordWriter, encode_record, iter_records, record_from_simulation,
+                        record_games)
+
+
+def test_record_roundtrip():
+    """测试记录 Game 对局并读回重放"""
+    print("测试对局记录...")
+
+    buffer = io.BytesIO()
+    writer = GameRecordWriter(buffer)
+    games = []
+    for seed in range(5):
+        game = Game(seed=seed, verbose=False, recorder=writer)
+        games.append((game, game.run()))
+    assert writer.count == 5
+
+    buffer.seek(0)
+    records = list(iter_records(buffer))
+    assert len(records) == 5
+    for record, (game, result) in zip(records, games):
+        assert record.seed == game.seed and record.landlord == result.landlord
+        assert record.result() == result
+        # 重放到结束得到与 Game 相同的手牌
+        state = record.to_state()
+        assert state.hands == [player.counts for player in game.players]
+        assert state.winner == result.winner
+        # 任意中间回合
+        middle = record.to_state(len(record.moves) // 2)
+        assert middle.moves == result.moves[:len(record.moves) // 2]
+        # 同一种子的无界面模拟得到完全相同的记录
+        assert encode_record(record_from_simulation(record.seed, simulate_game(record.seed))) == \
+            encode_record(record)
+    print(f"每局约{len(buffer.getvalue()) // 5}字节")
+    print("✓ 对局记录测试通过")
+
+
+def test_record_append_and_truncation():
+    """测试追加写入、残缺记录和非法出牌"""
+    print("\n测试追加与残缺记录...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "games.ddz")
+        assert record_games(path, 3, seed=10) == 3
+        assert record_games(path, 2, seed=13) == 2
+        records = list(iter_records(path))
+        assert [record.seed for record in records] == [10, 11, 12, 13, 14]
+        assert all(0 <= record.landlord < PLAYER_COUNT for record in records)
+
+        # 写到一半中断的最后一条被忽略
+        size = os.path.getsize(path)
+        with open(path, "r+b") as f:
+            f.truncate(size - 3)
+        assert [record.seed for record in iter_records(path)] == [10, 11, 12, 13]
+
+        # 再次追加前截掉残缺记录，新记录完整可读
+        assert record_games(path, 2, seed=15) == 2
+        assert [record.seed for record in iter_records(path)] == [10, 11, 12, 13, 15, 16]
+        assert [record.result() for record in iter_records(path)][-2:] == \
+            [simulate_game(15), simulate_game(16)]
+
+        # 不是记录文件时拒绝追加
+        other = os.path.join(tmp, "other.bin")
+        with open(other, "wb") as f:
+            f.write(b"not a record file")
+        try:
+            GameRecordWriter(other)
+            assert False, "魔数不对应当报错"
+        except ValueError:
+            pass
+        with open(other, "rb") as f:
+            assert f.read() == b"not a record file"
+
+    record = records[0]
+    bad = record._replace(moves=array("H", [0]))  # 地主第一手不能不出
+    try:
+        bad.to_state()
+        assert False, "非法出牌应当报错"
+    except ValueError:
+        pass
+    print("✓ 追加与残缺记录测试通过")
+
+
+if __name__ == "__main__":
+    test_record_roundtrip()
+    test_record_append_and_truncation()
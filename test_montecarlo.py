@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+蒙特卡洛确定化AI测试
+"""
+
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from doudizhu import (PLAYER_COUNT, Game, GameState, Player, counts_contains, counts_size,
+                      counts_to_list, deal_counts, simple_ai, simulate_game)
+from montecarlo import MonteCarloAI, observe, sample_hands
+
+
+def midgame_state(seed, turns):
+    """用 simple_ai 从种子牌局走若干回合得到的局面"""
+    hands, kitty, landlord = deal_counts(random.Random(seed))
+    state = GameState(hands, landlord, kitty)
+    for _ in range(turns):
+        state.play(simple_ai(state))
+    return state
+
+
+def test_sampling_consistent():
+    """测试抽样的手牌与可见信息一致"""
+    print("测试确定化抽样...")
+    rng = random.Random(1)
+    for seed in range(30):
+        state = midgame_state(seed, rng.randint(0, 25))
+        if state.is_over:
+            continue
+        view = observe(state)
+        others = sum(h for seat, h in enumerate(state.hands) if seat != state.current)
+        assert counts_to_list(others) == view.unseen  # 未见的牌正好是另外两家的手牌
+        for _ in range(5):
+            hands = sample_hands(view, rng)
+            assert hands[state.current] == state.hands[state.current]
+            assert sum(hands) == sum(state.hands)
+            assert [counts_size(h) for h in hands] == view.sizes
+            if state.current != state.landlord:
+                known = sum(count << (4 * rank) for rank, count in enumerate(view.landlord_known))
+                assert counts_contains(hands[state.landlord], known)
+        # 地主手里一定还有的牌是地主牌中地主还没出的部分
+        played = sum(move for seat, move in state.moves if seat == state.landlord)
+        if state.current != state.landlord:
+            assert view.landlord_known == [max(0, k - p) for k, p in
+                                           zip(counts_to_list(state.kitty), counts_to_list(played))]
+        # 之后的出牌增量更新同一个记牌器
+        tracker = state.tracker
+        if not state.is_over:
+            state.play(simple_ai(state))
+        if not state.is_over:
+            fresh = GameState(list(state.hands), state.landlord, state.kitty)
+            fresh.moves, fresh.current = list(state.moves), state.current
+            fresh.last_move, fresh.last_player = state.last_move, state.last_player
+            assert observe(state) == observe(fresh) and state.tracker is tracker
+    print("✓ 确定化抽样测试通过")
+
+
+def test_montecarlo_decisions():
+    """测试蒙特卡洛AI的决策"""
+    print("\n测试蒙特卡洛AI...")
+    ai = MonteCarloAI(time_limit=0.01, max_rounds=3, seed=0)
+    for seed in range(3):
+        state = midgame_state(seed, 10)
+        move = ai(state)
+        assert move in list(state.iter_legal_moves())
+        assert all(played >= 1 for _, _, played in ai.last_stats)
+
+    # 并行执行器与本进程内模拟给出合法结果
+    with ThreadPoolExecutor(2) as executor:
+        parallel = MonteCarloAI(time_limit=10, max_rounds=2, executor=executor, workers=2, seed=0)
+        state = midgame_state(5, 6)
+        assert parallel(state) in list(state.iter_legal_moves())
+        assert all(played == 4 for _, _, played in parallel.last_stats)
+
+    # 任务多于工作者时，排队的任务不会让决策超出时间预算
+    with ThreadPoolExecutor(1) as executor:
+        queued = MonteCarloAI(time_limit=0.05, executor=executor, workers=6, seed=0)
+        state = midgame_state(5, 6)
+        start = time.monotonic()
+        assert queued(state) in list(state.iter_legal_moves())
+        assert time.monotonic() - start < 0.15
+        assert all(played >= 1 for _, _, played in queued.last_stats)
+
+    # 完整对局：地主使用蒙特卡洛AI
+    strategies = [simple_ai] * PLAYER_COUNT
+    strategies[deal_counts(random.Random(7))[2]] = MonteCarloAI(time_limit=0.002, max_rounds=1, seed=1)
+    assert simulate_game(7, strategies).winner >= 0
+
+    game = Game(seed=8, verbose=False)
+    game.players = [Player(f"电脑{i + 1}") for i in range(PLAYER_COUNT)]
+    game.players[0].strategy = MonteCarloAI(time_limit=0.002, max_rounds=1, seed=2)
+    assert game.run().winner >= 0
+    print("✓ 蒙特卡洛AI测试通过")
+
+
+if __name__ == "__main__":
+    test_sampling_consistent()
+    test_montecarlo_decisions()
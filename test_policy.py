@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量策略推理测试
+"""
+
+import random
+
+import pytest
+
+import policy
+from doudizhu import PASS, PLAY_TABLE, GameState, counts_contains, deal_counts, simple_ai, simulate_game
+from policy import (FEATURE_COUNT, FEATURE_NAMES, LinearPolicy, PolicyAI, candidate_moves,
+                    choose_moves, featurize, run_games)
+
+
+def test_features():
+    """测试候选出牌和特征"""
+    print("测试候选出牌特征...")
+
+    hands, kitty, landlord = deal_counts(random.Random(5))
+    state = GameState(hands, landlord, kitty)
+    moves = candidate_moves(state)
+    assert PASS not in moves  # 主动出牌不能不出
+    assert all(move in PLAY_TABLE and counts_contains(state.hands[landlord], move) for move in moves)
+
+    state.play(moves[0])
+    responses = candidate_moves(state)
+    assert responses[-1] == PASS
+
+    features = [list(row) for row in featurize([state], [responses])]
+    assert len(features) == len(responses) and len(features[0]) == FEATURE_COUNT
+    pass_row = dict(zip(FEATURE_NAMES, features[-1]))
+    assert pass_row["pass"] == 1 and pass_row["responding"] == 1 and pass_row["over_teammate"] == 0
+    assert pass_row["cards_left"] == 17
+    print("✓ 特征测试通过")
+
+
+def test_batched_games_match_sequential():
+    """测试批量调度的结果与逐局决策完全相同，且批量不超过上限"""
+    print("\n测试批量调度...")
+
+    seeds = list(range(40))
+    results, scheduler = run_games(seeds, max_batch_size=16, max_wait=0.01)
+    expected = [simulate_game(seed, [PolicyAI()] * 3) for seed in seeds]
+    assert results == expected
+    stats = scheduler.stats()
+    assert scheduler.largest_batch == 16
+    assert stats["counters"]["decisions"] == sum(result.turns for result in results)
+    assert stats["mean_batch_size"] > 8
+
+    # 部分座位使用固定策略
+    mixed, _ = run_games(seeds[:10], strategies=[simple_ai, None, None])
+    assert mixed == [simulate_game(seed, [simple_ai, PolicyAI(), PolicyAI()]) for seed in seeds[:10]]
+    print(f"✓ 平均批量 {stats['mean_batch_size']}，共{stats['counters']['batches']}批")
+
+
+def test_custom_evaluator():
+    """测试自定义评估器和权重检查"""
+    print("\n测试自定义评估器...")
+
+    calls = []
+
+    def evaluator(features):
+        calls.append(len(features))
+        return LinearPolicy()(features)
+
+    results, scheduler = run_games(range(5), evaluator=evaluator, max_batch_size=64)
+    assert len(results) == 5
+    assert sum(calls) >= scheduler.instrumentation.counters["decisions"]  # 每个决策至少一个候选
+    assert len(calls) == scheduler.instrumentation.counters["batches"]
+    try:
+        LinearPolicy([1.0])
+        assert False, "权重个数不对应当报错"
+    except ValueError:
+        pass
+    print("✓ 自定义评估器测试通过")
+
+
+def test_numpy_matches_fallback():
+    """测试向量化的特征和选择与纯 Python 版本一致（需要 NumPy）"""
+    np = pytest.importorskip("numpy")
+    print("\n测试 NumPy 特征...")
+
+    rng = random.Random(9)
+    states = []
+    for seed in range(20):
+        hands, kitty, landlord = deal_counts(random.Random(seed))
+        state = GameState(hands, landlord, kitty)
+        for _ in range(rng.randint(0, 12)):
+            if not state.is_over:
+                state.play(simple_ai(state))
+        if not state.is_over:
+            states.append(state)
+    candidates = [candidate_moves(state) for state in states]
+
+    features = featurize(states, candidates)
+    chosen = choose_moves(states, LinearPolicy())
+    policy.np = None
+    try:
+        fallback = featurize(states, candidates)
+        fallback_chosen = choose_moves(states, LinearPolicy())
+    finally:
+        policy.np = np
+    assert isinstance(features, np.ndarray) and features.tolist() == fallback
+    assert chosen == fallback_chosen
+    print(f"✓ {len(fallback)}个候选的特征一致")
+
+
+if __name__ == "__main__":
+    test_features()
+    test_batched_games_match_sequential()
+    test_custom_evaluator()
+    test_numpy_matches_fallback()
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多桌对局服务器测试
+"""
+
+import asyncio
+import json
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from doudizhu import Game
+from server import Connection, GameServer, Table
+
+
+async def _send(writer: asyncio.StreamWriter, message):
+    writer.write((json.dumps(message) + "\n").encode("utf-8"))
+    await writer.drain()
+
+
+async def _receive(reader: asyncio.StreamReader):
+    return json.loads(await asyncio.wait_for(reader.readline(), 10))
+
+
+def test_bot_tables():
+    """测试多张电脑牌桌并发进行，结果与 Game.run 相同"""
+    print("测试电脑牌桌...")
+
+    async def scenario():
+        server = GameServer(port=0, seed=100)
+        await server.start()
+        tables = [server.start_bot_table() for _ in range(30)]
+        results = await asyncio.gather(*(table.task for table in tables))
+        stats = server.stats()
+        await server.close()
+        return tables, results, stats
+
+    tables, results, stats = asyncio.run(scenario())
+    for table, result in zip(tables, results):
+        expected = Game(seed=100 + table.id, verbose=False).run()
+        assert (result.winner, result.landlord, result.moves) == \
+            (expected.winner, expected.landlord, expected.moves)
+    assert stats["finished"] == 30 and stats["tables"] == 0
+    assert stats["counters"]["games"] == 30
+    assert stats["latency"]["turn"]["count"] == sum(result.turns for result in results)
+    assert stats["latency"]["ai_decision"]["count"] == stats["latency"]["turn"]["count"]
+    assert 0 < stats["counters"]["hands_beating"] < stats["counters"]["hands_generated"]
+    print(f"✓ 30桌完成，每回合p99 {stats['latency']['turn']['p99_us']}us")
+
+
+def test_human_client():
+    """测试人类玩家通过 TCP 入座、出牌和查询统计"""
+    print("\n测试客户端对局...")
+
+    async def scenario():
+        server = GameServer(port=0, seed=7)
+        await server.start()
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        await _send(writer, {"op": "hello"})
+        assert (await _receive(reader))["event"] == "error"
+        await _send(writer, {"op": "join", "name": "测试", "bots": 2})
+        joined = await _receive(reader)
+        assert joined["event"] == "joined" and joined["seat"] == 0
+
+        errors, plays, over = 0, 0, None
+        tried_illegal = bid_sent = False
+        while over is None:
+            message = await _receive(reader)
+            if message["event"] == "start":
+                assert len(message["hand"]) == 17
+            elif message["event"] == "bidding":
+                await _send(writer, {"op": "bid", "bid": 9})
+                assert (await _receive(reader))["event"] == "error"
+                errors += 1
+                await _send(writer, {"op": "bid", "bid": 3})
+                bid_sent = True
+            elif message["event"] == "landlord":
+                assert len(message["kitty"]) == 3
+                assert message["landlord"] == 0 or not bid_sent
+            elif message["event"] == "turn":
+                if not tried_illegal:
+                    # 先出一手不合法的牌：手里没有的牌
+                    missing = next(i for i in range(54) if i not in message["hand"])
+                    await _send(writer, {"op": "play", "cards": [missing]})
+                    tried_illegal = True
+                    assert (await _receive(reader))["event"] == "error"
+                    errors += 1
+                    await _send(writer, {"op": "stats", "table": joined["table"]})
+                    table_stats = await _receive(reader)
+                    assert table_stats["event"] == "stats" and table_stats["started"]
+                await _send(writer, {"op": "play", "option": 0})
+            elif message["event"] == "play":
+                plays += 1
+            elif message["event"] == "over":
+                over = message
+        stats = server.stats()
+        writer.close()
+        await server.close()
+        return over, plays, errors, stats
+
+    over, plays, errors, stats = asyncio.run(scenario())
+    assert over["winner"] in (0, 1, 2) and over["turns"] == plays
+    assert errors >= 1
+    assert stats["latency"]["human_decision"]["count"] > 0
+    print(f"✓ 对局结束，共{plays}手")
+
+
+def test_join_again_after_game():
+    """测试一局结束后可以在同一连接上再次入座"""
+    print("\n测试再次入座...")
+
+    async def play_game(reader, writer):
+        await _send(writer, {"op": "join", "name": "连打", "bots": 2})
+        joined = await _receive(reader)
+        assert joined["event"] == "joined", joined
+        while True:
+            message = await _receive(reader)
+            if message["event"] == "bidding":
+                await _send(writer, {"op": "bid", "bid": 0})
+            elif message["event"] == "turn":
+                await _send(writer, {"op": "play", "option": 0})
+            elif message["event"] == "over":
+                return joined["table"], message
+
+    async def scenario():
+        server = GameServer(port=0, seed=11)
+        await server.start()
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        first = await play_game(reader, writer)
+        second = await play_game(reader, writer)
+        stats = server.stats()
+        writer.close()
+        await server.close()
+        return first, second, stats
+
+    (first_table, first), (second_table, second), stats = asyncio.run(scenario())
+    assert second_table != first_table
+    assert first["winner"] >= 0 and second["winner"] >= 0
+    assert stats["finished"] == 2
+    print("✓ 同一连接连续完成两局")
+
+
+def test_disconnect_and_timeout():
+    """测试断线由电脑接管、超时由电脑代出"""
+    print("\n测试断线和超时...")
+
+    async def scenario():
+        server = GameServer(port=0, seed=3, turn_timeout=0.01)
+        await server.start()
+        # 一名玩家从不出牌，每手都超时
+        idle_reader, idle_writer = await asyncio.open_connection("127.0.0.1", server.port)
+        await _send(idle_writer, {"op": "join", "name": "发呆", "bots": 2})
+        idle_table = server.tables[(await _receive(idle_reader))["table"]]
+
+        # 另一名玩家开局后立即断线
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        await _send(writer, {"op": "join", "name": "断线", "bots": 2})
+        gone_table = server.tables[(await _receive(reader))["table"]]
+        writer.close()
+
+        results = await asyncio.gather(idle_table.task, gone_table.task)
+        idle_writer.close()
+        await server.close()
+        return results
+
+    idle, gone = asyncio.run(scenario())
+    assert idle.winner >= 0 and gone.winner >= 0
+    print("✓ 断线和超时的牌桌都正常结束")
+
+
+def test_close_with_clients():
+    """测试关闭服务器时关闭仍连着的客户端，并等待其处理任务结束"""
+    print("\n测试关闭服务器...")
+
+    async def scenario():
+        server = GameServer(port=0)
+        await server.start()
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        await _send(writer, {"op": "join", "name": "等人"})  # 没有电脑补位，牌桌一直等待
+        assert (await _receive(reader))["event"] == "joined"
+        idle_reader, idle_writer = await asyncio.open_connection("127.0.0.1", server.port)
+        await _send(idle_writer, {"op": "stats"})
+        await _receive(idle_reader)
+        await server.close()
+        pending = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        closed = [await asyncio.wait_for(r.read(), 10) for r in (reader, idle_reader)]
+        writer.close()
+        idle_writer.close()
+        return server, pending, closed
+
+    server, pending, closed = asyncio.run(scenario())
+    assert pending == [] and closed == [b"", b""]
+    assert server.connection_count == 0 and not server._clients
+    print("✓ 连接都已关闭")
+
+
+def test_stats_while_recording():
+    """测试统计查询与线程池中的记录同时进行时不出错"""
+    print("\n测试并发统计...")
+
+    server = GameServer(port=0)
+    table = server.open_table()
+    done = threading.Event()
+
+    def record():
+        for i in range(50000):
+            table.instrumentation.observe(f"decision_{i % 5000}", 1e-6)
+            table.instrumentation.count(f"hands_{i % 5000}")
+        done.set()
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # 频繁切换线程，让查询和新增统计项交错
+    thread = threading.Thread(target=record)
+    thread.start()
+    snapshots = 0
+    try:
+        while not done.is_set():
+            server.stats()
+            server.stats(table.id)
+            snapshots += 1
+    finally:
+        thread.join()
+        sys.setswitchinterval(interval)
+    stats = server.stats()
+    assert sum(histogram["count"] for histogram in stats["latency"].values()) == 50000
+    assert sum(stats["counters"].values()) == 50000
+    print(f"✓ 记录期间完成{snapshots}次统计查询")
+
+
+def test_malformed_messages():
+    """测试字段类型不对、不是 JSON 和过长的消息只回复错误，不断开连接"""
+    print("\n测试错误消息...")
+
+    async def scenario():
+        server = GameServer(port=0, seed=1)
+        await server.start()
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        errors = []
+        for message in ({"op": "stats", "table": [1]}, {"op": "join", "table": {"a": 1}},
+                        {"op": "join", "name": ["x"]}, {"op": "join", "bots": True}, [1, 2]):
+            await _send(writer, message)
+            errors.append(await _receive(reader))
+        for line in (b"{not json\n", b"[" * 60000 + b"\n", b"[" * 200000 + b"\n", b"\xff\xfe\n"):
+            writer.write(line)
+            await writer.drain()
+            errors.append(await _receive(reader))
+        await _send(writer, {"op": "stats"})
+        stats = await _receive(reader)
+        writer.close()
+        await server.close()
+        return errors, stats
+
+    errors, stats = asyncio.run(scenario())
+    assert all(error["event"] == "error" for error in errors), errors
+    assert [error["message"] for error in errors[-4:]] == \
+        ["消息不是合法的 JSON", "消息不是合法的 JSON", "消息过长", "消息不是合法的 JSON"]
+    assert stats["event"] == "stats" and stats["connections"] == 1
+    print(f"✓ {len(errors)}条错误消息都回复了错误")
+
+
+def test_ai_turn_keeps_departure():
+    """测试代出期间断线的玩家不会被恢复为人类玩家"""
+    print("\n测试代出期间断线...")
+
+    async def scenario():
+        table = Table(1, seed=2)
+        connection = Connection(None, None)
+        seat = table.seat_human(connection, "测试")
+        while not table.is_full:
+            table.seat_bot()
+        game = table.game
+        game.create_deck()
+        game.deal_cards()
+        game.start_bidding()
+        while not game.bidding_over:
+            game.submit_bid(0)
+        game.settle_landlord()
+        game.current_player_idx = seat
+        table.task = asyncio.get_running_loop().create_future()  # 标记为已开局
+
+        gate = threading.Event()
+        with ThreadPoolExecutor(1) as executor:
+            executor.submit(gate.wait)  # 让代出的计算排在后面
+            turn = asyncio.ensure_future(table._ai_turn(executor))
+            try:
+                await asyncio.sleep(0.01)
+                assert game.players[seat].is_human  # 代出不改动玩家身份
+                table.leave(connection)
+            finally:
+                gate.set()
+            hand = await turn
+        return game, seat, hand
+
+    game, seat, hand = asyncio.run(scenario())
+    assert not game.players[seat].is_human
+    assert game.is_legal(hand)
+    print("✓ 断线的座位仍由电脑接管")
+
+
+if __name__ == "__main__":
+    test_bot_tables()
+    test_human_client()
+    test_join_again_after_game()
+    test_disconnect_and_timeout()
+    test_close_with_clients()
+    test_stats_while_recording()
+    test_malformed_messages()
+    test_ai_turn_keeps_departure()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+残局求解器测试
+"""
+
+import random
+
+from doudizhu import (DECK_RANKS, PLAYER_COUNT, RANK_UNITS, Game, GameState, Player,
+                      simulate_game)
+from solver import EndgameSolver, endgame_ai
+
+
+def random_endgame(rng, max_cards):
+    """随机生成三家手牌都不超过 max_cards 张的明牌残局"""
+    deck = list(DECK_RANKS)
+    rng.shuffle(deck)
+    hands = []
+    for _ in range(PLAYER_COUNT):
+        hands.append(sum(RANK_UNITS[deck.pop()] for _ in range(rng.randint(1, max_cards))))
+    state = GameState(hands, rng.randrange(PLAYER_COUNT))
+    state.current = rng.randrange(PLAYER_COUNT)
+    state.zobrist = state.compute_zobrist()
+    return state
+
+
+def brute_force(state):
+    """不带置换表的穷举"""
+    if state.is_over:
+        return state.winner == state.landlord
+    landlord_to_move = state.current == state.landlord
+    for move in list(state.iter_legal_moves()):
+        state.play(move)
+        value = brute_force(state)
+        state.undo()
+        if value == landlord_to_move:
+            return value
+    return not landlord_to_move
+
+
+def test_solver_matches_brute_force():
+    """测试求解结果与穷举一致"""
+    print("测试残局求解...")
+    rng = random.Random(5)
+    solver = EndgameSolver(max_nodes=10 ** 6, time_limit=None, table_bits=10)
+    for _ in range(150):
+        state = random_endgame(rng, 4)
+        expected = brute_force(state)
+        assert solver.solve(state) == expected
+
+        # 选出的着法确实必胜
+        move = solver.choose_move(state)
+        landlord_to_move = state.current == state.landlord
+        if expected == landlord_to_move:
+            assert move is not None
+            state.play(move)
+            assert brute_force(state) == landlord_to_move
+            state.undo()
+        else:
+            assert move is None
+    print("✓ 残局求解测试通过")
+
+
+def test_solver_budget():
+    """测试超出预算时放弃求解"""
+    print("\n测试求解预算...")
+    rng = random.Random(9)
+    solver = EndgameSolver(max_cards=20, max_nodes=10, time_limit=None)
+    state = random_endgame(rng, 10)
+    zobrist = state.zobrist
+    assert solver.solve(state) is None
+    assert state.zobrist == zobrist and not state.moves  # 中途放弃后局面保持原样
+    print("✓ 求解预算测试通过")
+
+
+def test_solver_in_game():
+    """测试AI在对局中调用残局求解器"""
+    print("\n测试对局中的残局求解...")
+    for seed in range(5):
+        game = Game(seed=seed, verbose=False)
+        game.players = [Player(f"电脑{i + 1}") for i in range(PLAYER_COUNT)]
+        for player in game.players:
+            player.endgame_solver = EndgameSolver(max_cards=6, max_nodes=2000)
+        result = game.run()
+        assert result.winner >= 0
+
+        result = simulate_game(seed, [endgame_ai] * PLAYER_COUNT)
+        assert result.winner >= 0
+    print("✓ 对局中的残局求解测试通过")
+
+
+if __name__ == "__main__":
+    test_solver_matches_brute_force()
+    test_solver_budget()
+    test_solver_in_game()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自我对弈锦标赛测试
+"""
+
+import os
+import random
+import tempfile
+
+from doudizhu import GameState, deal_counts, decomposition_ai, simple_ai, simulate_game
+from tournament import (DuplicateStats, TournamentStats, _save_checkpoint, play_duplicate_deal,
+                        run_duplicate, run_tournament)
+
+
+def test_tournament_stats():
+    """测试单进程与多进程统计一致"""
+    print("测试锦标赛统计...")
+
+    expected = TournamentStats()
+    for seed in range(100, 160):
+        expected.add_result(simulate_game(seed))
+
+    single = run_tournament(60, seed=100, workers=1, shard_size=7)
+    parallel = run_tournament(60, seed=100, workers=2, shard_size=7)
+    assert single.to_dict() == expected.to_dict()
+    assert parallel.to_dict() == expected.to_dict()
+    assert sum(expected.seat_landlord) == 60
+    print(f"地主胜率：{expected.landlord_win_rate:.2f}，平均回合数：{expected.average_turns:.1f}")
+    print("✓ 锦标赛统计测试通过")
+
+
+def test_tournament_checkpoint():
+    """测试检查点续跑"""
+    print("\n测试检查点续跑...")
+
+    full = run_tournament(30, seed=0, workers=1, shard_size=10)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "checkpoint.json")
+        # 模拟只完成了第一个分片就被中断
+        config = {"games": 30, "seed": 0, "shard_size": 10, "strategies": None}
+        first = TournamentStats()
+        for seed in range(10):
+            first.add_result(simulate_game(seed))
+        _save_checkpoint(path, config, first, {0})
+
+        resumed = run_tournament(30, seed=0, workers=1, shard_size=10, checkpoint=path)
+        assert resumed.to_dict() == full.to_dict()
+
+        # 配置不一致时拒绝续跑
+        try:
+            run_tournament(40, seed=0, workers=1, shard_size=10, checkpoint=path)
+            assert False, "配置不一致时应当报错"
+        except ValueError:
+            pass
+    print("✓ 检查点续跑测试通过")
+
+
+def test_tournament_instrumentation():
+    """测试锦标赛的性能统计"""
+    print("\n测试锦标赛性能统计...")
+
+    plain = run_tournament(20, seed=0, workers=1, shard_size=8)
+    stats = run_tournament(20, seed=0, workers=2, shard_size=8, instrument=True)
+    assert plain.instrumentation is None
+    assert stats.instrumentation.counters["games"] == 20
+    assert stats.instrumentation.counters["turns"] == stats.total_turns
+    counters = stats.instrumentation.counters
+    assert 0 < counters["hands_beating"] < counters["hands_generated"]
+    # 统计数据随检查点一起保存，且不影响对局结果
+    restored = TournamentStats.from_dict(stats.to_dict())
+    assert restored.instrumentation.histograms["turn"].count == stats.total_turns
+    data = stats.to_dict()
+    del data["instrumentation"]
+    assert data == plain.to_dict()
+    assert "instrumentation" in stats.summary()
+    print("✓ 锦标赛性能统计测试通过")
+
+
+def test_duplicate_deal():
+    """测试复式对局的角色和地主轮换"""
+    print("\n测试复式对局...")
+
+    landlord_outcomes = set()
+    for seed in range(10):
+        # 同一策略对自己：每副牌的配对差恰好为0
+        wins, games, aborted, turns = play_duplicate_deal(seed, simple_ai, simple_ai)
+        assert games == 6 and aborted == 0
+        assert wins["a_landlord"] + wins["a_farmer"] == wins["b_landlord"] + wins["b_farmer"] == 3
+        landlord_outcomes.add(wins["a_landlord"])
+
+        # 轮换时三家的牌各当一次地主，打的是三副不同的局面
+        hands, kitty, landlord = deal_counts(random.Random(seed))
+        hands[landlord] -= kitty
+        expected = []
+        for shift in range(3):
+            seat = (landlord + shift) % 3
+            dealt = list(hands)
+            dealt[seat] += kitty
+            state = GameState(dealt, seat, kitty)
+            while not state.is_over:
+                state.play(simple_ai(state))
+            expected.append(state.result().landlord_won)
+        assert wins["a_landlord"] == sum(expected)
+
+        # 不轮换座位时，A 当地主方的一局就是按座位分配策略的 simulate_game
+        wins, games, _, _ = play_duplicate_deal(seed, decomposition_ai, simple_ai, rotate=False)
+        landlord = simulate_game(seed).landlord
+        strategies = [decomposition_ai if seat == landlord else simple_ai for seat in range(3)]
+        assert games == 2
+        assert wins["a_landlord"] == int(simulate_game(seed, strategies).landlord_won)
+    # 换了地主的局面胜负不再总与叫分产生的地主相同
+    assert landlord_outcomes - {0, 3}
+    print("✓ 复式对局测试通过")
+
+
+def test_duplicate_comparison():
+    """测试复式比较的配对统计和提前停止"""
+    print("\n测试复式比较...")
+
+    same = run_duplicate(simple_ai, simple_ai, max_deals=300, workers=1, shard_size=50,
+                         min_deals=100, rotate=False)
+    assert same.stopped == "equivalent" and same.stats.deals == 100
+    assert same.stats.advantage == 0 and same.summary()["interval"] == [0.0, 0.0]
+
+    better = run_duplicate(decomposition_ai, simple_ai, max_deals=1000, workers=1, shard_size=50,
+                           min_deals=100, rotate=False)
+    parallel = run_duplicate(decomposition_ai, simple_ai, max_deals=1000, workers=2, shard_size=50,
+                             min_deals=100, rotate=False)
+    assert better.stopped == "significant" and better.stats.deals < 1000
+    assert parallel.stats.to_dict() == better.stats.to_dict()
+    summary = better.summary()
+    assert summary["interval"][0] > 0 and summary["a"]["win_rate"] > summary["b"]["win_rate"]
+    assert better.stats.games == 2 * better.stats.deals
+
+    # 按分片合并与逐副记入一致
+    merged = DuplicateStats()
+    for seed in range(0, 20, 5):
+        shard = DuplicateStats()
+        for deal_seed in range(seed, seed + 5):
+            shard.add_deal(*play_duplicate_deal(deal_seed, decomposition_ai, simple_ai, rotate=False))
+        merged.merge(DuplicateStats.from_dict(shard.to_dict()))
+    direct = run_duplicate(decomposition_ai, simple_ai, max_deals=20, workers=1, shard_size=20,
+                           min_deals=1000, rotate=False)
+    assert direct.stopped == "max_deals"
+    assert abs(direct.stats.diff_sum - merged.diff_sum) < 1e-9
+    assert direct.stats.wins == merged.wins
+    print(f"✓ {better.stats.deals}副牌后停止，A 的胜率优势 {summary['advantage']}")
+
+
+if __name__ == "__main__":
+    test_tournament_stats()
+    test_tournament_checkpoint()
+    test_tournament_instrumentation()
+    test_duplicate_deal()
+    test_duplicate_comparison()
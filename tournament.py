@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+斗地主自我对弈锦标赛
+
+把 N 副带种子的牌局分片交给进程池（每个核一个进程）用无界面引擎模拟，
+结果边到边汇总：地主胜率、平均回合数和各座位统计。
+指定检查点文件后，每完成一个分片就保存一次进度，中断后可以接着跑。
+开启统计后还会汇总每回合的决策延迟直方图和策略、规则两部分的耗时。
+
+复式模式比较两个策略：同一副牌由两个策略轮流当地主方和农民方各打一次（还可以让三家的牌
+轮流拿地主牌当地主再打），按每副牌的胜局差配对汇总，给出置信区间，差异显著或足够小时提前停止。
+
+    python3 tournament.py --duplicate doudizhu.decomposition_ai doudizhu.simple_ai
+"""
+
+import argparse
+import importlib
+import json
+import math
+import os
+import random
+import time
+from multiprocessing import Pool
+from statistics import NormalDist
+from typing import Dict, List, Optional, Tuple
+
+from doudizhu import (MAX_TURNS, PLAYER_COUNT, GameResult, GameState, Instrumentation, Strategy,
+                      deal_counts, simulate_game)
+
+
+class TournamentStats:
+    """锦标赛统计，可以按分片合并"""
+
+    def __init__(self):
+        self.games = 0
+        self.landlord_wins = 0
+        self.total_turns = 0
+        self.aborted = 0  # 超过回合上限仍未结束的局数
+        self.seat_wins = [0] * PLAYER_COUNT       # 该座位所在一方获胜的局数
+        self.seat_landlord = [0] * PLAYER_COUNT   # 该座位当地主的局数
+        self.seat_landlord_wins = [0] * PLAYER_COUNT
+        self.instrumentation: Optional[Instrumentation] = None  # 开启统计时的性能数据
+
+    def add_result(self, result: GameResult):
+        """记入一局结果"""
+        self.games += 1
+        self.total_turns += result.turns
+        self.seat_landlord[result.landlord] += 1
+        if result.winner < 0:
+            self.aborted += 1
+            return
+
+        if result.landlord_won:
+            self.landlord_wins += 1
+            self.seat_landlord_wins[result.landlord] += 1
+            self.seat_wins[result.landlord] += 1
+        else:
+            for seat in range(PLAYER_COUNT):
+                if seat != result.landlord:
+                    self.seat_wins[seat] += 1
+
+    def merge(self, other: 'TournamentStats'):
+        """合并另一个分片的统计"""
+        self.games += other.games
+        self.landlord_wins += other.landlord_wins
+        self.total_turns += other.total_turns
+        self.aborted += other.aborted
+        for seat in range(PLAYER_COUNT):
+            self.seat_wins[seat] += other.seat_wins[seat]
+            self.seat_landlord[seat] += other.seat_landlord[seat]
+            self.seat_landlord_wins[seat] += other.seat_landlord_wins[seat]
+        if other.instrumentation is not None:
+            if self.instrumentation is None:
+                self.instrumentation = Instrumentation()
+            self.instrumentation.merge(other.instrumentation)
+
+    @property
+    def landlord_win_rate(self) -> float:
+        return self.landlord_wins / self.games if self.games else 0.0
+
+    @property
+    def average_turns(self) -> float:
+        return self.total_turns / self.games if self.games else 0.0
+
+    def to_dict(self) -> Dict:
+        data = {
+            "games": self.games,
+            "landlord_wins": self.landlord_wins,
+            "total_turns": self.total_turns,
+            "aborted": self.aborted,
+            "seat_wins": self.seat_wins,
+            "seat_landlord": self.seat_landlord,
+            "seat_landlord_wins": self.seat_landlord_wins,
+        }
+        if self.instrumentation is not None:
+            data["instrumentation"] = self.instrumentation.to_dict()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'TournamentStats':
+        stats = cls()
+        for key, value in data.items():
+            if key == "instrumentation":
+                stats.instrumentation = Instrumentation.from_dict(value)
+            else:
+                setattr(stats, key, list(value) if isinstance(value, list) else value)
+        return stats
+
+    def summary(self) -> Dict:
+        """便于输出的汇总结果"""
+        summary = {
+            "games": self.games,
+            "landlord_win_rate": round(self.landlord_win_rate, 4),
+            "average_turns": round(self.average_turns, 2),
+            "aborted": self.aborted,
+            "seats": [
+                {
+                    "win_rate": round(self.seat_wins[seat] / self.games, 4) if self.games else 0.0,
+                    "landlord_games": self.seat_landlord[seat],
+                    "landlord_win_rate": (round(self.seat_landlord_wins[seat] / self.seat_landlord[seat], 4)
+                                          if self.seat_landlord[seat] else 0.0),
+                }
+                for seat in range(PLAYER_COUNT)
+            ],
+        }
+        if self.instrumentation is not None:
+            summary["instrumentation"] = self.instrumentation.summary()
+        return summary
+
+
+def _run_shard(task: Tuple[int, int, int, Optional[List[Strategy]], bool]) -> Tuple[int, Dict]:
+    """工作进程：模拟一个分片内的全部牌局"""
+    shard, first_seed, count, strategies, instrument = task
+    stats = TournamentStats()
+    if instrument:
+        stats.instrumentation = Instrumentation()
+    for seed in range(first_seed, first_seed + count):
+        stats.add_result(simulate_game(seed, strategies, stats.instrumentation))
+    return shard, stats.to_dict()
+
+
+def _load_checkpoint(path: str, config: Dict) -> Tuple[TournamentStats, set]:
+    """读取检查点，配置不一致时拒绝续跑"""
+    if not os.path.exists(path):
+        return TournamentStats(), set()
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if data["config"] != config:
+        raise ValueError(f"检查点 {path} 的配置与本次运行不一致")
+    return TournamentStats.from_dict(data["stats"]), set(data["done"])
+
+
+def _save_checkpoint(path: str, config: Dict, stats: TournamentStats, done: set):
+    """原子地写入检查点"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"config": config, "stats": stats.to_dict(), "done": sorted(done)}, f)
+    os.replace(tmp_path, path)
+
+
+def run_tournament(games: int, seed: int = 0, workers: Optional[int] = None,
+                   shard_size: int = 1000, checkpoint: Optional[str] = None,
+                   strategies: Optional[List[Strategy]] = None,
+                   instrument: bool = False) -> TournamentStats:
+    """用种子 seed..seed+games-1 的牌局进行锦标赛
+
+    workers 默认为CPU核数，为1时在当前进程内运行。
+    strategies 必须是模块级函数，才能传给工作进程。
+    instrument 为 True 时在结果的 instrumentation 中汇总性能统计。
+    """
+    config = {"games": games, "seed": seed, "shard_size": shard_size,
+              "strategies": [f"{s.__module__}.{s.__qualname__}" for s in strategies] if strategies else None}
+    if instrument:
+        config["instrument"] = True
+    stats, done = TournamentStats(), set()
+    if checkpoint:
+        stats, done = _load_checkpoint(checkpoint, config)
+
+    tasks = []
+    for shard, first in enumerate(range(seed, seed + games, shard_size)):
+        if shard not in done:
+            tasks.append((shard, first, min(shard_size, seed + games - first), strategies, instrument))
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        results = map(_run_shard, tasks)
+        pool = None
+    else:
+        pool = Pool(min(workers, max(len(tasks), 1)))
+        results = pool.imap_unordered(_run_shard, tasks)
+
+    try:
+        for shard, shard_stats in results:
+            stats.merge(TournamentStats.from_dict(shard_stats))
+            done.add(shard)
+            if checkpoint:
+                _save_checkpoint(checkpoint, config, stats, done)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+    return stats
+
+
+# ---------------------------------------------------------------------------
+# 复式比较
+# ---------------------------------------------------------------------------
+ROLES = ("landlord", "farmer")
+
+
+class DuplicateStats:
+    """复式比较的统计：策略 A、B 各自当地主方和农民方的胜局，以及每副牌的配对差"""
+
+    def __init__(self):
+        self.deals = 0
+        self.games = 0
+        self.aborted = 0
+        self.total_turns = 0
+        # 键为 "a_landlord" 等，值为该策略在该角色上赢的局数；每个策略每个角色各打 games/2 局
+        self.wins = {f"{side}_{role}": 0 for side in "ab" for role in ROLES}
+        self.diff_sum = 0.0     # 每副牌 (A胜率 - B胜率) 之和
+        self.diff_sq_sum = 0.0
+
+    def add_deal(self, wins: Dict[str, int], games: int, aborted: int, turns: int):
+        """记入一副牌的全部对局"""
+        self.deals += 1
+        self.games += games
+        self.aborted += aborted
+        self.total_turns += turns
+        for key, n in wins.items():
+            self.wins[key] += n
+        diff = (wins["a_landlord"] + wins["a_farmer"] - wins["b_landlord"] - wins["b_farmer"]) / games
+        self.diff_sum += diff
+        self.diff_sq_sum += diff * diff
+
+    def merge(self, other: 'DuplicateStats'):
+        """合并另一个分片的统计"""
+        self.deals += other.deals
+        self.games += other.games
+        self.aborted += other.aborted
+        self.total_turns += other.total_turns
+        for key, n in other.wins.items():
+            self.wins[key] += n
+        self.diff_sum += other.diff_sum
+        self.diff_sq_sum += other.diff_sq_sum
+
+    @property
+    def advantage(self) -> float:
+        """A 的胜率减去 B 的胜率（按副牌配对的平均值）"""
+        return self.diff_sum / self.deals if self.deals else 0.0
+
+    @property
+    def standard_error(self) -> float:
+        if self.deals < 2:
+            return float("inf")
+        variance = (self.diff_sq_sum - self.deals * self.advantage ** 2) / (self.deals - 1)
+        return math.sqrt(max(variance, 0.0) / self.deals)
+
+    def interval(self, z: float) -> Tuple[float, float]:
+        """A 胜率优势的置信区间"""
+        half = z * self.standard_error
+        return self.advantage - half, self.advantage + half
+
+    def win_rate(self, side: str, role: Optional[str] = None) -> float:
+        """side 为 "a" 或 "b"；role 为 None 时为两个角色合计"""
+        role_games = self.games // 2
+        if role is not None:
+            return self.wins[f"{side}_{role}"] / role_games if role_games else 0.0
+        return sum(self.wins[f"{side}_{r}"] for r in ROLES) / self.games if self.games else 0.0
+
+    def to_dict(self) -> Dict:
+        return {"deals": self.deals, "games": self.games, "aborted": self.aborted,
+                "total_turns": self.total_turns, "wins": dict(self.wins),
+                "diff_sum": self.diff_sum, "diff_sq_sum": self.diff_sq_sum}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'DuplicateStats':
+        stats = cls()
+        for key, value in data.items():
+            setattr(stats, key, dict(value) if isinstance(value, dict) else value)
+        return stats
+
+
+class DuplicateResult:
+    """复式比较的结论"""
+
+    def __init__(self, stats: DuplicateStats, z: float, stopped: str):
+        self.stats = stats
+        self.z = z              # 顾及多次查看后的临界值
+        self.stopped = stopped  # significant（差异显著）、equivalent（差异小于容差）或 max_deals
+
+    def summary(self) -> Dict:
+        stats = self.stats
+        low, high = stats.interval(self.z)
+        return {
+            "deals": stats.deals,
+            "games": stats.games,
+            "stopped": self.stopped,
+            "advantage": round(stats.advantage, 4),
+            "interval": [round(low, 4), round(high, 4)],
+            "a": {"win_rate": round(stats.win_rate("a"), 4),
+                  **{f"{role}_win_rate": round(stats.win_rate("a", role), 4) for role in ROLES}},
+            "b": {"win_rate": round(stats.win_rate("b"), 4),
+                  **{f"{role}_win_rate": round(stats.win_rate("b", role), 4) for role in ROLES}},
+            "aborted": stats.aborted,
+            "average_turns": round(stats.total_turns / stats.games, 2) if stats.games else 0.0,
+        }
+
+
+def play_duplicate_deal(seed: int, a: Strategy, b: Strategy, rotate: bool = True
+                        ) -> Tuple[Dict[str, int], int, int, int]:
+    """用种子 seed 的牌局让 A、B 轮流当地主方和农民方，rotate 时再让三家的牌轮流拿地主牌当地主
+
+    不轮换时只打叫分产生的地主那一种局面；轮换时每家的牌都当一次地主、当两次农民，
+    牌力强弱对两个策略的影响相互抵消。
+    返回 (各策略各角色的胜局, 局数, 未结束局数, 总回合数)。
+    """
+    hands, kitty, landlord = deal_counts(random.Random(seed))
+    hands[landlord] -= kitty  # 三家发到的17张牌
+    wins = {f"{side}_{role}": 0 for side in "ab" for role in ROLES}
+    games = aborted = turns = 0
+    for shift in range(PLAYER_COUNT if rotate else 1):
+        seat_of_landlord = (landlord + shift) % PLAYER_COUNT
+        dealt = list(hands)
+        dealt[seat_of_landlord] += kitty
+        for landlord_side, farmer_side, landlord_strategy, farmer_strategy in (("a", "b", a, b),
+                                                                               ("b", "a", b, a)):
+            strategies = [landlord_strategy if seat == seat_of_landlord else farmer_strategy
+                          for seat in range(PLAYER_COUNT)]
+            state = GameState(dealt, seat_of_landlord, kitty)
+            while not state.is_over and len(state.moves) < MAX_TURNS:
+                state.play(strategies[state.current](state))
+            result = state.result()
+            games += 1
+            turns += result.turns
+            if result.winner < 0:
+                aborted += 1
+            elif result.landlord_won:
+                wins[f"{landlord_side}_landlord"] += 1
+            else:
+                wins[f"{farmer_side}_farmer"] += 1
+    return wins, games, aborted, turns
+
+
+def _run_duplicate_shard(task: Tuple[int, int, int, Strategy, Strategy, bool]) -> Tuple[int, Dict]:
+    """工作进程：复式比较一个分片内的全部牌局"""
+    shard, first_seed, count, a, b, rotate = task
+    stats = DuplicateStats()
+    for seed in range(first_seed, first_seed + count):
+        stats.add_deal(*play_duplicate_deal(seed, a, b, rotate))
+    return shard, stats.to_dict()
+
+
+def run_duplicate(a: Strategy, b: Strategy, max_deals: int = 10000, seed: int = 0,
+                  workers: Optional[int] = None, shard_size: int = 100,
+                  confidence: float = 0.95, tolerance: float = 0.01,
+                  min_deals: int = 200, rotate: bool = True) -> DuplicateResult:
+    """复式比较策略 A 与 B，使用种子 seed 起的至多 max_deals 副牌
+
+    每完成一个分片（按顺序）检查一次：A 的胜率优势的置信区间不含0时判为差异显著，
+    区间半宽小于 tolerance 时判为没有超过容差的差异，两种情况都提前停止。
+    多次查看按 Bonferroni 校正临界值，整体的错误率不超过 1 - confidence。
+    策略必须是模块级函数，才能传给工作进程。
+    """
+    tasks = [(shard, first, min(shard_size, seed + max_deals - first), a, b, rotate)
+             for shard, first in enumerate(range(seed, seed + max_deals, shard_size))]
+    looks = max(sum(1 for shard in range(len(tasks)) if (shard + 1) * shard_size >= min_deals), 1)
+    z = NormalDist().inv_cdf(1 - (1 - confidence) / (2 * looks))
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        results = map(_run_duplicate_shard, tasks)
+        pool = None
+    else:
+        pool = Pool(min(workers, max(len(tasks), 1)))
+        results = pool.imap(_run_duplicate_shard, tasks)  # 按顺序取结果，停止点与进程数无关
+
+    stats, stopped = DuplicateStats(), "max_deals"
+    try:
+        for _, shard_stats in results:
+            stats.merge(DuplicateStats.from_dict(shard_stats))
+            if stats.deals < min_deals:
+                continue
+            low, high = stats.interval(z)
+            if low > 0 or high < 0:
+                stopped = "significant"
+                break
+            if (high - low) / 2 < tolerance:
+                stopped = "equivalent"
+                break
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+    return DuplicateResult(stats, z, stopped)
+
+
+def load_strategy(name: str) -> Strategy:
+    """按 "模块.函数名" 取得策略函数"""
+    module, _, attr = name.rpartition(".")
+    if not module:
+        raise ValueError(f"策略应写成 模块.函数名：{name}")
+    return getattr(importlib.import_module(module), attr)
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="斗地主AI自我对弈锦标赛")
+    parser.add_argument("--games", type=int, default=10000, help="对局数")
+    parser.add_argument("--seed", type=int, default=0, help="第一副牌的种子")
+    parser.add_argument("--workers", type=int, default=None, help="进程数，默认为CPU核数")
+    parser.add_argument("--shard-size", type=int, default=1000, help="每个分片的对局数")
+    parser.add_argument("--checkpoint", default=None, help="检查点文件，存在时从中断处继续")
+    parser.add_argument("--instrument", action="store_true", help="汇总决策延迟等性能统计")
+    parser.add_argument("--duplicate", nargs=2, metavar=("A", "B"), default=None,
+                        help="复式比较两个策略（模块.函数名），--games 为最多的牌局数")
+    parser.add_argument("--confidence", type=float, default=0.95, help="复式比较的置信水平")
+    parser.add_argument("--tolerance", type=float, default=0.01, help="复式比较可忽略的胜率差")
+    parser.add_argument("--no-rotate", action="store_true",
+                        help="复式比较时只打叫分产生的地主（每副牌2局而不是6局）")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.duplicate:
+        a, b = (load_strategy(name) for name in args.duplicate)
+        result = run_duplicate(a, b, args.games, args.seed, args.workers,
+                               shard_size=min(args.shard_size, 100), confidence=args.confidence,
+                               tolerance=args.tolerance, rotate=not args.no_rotate)
+        summary = result.summary()
+        summary["a"]["strategy"], summary["b"]["strategy"] = args.duplicate
+        summary["seconds"] = round(time.perf_counter() - start, 2)
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+        return
+
+    stats = run_tournament(args.games, args.seed, args.workers, args.shard_size, args.checkpoint,
+                           instrument=args.instrument)
+    elapsed = time.perf_counter() - start
+
+    summary = stats.summary()
+    summary["seconds"] = round(elapsed, 2)
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()